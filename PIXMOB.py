@@ -1,23 +1,47 @@
-import json
+#!/usr/bin/env python3
+"""
+PIXMOB .sub Converter
+Prints every frame of the given .sub files (or folders) as C array entries
+"""
+
+import argparse
 import os
 
+from pixmob_decoder import GAP_US, decode_archive, format_c_array
+
 # Assuming the script is run from the project root
 FilesPath = './rf/edited_rf_captures/868Mhz/'
+ArchivePaths = [
+    './rf/edited_rf_captures/868Mhz/',
+    './rf/edited_rf_captures/915Mhz/',
+    './rf/raw_wild_rf_captures/',
+]
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('paths', nargs='*', default=[FilesPath],
+                        help=f".sub files or folders to convert (default: {FilesPath})")
+    parser.add_argument('--all', action='store_true', help="convert both bands and the raw wild archive")
+    parser.add_argument('--unit', type=int, default=None,
+                        help="bit cell length in microseconds (default: estimated per file)")
+    parser.add_argument('--gap', type=int, default=GAP_US, help="low period in microseconds that ends a frame")
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--confidence', action='store_true', help="print unit and per-frame confidence")
+    args = parser.parse_args()
+
+    paths = ArchivePaths if args.all else args.paths
+    for decoded in decode_archive(paths, args.unit, args.gap, args.jobs):
+        name = os.path.basename(decoded.path).replace('.sub', '')
+        if args.confidence:
+            print(f"// {decoded.path}: unit {decoded.unit:.1f} us, confidence {decoded.confidence:.2f}")
+        for frame in decoded.frames:
+            line = format_c_array(frame.data, name)
+            if args.confidence:
+                line += f" ({frame.confidence:.2f})"
+            print(line)
+
 
-for filename in os.listdir(FilesPath):
-    if '.sub' in filename:
-        with open(os.path.join(FilesPath, filename), 'r') as file:
-            l = [int(int(x)/510) for x in file.read().split('RAW_Data: ')[1].split(' ')]
-        s = ''
-        for i in l:
-            if i > 0:
-                for d in range(i):
-                    s += '1'
-            else:
-                for d in range(-1*i):
-                    s += '0'
-        s=s+'00000000'
-        Hex = ''
-        for i in range(0, len(s), 8):
-            Hex = Hex + hex(int(s[i:i+8], 2)) + ','
-        print(('// {' + Hex[:-1] + '}, //' + filename.replace('.sub', '')).replace(',0x0}','}'))
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Simulated pigpio
+Records the waveforms built and sent through a pigpio.pi so OOK timing can be checked without a Pi
+
+Usage:
+    import pigpio_sim; pigpio_sim.install()
+    import pigpio   # now the simulation
+"""
+
+import sys
+import time
+from collections import namedtuple
+
+OUTPUT = 1
+INPUT = 0
+WAVE_MODE_ONE_SHOT = 0
+WAVE_MODE_REPEAT = 1
+WAVE_MODE_ONE_SHOT_SYNC = 2
+WAVE_MODE_REPEAT_SYNC = 3
+WAVE_NOT_FOUND = 9998
+NO_TX_WAVE = 9999
+
+MAX_WAVES = 250           # Wave ids pigpio can hold at once
+MAX_PULSES = 12000        # Pulses a single wave can hold
+
+pulse = namedtuple('pulse', 'gpio_on gpio_off delay')
+
+
+class error(Exception):
+    """Raised like pigpio.error"""
+
+
+class pi:
+    """Subset of pigpio.pi used by the PIXMOB OOK code
+
+    Every wave_send_* and wave_chain call is appended to .transmissions as
+    the flat list of pulses that would have left the GPIO, so tests can
+    compare the emitted timing with the intended bit stream.
+    """
+
+    def __init__(self, host='localhost', port=8888):
+        self.connected = True
+        self.modes = {}
+        self.levels = {}
+        self.waves = {}
+        self.transmissions = []
+        self._pending = []
+        self._next_id = 0
+        self._busy_until = 0.0
+        self._queue = []       # (wave_id, start, end) scheduled with SYNC modes
+
+    def set_mode(self, gpio, mode):
+        self.modes[gpio] = mode
+
+    def write(self, gpio, level):
+        self.levels[gpio] = level
+
+    def read(self, gpio):
+        return self.levels.get(gpio, 0)
+
+    def wave_clear(self):
+        self.waves.clear()
+        self._pending = []
+
+    def wave_add_new(self):
+        self._pending = []
+
+    def wave_add_generic(self, pulses):
+        self._pending.extend(pulses)
+        if len(self._pending) > MAX_PULSES:
+            raise error("too many pulses")
+        return len(self._pending)
+
+    def wave_create(self):
+        if len(self.waves) >= MAX_WAVES:
+            raise error("no more waveforms")
+        wave_id = self._next_id
+        self._next_id += 1
+        self.waves[wave_id] = list(self._pending)
+        self._pending = []
+        return wave_id
+
+    def wave_delete(self, wave_id):
+        self.waves.pop(wave_id, None)
+
+    def wave_get_micros(self):
+        return sum(p.delay for p in self._pending)
+
+    def _duration(self, pulses):
+        return sum(p.delay for p in pulses) / 1e6
+
+    def _start(self, pulses, sync, wave_id=None):
+        now = time.monotonic()
+        start = max(now, self._busy_until) if sync else now
+        self._busy_until = start + self._duration(pulses)
+        self._queue.append((wave_id, start, self._busy_until))
+        self.transmissions.append(pulses)
+
+    def wave_send_once(self, wave_id):
+        self._start(self.waves[wave_id], False, wave_id)
+        return len(self.waves[wave_id])
+
+    def wave_send_using_mode(self, wave_id, mode):
+        sync = mode in (WAVE_MODE_ONE_SHOT_SYNC, WAVE_MODE_REPEAT_SYNC)
+        self._start(self.waves[wave_id], sync, wave_id)
+        return len(self.waves[wave_id])
+
+    def wave_chain(self, data):
+        pulses = []
+        stack = []
+        index = 0
+        while index < len(data):
+            value = data[index]
+            if value != 255:
+                pulses.extend(self.waves[value])
+                index += 1
+                continue
+            command = data[index + 1]
+            if command == 0:              # loop start
+                stack.append((index + 2, len(pulses)))
+                index += 2
+            elif command == 1:            # loop end, repeat x + 256*y times
+                count = data[index + 2] + 256 * data[index + 3]
+                _, mark = stack.pop()
+                body = pulses[mark:]
+                pulses.extend(body * (count - 1))
+                index += 4
+            elif command == 2:            # delay x + 256*y microseconds
+                delay = data[index + 2] + 256 * data[index + 3]
+                pulses.append(pulse(0, 0, delay))
+                index += 4
+            else:
+                raise error(f"unsupported chain command {command}")
+        self._start(pulses, False)
+        return 0
+
+    def wave_tx_busy(self):
+        return 1 if time.monotonic() < self._busy_until else 0
+
+    def wave_tx_at(self):
+        now = time.monotonic()
+        for wave_id, start, end in self._queue:
+            if start <= now < end:
+                return NO_TX_WAVE if wave_id is None else wave_id
+        return NO_TX_WAVE
+
+    def wave_tx_stop(self):
+        self._busy_until = 0.0
+        self._queue = []
+
+    def stop(self):
+        self.connected = False
+
+
+def install():
+    """Make `import pigpio` return this simulation"""
+    sys.modules['pigpio'] = sys.modules[__name__]
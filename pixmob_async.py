@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+PIXMOB asyncio Controller
+Non-blocking transmit API where one task owns the radio and interleaves every cue
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pixmob_controller import DEMO_SHOW, WAKE_COMMANDS, PIXMOBController
+
+MAX_PENDING = 64
+
+
+class Transmission:
+    """Handle for one queued command; await .done or .started, or call cancel()"""
+
+    def __init__(self, name, frame, repeat, interval):
+        loop = asyncio.get_running_loop()
+        self.name = name
+        self.frame = frame
+        self.repeat = repeat
+        self.interval = interval
+        self.sent = 0
+        self.queued_at = time.monotonic()
+        self.dispatched_at = None             # monotonic time the first write was handed to the radio
+        self.started = loop.create_future()   # monotonic time send() returned for the first frame
+        self.done = loop.create_future()      # True once every repeat was written
+
+    def cancel(self):
+        """Drop the remaining repeats"""
+        for future in (self.started, self.done):
+            if not future.done():
+                future.cancel()
+
+    def fail(self, error):
+        """Hand a write error to everyone awaiting .started or .done"""
+        for future in (self.started, self.done):
+            if not future.done():
+                future.set_exception(error)
+                # Mark it retrieved: a caller that only awaits one of the two must not get a warning
+                future.exception()
+
+    @property
+    def cancelled(self):
+        return self.done.cancelled()
+
+
+class AsyncPIXMOBController:
+    """asyncio front end for PIXMOBController
+
+    A single transmit task owns the serial port. Every submitted command is
+    scheduled frame by frame on a deadline heap, so the pauses between the
+    repeats of one cue are used to send the frames of others and no cue source
+    waits for another one to finish. The blocking serial write runs on a
+    dedicated thread so the event loop never stalls.
+    """
+
+    def __init__(self, controller=None, max_pending=MAX_PENDING):
+        self.controller = controller
+        self.max_pending = max_pending
+        self._heap = []
+        self._order = itertools.count()
+        self._wakeup = None
+        self._space = None
+        self._task = None
+        self._executor = None
+        self._current = None      # Transmission whose frame is being written right now
+
+    async def start(self):
+        """Create the controller if needed and start the transmit task"""
+        loop = asyncio.get_running_loop()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pixmob-tx')
+        if self.controller is None:
+            self.controller = await loop.run_in_executor(self._executor, PIXMOBController)
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._task = asyncio.create_task(self._transmit_loop())
+
+    async def stop(self):
+        """Cancel everything still queued and stop the transmit task"""
+        if self._task is None:
+            return
+        # A transmission being written is on neither the heap nor resolved; its awaiters need an answer too
+        current = self._current
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        if current is not None:
+            current.cancel()
+        for _, _, transmission in self._heap:
+            transmission.cancel()
+        self._heap.clear()
+        self._task = None
+        # Waits for a write still in progress (up to ~200 ms) without blocking the event loop
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    @property
+    def pending(self):
+        """Number of commands waiting for at least one more frame"""
+        return len(self._heap)
+
+    def submit(self, command_name, repeat=3, interval=0.5, wrapped=True):
+        """Queue a command without waiting; raises asyncio.QueueFull when saturated"""
+        if command_name not in self.controller.commands:
+            raise KeyError(f"Unknown command: {command_name}")
+        if len(self._heap) >= self.max_pending:
+            raise asyncio.QueueFull()
+        if wrapped:
+            frame = self.controller.wrapped_frame(command_name)
+        else:
+            frame = self.controller.commands[command_name]
+        transmission = Transmission(command_name, frame, repeat, interval)
+        self._push(transmission.queued_at, transmission)
+        return transmission
+
+    async def send(self, command_name, repeat=3, interval=0.5, wrapped=True):
+        """Send a command, waiting for queue space and for the last repeat"""
+        while len(self._heap) >= self.max_pending:
+            self._space.clear()
+            await self._space.wait()
+        transmission = self.submit(command_name, repeat, interval, wrapped)
+        try:
+            return await transmission.done
+        except asyncio.CancelledError:
+            transmission.cancel()
+            raise
+
+    def cancel_all(self):
+        """Cancel every queued command, and the one being written; returns how many had frames left"""
+        cancelled = 0
+        queued = [transmission for _, _, transmission in self._heap]
+        if self._current is not None:
+            queued.append(self._current)
+        for transmission in queued:
+            if not transmission.cancelled:
+                transmission.cancel()
+                cancelled += 1
+        return cancelled
+
+    async def wake(self):
+        """Wake-up sequence; the commands overlap instead of running back to back"""
+        sends = []
+        for cmd in WAKE_COMMANDS:
+            sends.append(asyncio.create_task(self.send(cmd, repeat=2)))
+            await asyncio.sleep(1)
+        await asyncio.gather(*sends)
+
+    async def show(self, sequence=DEMO_SHOW, hold=3):
+        """Demo light show that holds each effect for hold seconds"""
+        for cmd, description in sequence:
+            print(f"--- {description} ---")
+            await self.send(cmd, repeat=2)
+            await asyncio.sleep(hold)
+
+    def _push(self, due, transmission):
+        heapq.heappush(self._heap, (due, next(self._order), transmission))
+        self._wakeup.set()
+
+    async def _transmit_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            due, _, transmission = self._heap[0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                # Sleep until the earliest frame is due or a new command arrives
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            self._space.set()
+            if transmission.cancelled:
+                continue
+
+            if transmission.dispatched_at is None:
+                transmission.dispatched_at = time.monotonic()
+            # Off the heap while the write runs, so cancel_all() has to find it here
+            self._current = transmission
+            try:
+                await loop.run_in_executor(self._executor, self.controller.send_frame, transmission.frame)
+            except Exception as e:
+                transmission.fail(e)
+                continue
+            finally:
+                self._current = None
+
+            transmission.sent += 1
+            if not transmission.started.done():
+                transmission.started.set_result(time.monotonic())
+            if transmission.cancelled:
+                continue          # Cancelled while its frame was being written
+            if transmission.sent < transmission.repeat:
+                self._push(time.monotonic() + transmission.interval, transmission)
+            elif not transmission.done.done():
+                transmission.done.set_result(True)
+
+
+async def demo():
+    """Wake the bracelets while the demo show already starts"""
+    async with AsyncPIXMOBController() as controller:
+        await asyncio.gather(controller.wake(), controller.show())
+        print("[SUCCESS] Demo light show completed!")
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(demo())
+    except KeyboardInterrupt:
+        print("\nProgram interrupted by user.")
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+PIXMOB Audio-Reactive Cues
+Turns onsets and beats in live audio into bracelet commands
+
+Audio is read in fixed blocks from a WAV file or raw 16-bit PCM on stdin.
+For every block the last WINDOW samples go through one NumPy FFT. The
+positive spectral flux is summed per frequency band and compared with an
+adaptive threshold (a multiple of the band's recent median, and a share of
+its recent peak). Kick-drum onsets in the low band become gold_fast_fade
+and hi-hat/snare onsets in the high band become white_fastfade.
+
+A frame lights the bracelets only after the driver's settle delay, the UART
+transfer and its air time. Once the low band has a steady tempo, each beat
+is therefore sent that much ahead of the predicted beat. Without a steady
+tempo, cues are sent as soon as the onset is detected. Sends go to a
+one-slot RadioWorker, so a busy radio drops a cue instead of delaying the
+audio loop.
+
+Usage:
+    python3 pixmob_audio.py song.wav                     # play along in real time
+    python3 pixmob_audio.py song.wav --dry-run --fast    # only list onsets and the latency budget
+    arecord -f S16_LE -r 44100 -c 1 | python3 pixmob_audio.py - --rate 44100
+"""
+
+import argparse
+import sys
+import time
+import wave
+from collections import deque
+
+import numpy as np
+
+from pixmob_radio import SEND_SETTLE, airtime, uart_time
+
+BLOCK = 512               # Samples per hop (11.6 ms at 44.1 kHz)
+WINDOW = 1024             # Samples per FFT
+BANDS = {'low': (30.0, 150.0), 'high': (2000.0, 8000.0)}      # Hz
+BAND_COMMANDS = {'low': 'gold_fast_fade', 'high': 'white_fastfade'}
+THRESHOLD_SECONDS = 1.0   # History the adaptive threshold looks at
+THRESHOLD_RATIO = 1.8     # Onset when flux exceeds this multiple of the recent median...
+THRESHOLD_FLOOR = 0.5     # ...and this absolute floor (silence never triggers)...
+PEAK_FRACTION = 0.5       # ...and this share of the band's recent peak (no retriggers on a decay)
+REFRACTORY = 0.1          # Seconds before the same band can trigger again
+COMPRESSION = 100.0       # log(1 + C * magnitude) before the flux
+TEMPO_RANGE = (0.3, 1.2)  # Beat periods considered (200 to 50 BPM)
+TEMPO_ONSETS = 8          # Low-band onsets the tempo is estimated from
+TEMPO_TOLERANCE = 0.08    # Largest relative spread of intervals for a steady tempo
+BEAT_MATCH = 0.1          # Seconds within which a detected kick confirms a predicted beat
+FRAME_BYTES = 18          # Wrapped frame: Waveshare header + 12-byte PIXMOB frame
+
+
+def read_wav(path, block=BLOCK):
+    """(sample rate, iterator of mono float32 blocks) for a PCM WAV file"""
+    reader = wave.open(path, 'rb')
+    width = reader.getsampwidth()
+    channels = reader.getnchannels()
+    dtype = {1: np.uint8, 2: np.int16, 4: np.int32}.get(width)
+    if dtype is None:
+        raise ValueError(f"Unsupported WAV sample width: {width * 8} bits")
+    scale = float(1 << (width * 8 - 1))
+
+    def blocks():
+        with reader:
+            while True:
+                data = reader.readframes(block)
+                if not data:
+                    break
+                samples = np.frombuffer(data, dtype=dtype).astype(np.float32)
+                if width == 1:
+                    samples -= 128.0
+                yield samples.reshape(-1, channels).mean(axis=1) / scale
+
+    return reader.getframerate(), blocks()
+
+
+def read_pcm(stream, channels=1, block=BLOCK):
+    """Iterator of mono float32 blocks from signed 16-bit little-endian PCM"""
+    size = block * channels * 2
+    while True:
+        data = stream.read(size)
+        if not data:
+            break
+        data = data[:len(data) - len(data) % (channels * 2)]
+        samples = np.frombuffer(data, dtype='<i2').astype(np.float32)
+        yield samples.reshape(-1, channels).mean(axis=1) / 32768.0
+
+
+def band_matrix(rate, window=WINDOW, bands=BANDS):
+    """(bands, bins) 0/1 matrix that sums rfft bins into each band"""
+    freqs = np.fft.rfftfreq(window, 1.0 / rate)
+    return np.array([(freqs >= low) & (freqs < high) for low, high in bands.values()], dtype=np.float32)
+
+
+class OnsetDetector:
+    """Streaming spectral-flux onset detector, one block at a time
+
+    Nothing is reported until THRESHOLD_SECONDS of flux history exist, so
+    the threshold is never taken from a handful of blocks of lead-in noise.
+    """
+
+    def __init__(self, rate, block=BLOCK, window=WINDOW, bands=BANDS):
+        self.rate = rate
+        self.block = block
+        self.names = list(bands)
+        self._buffer = np.zeros(window, dtype=np.float32)
+        self._hann = np.hanning(window).astype(np.float32)
+        self._matrix = band_matrix(rate, window, bands)
+        self._previous = None
+        history = max(8, int(THRESHOLD_SECONDS * rate / block))
+        self._history = np.zeros((len(bands), history), dtype=np.float32)
+        self._filled = 0
+        self._column = 0
+        self._last_onset = np.full(len(bands), -np.inf)
+        self.blocks = 0
+
+    @property
+    def delay(self):
+        """Seconds from a sound to the block it is detected in (half a window)"""
+        return len(self._buffer) / 2 / self.rate
+
+    def process(self, samples):
+        """Feed one block; returns [(band, strength)] for the onsets in it"""
+        count = len(samples)
+        self._buffer = np.roll(self._buffer, -count)
+        self._buffer[-count:] = samples
+        self.blocks += 1
+        spectrum = np.log1p(COMPRESSION * np.abs(np.fft.rfft(self._buffer * self._hann)))
+        if self._previous is None:
+            self._previous = spectrum
+            return []
+        flux = self._matrix @ np.maximum(spectrum - self._previous, 0.0)
+        self._previous = spectrum
+
+        recent = self._history[:, :max(self._filled, 1)]
+        threshold = np.maximum(np.median(recent, axis=1) * THRESHOLD_RATIO,
+                               np.maximum(recent.max(axis=1) * PEAK_FRACTION, THRESHOLD_FLOOR))
+        self._history[:, self._column] = flux
+        self._column = (self._column + 1) % self._history.shape[1]
+        warming_up = self._filled < self._history.shape[1]
+        self._filled = min(self._filled + 1, self._history.shape[1])
+        if warming_up:
+            return []
+
+        now = self.blocks * self.block / self.rate
+        hits = (flux > threshold) & (now - self._last_onset >= REFRACTORY)
+        self._last_onset[hits] = now
+        return [(self.names[index], float(flux[index] / threshold[index])) for index in np.flatnonzero(hits)]
+
+
+class BeatTracker:
+    """Tempo from recent kick onsets, and the next beat when the tempo is steady"""
+
+    def __init__(self):
+        self.onsets = deque(maxlen=TEMPO_ONSETS)
+        self.period = None
+
+    def add(self, at):
+        self.onsets.append(at)
+        intervals = np.diff(self.onsets)
+        intervals = intervals[(intervals >= TEMPO_RANGE[0]) & (intervals <= TEMPO_RANGE[1])]
+        self.period = None
+        if len(intervals) >= TEMPO_ONSETS // 2:
+            period = float(np.median(intervals))
+            if np.median(np.abs(intervals - period)) <= TEMPO_TOLERANCE * period:
+                self.period = period
+
+    def next_beat(self, now):
+        """Predicted time of the next beat after now, or None without a steady tempo"""
+        if self.period is None or not self.onsets:
+            return None
+        last = self.onsets[-1]
+        beats = max(1, int(np.ceil((now - last) / self.period)))
+        return last + beats * self.period
+
+    @property
+    def bpm(self):
+        return 60.0 / self.period if self.period else None
+
+
+def transmit_latency(air_speed=2400, nbytes=FRAME_BYTES):
+    """Seconds from handing a frame to sx126x.send() until it has been on air"""
+    return SEND_SETTLE + uart_time(nbytes) + airtime(nbytes, air_speed)
+
+
+class AudioCueGenerator:
+    """Onsets and beats in, timed cues to a RadioWorker (or a list) out"""
+
+    def __init__(self, rate, worker=None, latency=None, block=BLOCK):
+        self.rate = rate
+        self.block = block
+        self.worker = worker
+        self.detector = OnsetDetector(rate, block)
+        self.tracker = BeatTracker()
+        self.latency = transmit_latency() if latency is None else latency
+        self.cues = []            # (wall time, command, kind) of everything sent or logged
+        self.dropped = 0
+        self.processing = []
+        self._predicted = None    # Next beat already sent ahead of time
+        self._beat_due = None     # (send at, beat time)
+
+    def _cue(self, command, now, kind):
+        self.cues.append((now, command, kind))
+        if self.worker is not None and not self.worker.submit(self.worker.frame(command)):
+            self.dropped += 1
+
+    def process(self, samples, arrived, now=None):
+        """Handle one block that became available at time.monotonic() arrived
+
+        now is the current time on the same clock as arrived; it defaults to
+        time.monotonic() and is given explicitly when a file is read faster
+        than real time.
+        """
+        started = time.monotonic()
+        onsets = self.detector.process(samples)
+        heard = arrived - self.detector.delay
+        now = time.monotonic() if now is None else now
+
+        for band, strength in onsets:
+            if band != 'low':
+                self._cue(BAND_COMMANDS[band], now, 'onset')
+                continue
+            self.tracker.add(heard)
+            if self._predicted is not None and abs(heard - self._predicted) <= BEAT_MATCH:
+                continue          # Already lit ahead of time
+            self._cue(BAND_COMMANDS[band], now, 'onset')
+
+        # Send the next beat early enough that it lights on the beat
+        beat = self.tracker.next_beat(heard)
+        if beat is not None and beat != self._predicted:
+            self._beat_due = (beat - self.latency, beat)
+        if self._beat_due is not None and self._beat_due[0] <= now + self.block / self.rate / 2:
+            self._predicted = self._beat_due[1]
+            self._beat_due = None
+            self._cue(BAND_COMMANDS['low'], now, 'beat')
+
+        self.processing.append(time.monotonic() - started)
+
+    def report(self):
+        """Latency budget in seconds and cue counts"""
+        processing = np.array(self.processing or [0.0])
+        block_s = self.block / self.rate
+        budget = {
+            'block': block_s,
+            'analysis': self.detector.delay,
+            'processing_mean': float(processing.mean()),
+            'processing_p99': float(np.percentile(processing, 99)),
+            'processing_max': float(processing.max()),
+            'realtime_factor': float(processing.mean() / block_s),
+            'transmit': self.latency,
+        }
+        budget['reactive_total'] = budget['block'] + budget['analysis'] + budget['processing_p99'] + self.latency
+        kinds = [cue[2] for cue in self.cues]
+        return {'budget': budget, 'onsets': kinds.count('onset'), 'beats': kinds.count('beat'),
+                'dropped': self.dropped, 'bpm': self.tracker.bpm}
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Pulse PIXMOB bracelets on the beat of live audio")
+    parser.add_argument('input', help="WAV file, or - for raw S16_LE PCM on stdin")
+    parser.add_argument('--rate', type=int, default=44100, help="sample rate of stdin PCM")
+    parser.add_argument('--channels', type=int, default=1, help="channels of stdin PCM")
+    parser.add_argument('--port', default='/dev/ttyS0', help="serial port of the radio")
+    parser.add_argument('--freq', type=int, default=868, help="radio frequency in MHz")
+    parser.add_argument('--dry-run', action='store_true', help="do not transmit, only print the cues")
+    parser.add_argument('--fast', action='store_true', help="read a WAV file as fast as possible")
+    args = parser.parse_args()
+
+    live = args.input == '-'
+    if live:
+        # Live input arrives in real time by itself
+        rate, blocks = args.rate, read_pcm(sys.stdin.buffer, args.channels)
+    else:
+        rate, blocks = read_wav(args.input)
+
+    worker = None
+    if not args.dry_run:
+        from pixmob_controller import PIXMOBController
+        from pixmob_multi import RadioWorker
+        controller = PIXMOBController(verbose=False, serial_num=args.port, freq=args.freq)
+        worker = RadioWorker(controller, args.port, queue_size=1)
+        worker.start()
+
+    air_speed = getattr(worker.controller.lora, 'air_speed', 2400) if worker else 2400
+    generator = AudioCueGenerator(rate, worker, transmit_latency(air_speed))
+    print(f"Listening at {rate} Hz, {BLOCK}-sample blocks, transmit latency {generator.latency * 1000:.0f} ms")
+    start = time.monotonic()
+    try:
+        for index, samples in enumerate(blocks):
+            if live:
+                available = now = time.monotonic()
+            else:
+                # Files run on the sample clock, so --fast sees the same beat intervals
+                available = now = start + (index + 1) * BLOCK / rate
+                if not args.fast:
+                    delay = available - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+            count = len(generator.cues)
+            generator.process(samples, available, now)
+            for at, command, kind in generator.cues[count:]:
+                print(f"  {(index + 1) * BLOCK / rate:8.3f}s  {kind:<5} {command}")
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        if worker is not None:
+            worker.stop(drain=False)
+
+    report = generator.report()
+    budget = report['budget']
+    print(f"{report['onsets']} onset cues, {report['beats']} predicted beats, {report['dropped']} dropped (radio busy)"
+          + (f", {report['bpm']:.1f} BPM" if report['bpm'] else ""))
+    print(f"Processing: mean {budget['processing_mean'] * 1000:.2f} ms, p99 {budget['processing_p99'] * 1000:.2f} ms "
+          f"per {budget['block'] * 1000:.1f} ms block ({budget['realtime_factor'] * 100:.1f}% of real time)")
+    print(f"Reactive latency budget: block {budget['block'] * 1000:.1f} + analysis {budget['analysis'] * 1000:.1f} "
+          f"+ processing {budget['processing_p99'] * 1000:.1f} + transmit {budget['transmit'] * 1000:.1f} "
+          f"= {budget['reactive_total'] * 1000:.1f} ms (predicted beats are sent ahead by the transmit part)")
+
+
+if __name__ == "__main__":
+    main()
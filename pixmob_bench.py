@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+PIXMOB Transmit Benchmarks
+Times the send paths and .sub decoding against the simulated radio and checks them against stored baselines
+
+Usage:
+    python3 pixmob_bench.py --save     # record a baseline on this machine
+    python3 pixmob_bench.py --check    # fail if a path got slower than the baseline allows
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+
+import sx126x_sim
+
+# The scripts import sx126x at module level, so the simulation goes in first
+sx126x_sim.install(realtime_mode=False)
+
+from pixmob_controller import PIXMOBController
+from pixmob_decoder import decode_file, decode_sub_file
+from pixmob_frames import wrapped_frame
+from pixmob_official_format import create_waveshare_message
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BASE_DIR, 'benchmarks', 'baseline.json')
+EDITED_CAPTURE = os.path.join(BASE_DIR, 'rf', 'edited_rf_captures', '868Mhz', 'gold_fade_in.sub')
+WILD_CAPTURE = os.path.join(BASE_DIR, 'rf', 'raw_wild_rf_captures',
+                            'cavs_2023_playoffs_game_1_915Mhz', 'RAW_20230415-175742.sub')
+THRESHOLD = 0.25          # Allowed slowdown of p50 over the baseline
+COMMAND = 'gold_fade_in'
+
+
+def _percentile(ordered, share):
+    return ordered[int((len(ordered) - 1) * share)]
+
+
+def measure(func, iterations, warmup=None, radio=None):
+    """Call func repeatedly and return throughput and per-call percentiles in microseconds
+
+    With the simulated radio given, the jitter between consecutive sends is
+    also reported, from the SentFrame timestamps of the timed calls.
+    """
+    for _ in range(warmup if warmup is not None else max(iterations // 10, 1)):
+        func()
+    first = len(radio.sent) if radio is not None else 0
+    samples = []
+    clock = time.perf_counter_ns
+    started = clock()
+    for _ in range(iterations):
+        begin = clock()
+        func()
+        samples.append(clock() - begin)
+    elapsed = (clock() - started) / 1e9
+    samples.sort()
+    result = {
+        'iterations': iterations,
+        'per_second': iterations / elapsed,
+        'p50_us': _percentile(samples, 0.5) / 1e3,
+        'p99_us': _percentile(samples, 0.99) / 1e3,
+    }
+    if radio is not None and len(radio.sent) - first > 1:
+        stamps = [frame.timestamp for frame in radio.sent[first:]]
+        intervals = sorted(later - earlier for earlier, later in zip(stamps, stamps[1:]))
+        result.update(interval_p50_us=_percentile(intervals, 0.5) * 1e6,
+                      interval_p99_us=_percentile(intervals, 0.99) * 1e6,
+                      interval_max_us=intervals[-1] * 1e6)
+    return result
+
+
+def run_benchmarks(scale=1.0):
+    """Run every benchmark, returning {name: result}"""
+    def count(n):
+        return max(int(n * scale), 10)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        controller = PIXMOBController()
+    radio = controller.lora
+    payload = controller.commands[COMMAND]
+    freq = radio.start_freq + radio.offset_freq
+    serialize = wrapped_frame.__wrapped__   # the uncached builder
+    sink = io.StringIO()
+
+    def quiet(func):
+        def call():
+            with contextlib.redirect_stdout(sink):
+                func()
+            sink.seek(0)
+            sink.truncate()
+        return call
+
+    benchmarks = [
+        ('send_pixmob_command', quiet(lambda: controller.send_pixmob_command(COMMAND, repeat=1, interval=0)), 5000),
+        ('send_raw_pixmob_data', quiet(lambda: controller.send_raw_pixmob_data(COMMAND, repeat=1, interval=0)), 5000),
+        ('send_frame', lambda: controller.send_frame(controller.wrapped_frame(COMMAND)), 20000),
+        ('create_waveshare_message', lambda: create_waveshare_message(65535, 868, 0, 868, payload), 100000),
+        ('serialize_uncached', lambda: serialize(65535, freq, 0, freq, payload), 100000),
+        ('decode_edited_sub', lambda: decode_sub_file(EDITED_CAPTURE), 500),
+        ('decode_wild_sub', lambda: decode_file(WILD_CAPTURE), 20),
+    ]
+
+    results = {}
+    for name, func, iterations in benchmarks:
+        radio.sent.clear()
+        results[name] = measure(func, count(iterations), radio=radio)
+    return results
+
+
+def check(results, baseline, threshold=THRESHOLD):
+    """Return the names of benchmarks whose p50 regressed past the threshold"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get('results', {}).get(name)
+        if reference and result['p50_us'] > reference['p50_us'] * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="PIXMOB transmit path benchmarks")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="baseline file to save or check against")
+    parser.add_argument('--save', action='store_true', help="store these results as the baseline")
+    parser.add_argument('--check', action='store_true', help="exit with status 1 on a regression")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="allowed p50 slowdown, 0.25 = 25%%")
+    parser.add_argument('--scale', type=float, default=1.0, help="multiply the iteration counts")
+    args = parser.parse_args()
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+
+    results = run_benchmarks(args.scale)
+
+    print(f"{'benchmark':<26}{'per second':>14}{'p50 us':>11}{'p99 us':>11}{'vs baseline':>13}"
+          f"{'gap p50 us':>13}{'gap p99 us':>13}{'gap max us':>13}")
+    for name, result in results.items():
+        change = ''
+        if baseline and name in baseline.get('results', {}):
+            change = f"{100 * (result['p50_us'] / baseline['results'][name]['p50_us'] - 1):+.0f}%"
+        gaps = ''.join(f"{result[key]:>13.1f}" if key in result else f"{'':>13}"
+                       for key in ('interval_p50_us', 'interval_p99_us', 'interval_max_us'))
+        print(f"{name:<26}{result['per_second']:>14.0f}{result['p50_us']:>11.2f}{result['p99_us']:>11.2f}{change:>13}"
+              + gaps)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as file:
+            json.dump({'machine': platform.machine(), 'python': platform.python_version(),
+                       'results': results}, file, indent=1)
+        print(f"[SUCCESS] Baseline written to {args.baseline}")
+
+    if args.check:
+        if baseline is None:
+            print(f"[ERROR] No baseline at {args.baseline}, run with --save first")
+            sys.exit(1)
+        regressions = check(results, baseline, args.threshold)
+        if regressions:
+            print(f"[ERROR] Slower than baseline by more than {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("[SUCCESS] No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+PIXMOB Catalog Compiler
+Generates every copy of the command bytes from pixmob_commands.json
+
+Outputs:
+    rf/edited_rf_captures/<band>Mhz/<command>.sub   Flipper RAW files for each band
+    radiolib_raspberry/pixmob_commands.h            C++ arrays for main.cpp
+
+The Python scripts read the .sub files through pixmob_catalog.load_catalog,
+so there is no separate Python table to keep in step.
+
+Only outputs whose inputs changed since the last run are rewritten; the
+input hash of each output is kept in a stamp file next to this script.
+
+Usage:
+    python3 pixmob_build.py            # rebuild what changed
+    python3 pixmob_build.py --force    # rebuild everything
+    python3 pixmob_build.py --check    # exit 1 if any output is out of date
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFINITION_PATH = os.path.join(BASE_DIR, 'pixmob_commands.json')
+STAMP_PATH = os.path.join(BASE_DIR, '.pixmob_build.stamp')
+CapturesPath = os.path.join(BASE_DIR, 'rf', 'edited_rf_captures')
+HEADER_PATH = os.path.join(BASE_DIR, 'radiolib_raspberry', 'pixmob_commands.h')
+
+BUILD_VERSION = 1         # Bump when a generator's output format changes
+RAW_LINE_VALUES = 512     # Flipper wraps RAW_Data after this many durations
+SUB_NEWLINES = {868: '\n', 915: '\r\n'}   # Line endings the captures were edited with
+
+
+def load_definition(path=DEFINITION_PATH):
+    """Read and validate the command definition, returning (definition, {name: bytes})"""
+    with open(path, 'r') as file:
+        definition = json.load(file)
+    length = definition['frame_length']
+    commands = {}
+    for name, data in definition['commands'].items():
+        if not name.isidentifier():
+            raise ValueError(f"Command name {name!r} is not a valid identifier")
+        frame = bytes.fromhex(data)
+        if len(frame) != length:
+            raise ValueError(f"Command {name} is {len(frame)} bytes, expected {length}")
+        commands[name] = frame
+    return definition, commands
+
+
+def frame_durations(frame, bit_us):
+    """Flipper RAW durations for a frame: +high / -low runs, trailing low dropped"""
+    bits = ''.join(f'{byte:08b}' for byte in frame).rstrip('0')
+    durations = []
+    run = 1
+    for index in range(1, len(bits) + 1):
+        if index < len(bits) and bits[index] == bits[index - 1]:
+            run += 1
+            continue
+        durations.append(run * bit_us if bits[index - 1] == '1' else -run * bit_us)
+        run = 1
+    return durations
+
+
+def render_sub(frame, band, bit_us):
+    """Contents of a Flipper .sub file that replays one frame"""
+    newline = SUB_NEWLINES.get(band, '\n')
+    durations = frame_durations(frame, bit_us)
+    lines = [
+        'Filetype: Flipper SubGhz RAW File',
+        'Version: 1',
+        f'Frequency: {band * 1000000}',
+        'Preset: FuriHalSubGhzPresetOok650Async',
+        'Protocol: RAW',
+    ]
+    for start in range(0, len(durations), RAW_LINE_VALUES):
+        lines.append('RAW_Data: ' + ' '.join(str(d) for d in durations[start:start + RAW_LINE_VALUES]))
+    return newline.join(lines) + newline
+
+
+def render_header(commands, length):
+    """Contents of radiolib_raspberry/pixmob_commands.h"""
+    lines = [
+        '// Generated by pixmob_build.py from pixmob_commands.json, do not edit by hand',
+        '#pragma once',
+        '',
+        '#include <array>',
+        '#include <cstdint>',
+        '',
+        f'#define PIXMOB_BYTES_COUNT {length}',
+        f'#define PIXMOB_COMMAND_COUNT {len(commands)}',
+        '',
+        'namespace pixmob',
+        '{',
+        '    using Frame = std::array<uint8_t, PIXMOB_BYTES_COUNT>;',
+        '',
+    ]
+    for name, frame in commands.items():
+        values = ', '.join(f'0x{byte:02x}' for byte in frame)
+        lines.append(f'    constexpr Frame {name}{{{{{values}}}}};')
+    lines += [
+        '',
+        '    constexpr std::array<Frame, PIXMOB_COMMAND_COUNT> all{{',
+    ]
+    lines += [f'        {name},' for name in commands]
+    lines += [
+        '    }};',
+        '',
+        '    constexpr std::array<const char *, PIXMOB_COMMAND_COUNT> names{{',
+    ]
+    lines += [f'        "{name}",' for name in commands]
+    lines += [
+        '    }};',
+        '}',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def _digest(*parts):
+    return hashlib.sha1(json.dumps([BUILD_VERSION] + list(parts)).encode()).hexdigest()
+
+
+def plan(definition, commands):
+    """Every output as {path: (input hash, render function)}"""
+    bit_us = definition['bit_us']
+    length = definition['frame_length']
+    table = {name: frame.hex() for name, frame in commands.items()}
+    outputs = {}
+    for band in definition['bands']:
+        folder = os.path.join(CapturesPath, f'{band}Mhz')
+        for name, frame in commands.items():
+            key = _digest('sub', band, bit_us, frame.hex())
+            outputs[os.path.join(folder, f'{name}.sub')] = (
+                key, lambda frame=frame, band=band: render_sub(frame, band, bit_us))
+    outputs[HEADER_PATH] = (_digest('header', length, table), lambda: render_header(commands, length))
+    return outputs
+
+
+def _read_stamp():
+    try:
+        with open(STAMP_PATH, 'r') as file:
+            stamp = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if stamp.get('version') != BUILD_VERSION:
+        return {}
+    return stamp.get('outputs', {})
+
+
+def _write_stamp(outputs):
+    temp_path = STAMP_PATH + '.tmp'
+    with open(temp_path, 'w') as file:
+        json.dump({'version': BUILD_VERSION, 'outputs': outputs}, file, indent=1, sort_keys=True)
+    os.replace(temp_path, STAMP_PATH)
+
+
+def _read_output(path):
+    try:
+        with open(path, 'rb') as file:
+            return file.read()
+    except OSError:
+        return None
+
+
+def _output_digest(path):
+    data = _read_output(path)
+    return None if data is None else hashlib.sha1(data).hexdigest()
+
+
+def build(force=False, check=False, definition_path=DEFINITION_PATH):
+    """Bring every output up to date, returning (rebuilt paths, removed paths)
+
+    An output is regenerated when its input hash differs from the stamp, or
+    when the file on disk was edited or deleted since it was generated.
+    With check=True nothing is written and the stale paths are returned.
+    """
+    definition, commands = load_definition(definition_path)
+    outputs = plan(definition, commands)
+    stamp = _read_stamp()
+    rebuilt = []
+    removed = []
+    new_stamp = {}
+
+    for path, (key, render) in outputs.items():
+        relative = os.path.relpath(path, BASE_DIR)
+        previous = stamp.get(relative)
+        if not force and previous and previous[0] == key and previous[1] == _output_digest(path):
+            new_stamp[relative] = previous
+            continue
+        content = render().encode()
+        existing = _read_output(path)
+        # Some captures were saved without a final newline; that alone is not a change
+        if existing is not None and existing.rstrip(b'\r\n') == content.rstrip(b'\r\n'):
+            content = existing
+        elif not check:
+            with open(path, 'wb') as file:
+                file.write(content)
+        if content is not existing:
+            rebuilt.append(path)
+        new_stamp[relative] = [key, hashlib.sha1(content).hexdigest()]
+
+    # Outputs of commands that were removed from the definition
+    for relative in stamp:
+        path = os.path.join(BASE_DIR, relative)
+        if relative not in new_stamp and os.path.exists(path):
+            removed.append(path)
+            if not check:
+                os.remove(path)
+
+    if not check:
+        _write_stamp(new_stamp)
+    return rebuilt, removed
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Generate the PIXMOB command files from pixmob_commands.json")
+    parser.add_argument('--definition', default=DEFINITION_PATH, help="command definition file")
+    parser.add_argument('--force', action='store_true', help="regenerate every output")
+    parser.add_argument('--check', action='store_true', help="only report outputs that are out of date")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    rebuilt, removed = build(args.force, args.check, args.definition)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    verb = "Out of date" if args.check else "Wrote"
+    for path in rebuilt:
+        print(f"{verb}: {os.path.relpath(path, BASE_DIR)}")
+    for path in removed:
+        print(f"{'Stale' if args.check else 'Removed'}: {os.path.relpath(path, BASE_DIR)}")
+    print(f"{len(rebuilt)} written, {len(removed)} removed in {elapsed:.1f} ms")
+    if args.check and (rebuilt or removed):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+PIXMOB Command Catalog
+Builds the command table from rf/edited_rf_captures once and caches it on disk
+"""
+
+import hashlib
+import json
+import os
+import sys
+from types import MappingProxyType
+
+from pixmob_frames import FRAME_LENGTH
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CapturesPath = os.path.join(BASE_DIR, 'rf', 'edited_rf_captures')
+CACHE_PATH = os.path.join(BASE_DIR, '.pixmob_catalog.cache')
+CACHE_VERSION = 2
+BANDS = (868, 915)
+
+_catalogs = {}
+
+
+def _file_digest(path):
+    with open(path, 'rb') as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+def _read_cache():
+    try:
+        with open(CACHE_PATH, 'r') as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if cache.get('version') != CACHE_VERSION:
+        return {}
+    return cache.get('bands', {})
+
+
+def _write_cache(bands):
+    temp_path = CACHE_PATH + '.tmp'
+    try:
+        with open(temp_path, 'w') as file:
+            json.dump({'version': CACHE_VERSION, 'bands': bands}, file, separators=(',', ':'))
+        os.replace(temp_path, CACHE_PATH)
+    except OSError as e:
+        # A read-only checkout still works, it just decodes on every start
+        print(f"[WARNING] Could not write catalog cache: {e}")
+
+
+def _refresh_band(band, cached):
+    """Bring one band's cache entry in line with its .sub files, returning (entry, changed)"""
+    folder = os.path.join(CapturesPath, f'{band}Mhz')
+    names = sorted(name for name in os.listdir(folder) if name.endswith('.sub'))
+    old_sources = cached.get('sources', {})
+    old_commands = cached.get('commands', {})
+    sources = {}
+    commands = {}
+    changed = set(old_sources) != set(names)
+
+    for name in names:
+        path = os.path.join(folder, name)
+        stat = os.stat(path)
+        command = name[:-len('.sub')]
+        old = old_sources.get(name)
+        if old and old[0] == stat.st_mtime_ns and old[1] == stat.st_size and command in old_commands:
+            sources[name] = old
+            commands[command] = old_commands[command]
+            continue
+
+        # mtime alone is not trusted: a touched but unchanged file keeps its decode
+        digest = _file_digest(path)
+        sources[name] = [stat.st_mtime_ns, stat.st_size, digest]
+        changed = True
+        if old and old[2] == digest and command in old_commands:
+            commands[command] = old_commands[command]
+            continue
+
+        # Only import the NumPy decoder when something actually has to be decoded
+        from pixmob_decoder import decode_sub_file
+        frames = decode_sub_file(path)
+        if frames:
+            # Trailing zero bytes are silence on air and never come back from the decoder
+            commands[command] = frames[0].ljust(FRAME_LENGTH, b'\0').hex()
+
+    return {'sources': sources, 'commands': commands}, changed
+
+
+def catalog_band(freq):
+    """Catalog band whose bracelets a radio tuned to freq MHz talks to"""
+    return min(BANDS, key=lambda band: abs(band - freq))
+
+
+def load_catalog(band=868):
+    """Return the read-only {command name: frame bytes} table for a band
+
+    The table is built at most once per process; across processes it comes
+    from the cache file, which is refreshed when a .sub file's mtime, size or
+    content changes.
+    """
+    catalog = _catalogs.get(band)
+    if catalog is not None:
+        return catalog
+
+    bands = _read_cache()
+    entry, changed = _refresh_band(band, bands.get(str(band), {}))
+    if changed:
+        bands[str(band)] = entry
+        _write_cache(bands)
+
+    catalog = MappingProxyType({name: bytes.fromhex(data) for name, data in entry['commands'].items()})
+    _catalogs[band] = catalog
+    return catalog
+
+
+def main():
+    """Print the catalog for each band"""
+    bands = [int(arg) for arg in sys.argv[1:]] or BANDS
+    for band in bands:
+        catalog = load_catalog(band)
+        print(f"=== {band} MHz: {len(catalog)} commands ===")
+        for name, data in catalog.items():
+            print(f"  {name:<22} {data.hex()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+PIXMOB Checksum Search
+Brute-forces CRC-8/16, sum and XOR checksums over byte ranges of every known frame
+
+A CRC is linear, so over data of one fixed length init and xorout only add a
+constant: crc(d) = crc0(d) ^ C, where crc0 runs with init = xorout = 0. A
+polynomial therefore fits a (data range, checksum field) layout exactly when
+crc0(d) ^ field is the same for every frame, and the init/xorout space never
+has to be searched. The reported constant can be turned back into an init
+value with solve_init().
+
+Usage:
+    python3 pixmob_checksum.py                      # catalog frames only
+    python3 pixmob_checksum.py --wild               # plus frames decoded from the wild captures
+    python3 pixmob_checksum.py --index wild.json    # plus a saved pixmob_dedupe.py index
+"""
+
+import argparse
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pixmob_catalog import BANDS, load_catalog
+from pixmob_dedupe import FrameCatalog, build_catalog
+from pixmob_frames import FRAME_LENGTH
+
+# Assuming the script is run from the project root
+WildPath = './rf/raw_wild_rf_captures/'
+POLY_CHUNK = 4096         # CRC-16 polynomials per pool task
+MIN_COUNT = 10            # Wild frames seen fewer times than this may carry bit errors
+PREAMBLE = b'\xaa\xaa'
+
+Scheme = namedtuple('Scheme', 'kind width poly refin refout start end field constant')
+
+_REFLECT8 = np.array([int(f'{value:08b}'[::-1], 2) for value in range(256)], dtype=np.uint32)
+
+
+def reflect(values, width):
+    """Bit-reverse 8 or 16 bit values"""
+    values = np.asarray(values, dtype=np.uint32)
+    if width == 8:
+        return _REFLECT8[values]
+    return (_REFLECT8[values & 0xff] << 8) | _REFLECT8[values >> 8]
+
+
+def load_frames(index=None, wild=False, min_count=MIN_COUNT, jobs=None):
+    """Catalog frames plus wild frames seen at least min_count times, as an (N, FRAME_LENGTH) array"""
+    frames = {frame for band in BANDS for frame in load_catalog(band).values()}
+    catalog = None
+    if index:
+        catalog = FrameCatalog.load(index)
+    elif wild:
+        catalog = build_catalog([WildPath], jobs=jobs)
+    if catalog is not None:
+        for data, entry in catalog.entries.items():
+            # The decoder drops a trailing zero byte, so 11-byte frames are padded back
+            if entry['count'] >= min_count and data.startswith(PREAMBLE) \
+                    and FRAME_LENGTH - 1 <= len(data) <= FRAME_LENGTH:
+                frames.add(data.ljust(FRAME_LENGTH, b'\0'))
+    return np.array([list(frame) for frame in sorted(frames)], dtype=np.uint32)
+
+
+def crc_tables(width, polys):
+    """MSB-first CRC lookup tables, one row of 256 entries per polynomial"""
+    mask = (1 << width) - 1
+    polys = np.asarray(polys, dtype=np.uint32)[:, None]
+    crc = np.broadcast_to(np.arange(256, dtype=np.uint32) << (width - 8), (len(polys), 256)).copy()
+    for _ in range(8):
+        top = (crc >> (width - 1)) & 1
+        crc = ((crc << 1) & mask) ^ (polys * top)
+    return crc
+
+
+def crc0(data, width, poly, refin=False, refout=False):
+    """CRC of a byte string with init = xorout = 0"""
+    table = crc_tables(width, [poly])[0]
+    mask = (1 << width) - 1
+    reg = 0
+    for byte in data:
+        if refin:
+            byte = int(_REFLECT8[byte])
+        reg = ((reg << 8) & mask) ^ int(table[((reg >> (width - 8)) ^ byte) & 0xff])
+    return int(reflect(reg, width)) if refout else reg
+
+
+def solve_init(width, poly, length, constant, xorout=0, refout=False):
+    """Init values that make a CRC over length bytes carry the reported constant
+
+    Returns every init in the 2**width space (usually exactly one) for the
+    given xorout. The constant is in register bit order, so with refout only
+    xorout needs reflecting.
+    """
+    if refout:
+        xorout = int(reflect(xorout, width))
+    mask = (1 << width) - 1
+    table = crc_tables(width, [poly])[0]
+    reg = np.arange(1 << width, dtype=np.uint32)
+    for _ in range(length):
+        reg = ((reg << 8) & mask) ^ table[(reg >> (width - 8)) & 0xff]
+    return np.flatnonzero((reg ^ xorout) == constant).tolist()
+
+
+def _field_specs(frames, width):
+    """Candidate checksum fields as (label, byte positions, values, refout)"""
+    length = frames.shape[1]
+    specs = []
+    if width == 8:
+        for position in range(length):
+            values = frames[:, position]
+            specs.append((f'[{position}]', {position}, values))
+    else:
+        for position in range(length - 1):
+            high, low = frames[:, position], frames[:, position + 1]
+            positions = {position, position + 1}
+            specs.append((f'[{position}:{position + 2}] big', positions, (high << 8) | low))
+            specs.append((f'[{position}:{position + 2}] little', positions, (low << 8) | high))
+    result = []
+    for label, positions, values in specs:
+        if np.all(values == values[0]):
+            continue        # A constant field fits any checksum over constant data
+        result.append((label, positions, values, False))
+        result.append((label, positions, reflect(values, width), True))
+    return result
+
+
+def search_crc(width, poly_start, poly_stop, frames):
+    """Every (poly, reflection, range, field) CRC layout that fits all frames
+
+    For each start byte the register of all polynomials and frames is
+    advanced one byte at a time, so every end of the data range is checked
+    from a single pass.
+    """
+    polys = np.arange(poly_start, poly_stop, dtype=np.uint32)
+    table = crc_tables(width, polys)
+    rows = np.arange(len(polys))[:, None]
+    mask = (1 << width) - 1
+    length = frames.shape[1]
+    specs = _field_specs(frames, width)
+    found = []
+
+    for refin in (False, True):
+        data = _REFLECT8[frames] if refin else frames
+        for start in range(length):
+            reg = np.zeros((len(polys), len(frames)), dtype=np.uint32)
+            for end in range(start + 1, length + 1):
+                index = ((reg >> (width - 8)) ^ data[None, :, end - 1]) & 0xff
+                reg = ((reg << 8) & mask) ^ table[rows, index]
+                for label, positions, values, refout in specs:
+                    if any(start <= position < end for position in positions):
+                        continue
+                    # Cheap two-frame test first; full check only for the survivors
+                    constant = reg[:, 0] ^ values[0]
+                    candidates = np.flatnonzero((reg[:, 1] ^ values[1]) == constant)
+                    if candidates.size == 0:
+                        continue
+                    fits = ((reg[candidates] ^ values[None, :]) == constant[candidates, None]).all(axis=1)
+                    for candidate in candidates[fits]:
+                        found.append(Scheme('crc', width, int(polys[candidate]), refin, refout,
+                                            start, end, label, int(constant[candidate])))
+    return found
+
+
+def _search_task(task):
+    return search_crc(*task)
+
+
+def search_sums(frames):
+    """Additive and XOR checksums over every byte range that fit all frames"""
+    length = frames.shape[1]
+    found = []
+    specs = {width: [spec for spec in _field_specs(frames, width) if not spec[3]] for width in (8, 16)}
+    for start in range(length):
+        for end in range(start + 1, length + 1):
+            block = frames[:, start:end]
+            total = block.sum(axis=1)
+            xor = np.bitwise_xor.reduce(block, axis=1)
+            for width in (8, 16):
+                mask = (1 << width) - 1
+                checks = [('sum', (total & mask))]
+                if width == 8:
+                    checks.append(('xor', xor))
+                for label, positions, values, _ in specs[width]:
+                    if any(start <= position < end for position in positions):
+                        continue
+                    for kind, checksum in checks:
+                        if kind == 'xor':
+                            residue = values ^ checksum
+                        else:
+                            residue = (values - checksum) & mask
+                        if np.all(residue == residue[0]):
+                            found.append(Scheme(kind, width, None, False, False, start, end, label, int(residue[0])))
+                        if kind == 'sum':
+                            residue = (values + checksum) & mask
+                            if np.all(residue == residue[0]):
+                                found.append(Scheme('negsum', width, None, False, False,
+                                                    start, end, label, int(residue[0])))
+    return found
+
+
+def search(frames, widths=(8, 16), jobs=None):
+    """Run the CRC search for each width on a process pool, plus the sum/XOR search"""
+    tasks = []
+    for width in widths:
+        chunk = POLY_CHUNK if width > 8 else 1 << width
+        tasks += [(width, start, min(start + chunk, 1 << width), frames)
+                  for start in range(1, 1 << width, chunk)]
+    found = search_sums(frames)
+    if jobs == 1:
+        for result in map(_search_task, tasks):
+            found.extend(result)
+        return found
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for result in pool.map(_search_task, tasks):
+            found.extend(result)
+    return found
+
+
+def describe(scheme):
+    """One-line description of a matching scheme"""
+    where = f"bytes[{scheme.start}:{scheme.end}] -> {scheme.field}"
+    if scheme.kind != 'crc':
+        return f"{scheme.kind}{scheme.width:<3} {where}, constant 0x{scheme.constant:0{scheme.width // 4}x}"
+    return (f"crc{scheme.width:<3} poly 0x{scheme.poly:0{scheme.width // 4}x} refin={scheme.refin!s:<5} "
+            f"refout={scheme.refout!s:<5} {where}, init/xorout constant 0x{scheme.constant:0{scheme.width // 4}x}")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Search for a checksum consistent with every known PIXMOB frame")
+    parser.add_argument('--index', help="JSON frame index from pixmob_dedupe.py to add wild frames from")
+    parser.add_argument('--wild', action='store_true', help=f"decode {WildPath} and add its frames")
+    parser.add_argument('--min-count', type=int, default=MIN_COUNT,
+                        help="only use wild frames seen at least this many times")
+    parser.add_argument('--width', type=int, action='append', choices=(8, 16),
+                        help="CRC width to search, repeatable (default: 8 and 16)")
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--limit', type=int, default=50, help="number of schemes to list")
+    args = parser.parse_args()
+
+    frames = load_frames(args.index, args.wild, args.min_count, args.jobs)
+    print(f"Searching {len(frames)} distinct {FRAME_LENGTH}-byte frames")
+
+    started = time.perf_counter()
+    found = search(frames, tuple(args.width or (8, 16)), args.jobs)
+    elapsed = time.perf_counter() - started
+
+    # Widest checksum over the longest range first: the least likely to be a coincidence
+    found.sort(key=lambda scheme: (-scheme.width, -(scheme.end - scheme.start), scheme.kind, scheme.poly or 0))
+    print(f"{len(found)} consistent schemes in {elapsed:.1f}s")
+    for scheme in found[:args.limit]:
+        print(f"  {describe(scheme)}")
+    if len(found) > args.limit:
+        print(f"  ... {len(found) - args.limit} more")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,18 +7,43 @@ Controls PIXMOB bracelets using LoRa SX126X HAT
 import sys
 import time
 import os
+import threading
 import sx126x
+from pixmob_catalog import catalog_band, load_catalog
+from pixmob_frames import BROADCAST_ADDR, TARGET_SIZE, pack_frames, wrapped_frame
+from pixmob_keepalive import KeepAlive
+from pixmob_metrics import TransmitMetrics
+from pixmob_radio import MAX_PACKET, airtime
+from pixmob_show import compile_show, print_report, run_show, show_from_sequence
+
+WAKE_COMMANDS = ['nothing', 'white_fastfade', 'gold_fade_in']
+
+DEMO_SHOW = [
+    ('gold_fade_in', 'Gold Fade In'),
+    ('white_fastfade', 'White Fast Fade'),
+    ('rand_blue_fade', 'Blue Fade'),
+    ('rand_red_fade', 'Red Fade'),
+    ('rand_turq_blink', 'Turquoise Blink'),
+    ('rand_white_blink', 'White Blink'),
+    ('wine_fade_in', 'Wine Fade In'),
+    ('nothing', 'Turn Off')
+]
 
 class PIXMOBController:
-    def __init__(self):
-        """Initialize PIXMOB controller with LoRa module"""
+    def __init__(self, verbose=True, serial_num="/dev/ttyS0", freq=868):
+        """Initialize PIXMOB controller with LoRa module
+        
+        verbose=False drops the per-transmission prints; the counters in
+        self.metrics are kept either way. serial_num and freq select the
+        radio, and freq also picks the 868 or 915 MHz command table.
+        """
         print("=== PIXMOB Controller Initialization ===")
         
         # Initialize LoRa with PIXMOB-compatible settings
         try:
             self.lora = sx126x.sx126x(
-                serial_num="/dev/ttyS0",
-                freq=868,           # 868 MHz - same as PIXMOB
+                serial_num=serial_num,
+                freq=freq,          # 868 or 915 MHz, the band of the bracelets
                 addr=0,             # Address 0
                 power=22,           # Maximum power for better range
                 rssi=True,          # Enable RSSI for debugging
@@ -32,29 +57,92 @@ class PIXMOBController:
         except Exception as e:
             print(f"[ERROR] Failed to initialize LoRa: {e}")
             raise
+        
+        # Command table is loaded once and shared with the other PIXMOB scripts
+        self.commands = load_catalog(catalog_band(freq))
+        
+        # Serializes access to the radio between callers and the keep-alive engine
+        self.tx_lock = threading.Lock()
+        self.keepalive = None
+        
+        # Send counters and interval histograms per command and band
+        self.verbose = verbose
+        self.metrics = TransmitMetrics(self.commands)
     
     def get_pixmob_commands(self):
-        """Get PIXMOB command data from your converted .sub files"""
-        # These are the hex patterns from your PIXMOB.py conversion
-        # Each represents a different lighting pattern/color
-        commands = {
-            'gold_fade_in': bytes([0xaa, 0xaa, 0x65, 0x21, 0x24, 0x6d, 0x61, 0x23, 0x11, 0x61, 0x2b, 0x40]),
-            'gold_fast_fade': bytes([0xaa, 0xaa, 0x5b, 0x61, 0x24, 0x6d, 0x61, 0x12, 0x51, 0x61, 0x22, 0x80]),
-            'white_fastfade': bytes([0xaa, 0xaa, 0x56, 0xa1, 0x2d, 0x6d, 0x6d, 0x52, 0x51, 0x61, 0x0b]),
-            'wine_fade_in': bytes([0xaa, 0xaa, 0x69, 0xa1, 0x21, 0x2d, 0x61, 0x23, 0x11, 0x61, 0x28, 0x40]),
-            'nothing': bytes([0xaa, 0xaa, 0x55, 0xa1, 0x21, 0x21, 0x21, 0x18, 0x8d, 0xa1, 0x0a, 0x40]),
-            
-            # Additional patterns from your RF captures
-            'rand_blue_fade': bytes([0xaa, 0xaa, 0x61, 0x21, 0x0c, 0xa1, 0x2d, 0x62, 0x62, 0x61, 0x0d, 0x80]),
-            'rand_red_fade': bytes([0xaa, 0xaa, 0x69, 0x21, 0x21, 0x2d, 0x61, 0x22, 0x62, 0x61, 0x19, 0x40]),
-            'rand_white_blink': bytes([0xaa, 0xaa, 0x52, 0xa1, 0x2d, 0x6d, 0x6d, 0x59, 0x1a, 0xa1, 0x22, 0x40]),
-            'rand_turq_blink': bytes([0xaa, 0xaa, 0x4d, 0xa1, 0x2d, 0x61, 0x2c, 0x6d, 0x93, 0x61, 0x24, 0x40]),
-        }
-        return commands
+        """Get PIXMOB command data decoded from the .sub files in rf/edited_rf_captures"""
+        return self.commands
+    
+    def wrapped_frame(self, command_name, target_addr=BROADCAST_ADDR):
+        """Pre-serialized Waveshare frame carrying a command, cached per destination"""
+        freq = self.band()
+        return wrapped_frame(target_addr, freq, self.lora.addr, freq, self.commands[command_name])
+    
+    def band(self):
+        """Frequency the radio is currently tuned to, in MHz"""
+        return self.lora.start_freq + self.lora.offset_freq
+    
+    def send_frame(self, frame):
+        """Write an already serialized frame to the radio, preempting keep-alives"""
+        keepalive = self.keepalive
+        if keepalive is not None:
+            keepalive.preempt()
+        with self.tx_lock:
+            # Recorded under the lock so events are queued in the order the frames were sent
+            try:
+                self.lora.send(frame)
+            except Exception:
+                self.metrics.record(frame, self.band(), ok=False)
+                raise
+            self.metrics.record(frame, self.band())
     
-    def send_pixmob_command(self, command_name, repeat=3):
+    def send_many(self, frames, spacing=0.0, wrapped=False, packet_size=MAX_PACKET):
+        """Send frames in order using as few serial writes as possible
+        
+        When spacing is no longer than a frame's own air time the frames would
+        go out back to back anyway, so they are packed into writes of up to
+        packet_size bytes (wrapped frames share one target address and
+        channel per write, and keep their own source bytes). Otherwise
+        each frame is written on its own, spacing seconds apart.
+        Returns counts of frames, writes and bytes, and how many were saved.
+        """
+        frames = [bytes(frame) for frame in frames]
+        stats = {'frames': len(frames), 'writes': 0, 'bytes': 0}
+        if frames:
+            air_speed = getattr(self.lora, 'air_speed', 2400)
+            if spacing <= airtime(max(len(frame) for frame in frames), air_speed):
+                for packet in pack_frames(frames, TARGET_SIZE if wrapped else 0, packet_size):
+                    self.send_frame(packet)
+                    stats['writes'] += 1
+                    stats['bytes'] += len(packet)
+            else:
+                # Deadlines from the start, so time spent in send() does not add up
+                start = time.monotonic()
+                for index, frame in enumerate(frames):
+                    delay = start + index * spacing - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    self.send_frame(frame)
+                    stats['writes'] += 1
+                    stats['bytes'] += len(frame)
+        stats['writes_saved'] = stats['frames'] - stats['writes']
+        stats['bytes_saved'] = sum(len(frame) for frame in frames) - stats['bytes']
+        return stats
+    
+    def toggle_keepalive(self):
+        """Start or stop the background keep-alive engine"""
+        if self.keepalive is not None:
+            keepalive = self.keepalive
+            keepalive.stop()
+            keepalive.report()
+            print("[INFO] Keep-alive stopped")
+        else:
+            KeepAlive(self).start()
+            print("[INFO] Keep-alive running in the background")
+    
+    def send_pixmob_command(self, command_name, repeat=3, interval=0.5):
         """Send a PIXMOB command with proper LoRa packet format"""
-        commands = self.get_pixmob_commands()
+        commands = self.commands
         
         if command_name not in commands:
             print(f"[ERROR] Unknown command: {command_name}")
@@ -67,21 +155,15 @@ class PIXMOBController:
         print(f"Repeating {repeat} times for better reception...")
         
         try:
+            # LoRa packet in the format expected by your module,
+            # broadcast to all PIXMOB devices and built only once
+            packet_data = self.wrapped_frame(command_name)
+            
             for i in range(repeat):
-                # Create LoRa packet in the format expected by your module
-                # Broadcast to all PIXMOB devices
-                target_addr = 65535  # Broadcast address
-                packet_data = (bytes([target_addr >> 8]) + 
-                              bytes([target_addr & 0xff]) + 
-                              bytes([self.lora.offset_freq]) + 
-                              bytes([self.lora.addr >> 8]) + 
-                              bytes([self.lora.addr & 0xff]) + 
-                              bytes([self.lora.offset_freq]) + 
-                              command_data)
-                
-                self.lora.send(packet_data)
-                print(f"  [SENT] Transmission {i+1}/{repeat}")
-                time.sleep(0.5)  # Wait between transmissions
+                self.send_frame(packet_data)
+                if self.verbose:
+                    print(f"  [SENT] Transmission {i+1}/{repeat}")
+                time.sleep(interval)  # Wait between transmissions
             
             print(f"[SUCCESS] PIXMOB command '{command_name}' transmitted!")
             return True
@@ -90,9 +172,9 @@ class PIXMOBController:
             print(f"[ERROR] Failed to send command: {e}")
             return False
     
-    def send_raw_pixmob_data(self, command_name, repeat=3):
+    def send_raw_pixmob_data(self, command_name, repeat=3, interval=0.3):
         """Send raw PIXMOB data without LoRa packet wrapper"""
-        commands = self.get_pixmob_commands()
+        commands = self.commands
         
         if command_name not in commands:
             print(f"[ERROR] Unknown command: {command_name}")
@@ -105,9 +187,10 @@ class PIXMOBController:
         try:
             for i in range(repeat):
                 # Send raw data directly without LoRa packet format
-                self.lora.send(command_data)
-                print(f"  [SENT] Raw transmission {i+1}/{repeat}")
-                time.sleep(0.3)
+                self.send_frame(command_data)
+                if self.verbose:
+                    print(f"  [SENT] Raw transmission {i+1}/{repeat}")
+                time.sleep(interval)
             
             print(f"[SUCCESS] Raw PIXMOB data '{command_name}' transmitted!")
             return True
@@ -121,9 +204,7 @@ class PIXMOBController:
         print("\n=== PIXMOB Wake-Up Sequence ===")
         
         # Try multiple wake-up approaches
-        wake_commands = ['nothing', 'white_fastfade', 'gold_fade_in']
-        
-        for cmd in wake_commands:
+        for cmd in WAKE_COMMANDS:
             print(f"Sending wake-up command: {cmd}")
             self.send_pixmob_command(cmd, repeat=2)
             time.sleep(1)
@@ -134,21 +215,11 @@ class PIXMOBController:
         """Run a demo light show with different colors/patterns"""
         print("\n=== PIXMOB Demo Light Show ===")
         
-        show_sequence = [
-            ('gold_fade_in', 'Gold Fade In'),
-            ('white_fastfade', 'White Fast Fade'),
-            ('rand_blue_fade', 'Blue Fade'),
-            ('rand_red_fade', 'Red Fade'),
-            ('rand_turq_blink', 'Turquoise Blink'),
-            ('rand_white_blink', 'White Blink'),
-            ('wine_fade_in', 'Wine Fade In'),
-            ('nothing', 'Turn Off')
-        ]
-        
-        for cmd, description in show_sequence:
-            print(f"\n--- {description} ---")
-            self.send_pixmob_command(cmd, repeat=2)
-            time.sleep(3)  # Wait to see the effect
+        # Cues run on fixed deadlines, so transmit time no longer adds up between effects
+        band = catalog_band(self.band())
+        schedule = compile_show(show_from_sequence(DEMO_SHOW, band=band))
+        report = run_show(schedule, {band: self})
+        print_report(report)
         
         print("\n[SUCCESS] Demo light show completed!")
 
@@ -168,9 +239,11 @@ def main():
             print("3. Run demo light show")
             print("4. Send raw PIXMOB data (alternative method)")
             print("5. List available commands")
-            print("6. Exit")
+            print("6. Start/stop background keep-alive")
+            print("7. Show transmit metrics")
+            print("8. Exit")
             
-            choice = input("\nEnter your choice (1-6): ").strip()
+            choice = input("\nEnter your choice (1-8): ").strip()
             
             if choice == "1":
                 controller.wake_up_pixmob()
@@ -203,11 +276,22 @@ def main():
                     print(f"  {i}. {cmd}")
                     
             elif choice == "6":
+                controller.toggle_keepalive()
+                    
+            elif choice == "7":
+                lines = controller.metrics.summary()
+                print("\n=== Transmit Metrics ===")
+                for line in lines or ["Nothing sent yet"]:
+                    print(f"  {line}")
+                    
+            elif choice == "8":
+                if controller.keepalive is not None:
+                    controller.toggle_keepalive()
                 print("Exiting PIXMOB controller...")
                 break
                 
             else:
-                print("Invalid choice. Please enter 1-6.")
+                print("Invalid choice. Please enter 1-8.")
                 
     except KeyboardInterrupt:
         print("\nProgram interrupted by user.")
@@ -6,29 +6,28 @@ Properly wakes up PIXMOB bracelets and debugs transmission
 
 import sys
 import time
-import sx126x
+from pixmob_catalog import load_catalog
+from pixmob_frames import BROADCAST_ADDR, wrapped_frame
+from pixmob_metrics import TransmitMetrics
+from pixmob_radio import RadioSession
 
 def pixmob_wake_and_test():
     """Proper PIXMOB wake-up sequence followed by color test"""
     print("=== PIXMOB Debug & Wake-Up Test ===")
     
     try:
-        # Initialize LoRa
+        # Initialize LoRa (opened once per run and shared with the other modes)
         print("Initializing LoRa for PIXMOB...")
-        lora = sx126x.sx126x(
-            serial_num="/dev/ttyS0",
-            freq=868,
-            addr=0,
-            power=22,           # Maximum power
-            rssi=False,         # Disable RSSI for cleaner output
-            air_speed=2400,
-            relay=False
-        )
+        lora = RadioSession.get().radio(freq=868, power=22, air_speed=2400)
         print(f"[SUCCESS] LoRa initialized at {lora.start_freq + lora.offset_freq} MHz")
         
         # PIXMOB commands
-        wake_up_cmd = bytes([0xaa, 0xaa, 0x55, 0xa1, 0x21, 0x21, 0x21, 0x18, 0x8d, 0xa1, 0x0a, 0x40])  # nothing
-        gold_cmd = bytes([0xaa, 0xaa, 0x65, 0x21, 0x24, 0x6d, 0x61, 0x23, 0x11, 0x61, 0x2b, 0x40])     # gold_fade_in
+        commands = load_catalog(868)
+        wake_up_cmd = commands['nothing']
+        gold_cmd = commands['gold_fade_in']
+        
+        freq = lora.start_freq + lora.offset_freq
+        wake_up_packet = wrapped_frame(BROADCAST_ADDR, freq, lora.addr, freq, wake_up_cmd)
         
         print(f"Wake-up command: {wake_up_cmd.hex()}")
         print(f"Gold command: {gold_cmd.hex()}")
@@ -54,15 +53,7 @@ def pixmob_wake_and_test():
             
             # Method 2: LoRa packet format every 10th transmission
             if transmissions_sent % 10 == 0:
-                target_addr = 65535  # Broadcast
-                packet_data = (bytes([target_addr >> 8]) + 
-                              bytes([target_addr & 0xff]) + 
-                              bytes([lora.offset_freq]) + 
-                              bytes([lora.addr >> 8]) + 
-                              bytes([lora.addr & 0xff]) + 
-                              bytes([lora.offset_freq]) + 
-                              wake_up_cmd)
-                lora.send(packet_data)
+                lora.send(wake_up_packet)
                 transmissions_sent += 1
             
             # Progress indicator
@@ -96,9 +87,9 @@ def pixmob_wake_and_test():
             print("\n=== PHASE 3: Testing More Colors ===")
             
             more_commands = {
-                'white': bytes([0xaa, 0xaa, 0x56, 0xa1, 0x2d, 0x6d, 0x6d, 0x52, 0x51, 0x61, 0x0b]),
-                'blue': bytes([0xaa, 0xaa, 0x61, 0x21, 0x0c, 0xa1, 0x2d, 0x62, 0x62, 0x61, 0x0d, 0x80]),
-                'red': bytes([0xaa, 0xaa, 0x69, 0x21, 0x21, 0x2d, 0x61, 0x22, 0x62, 0x61, 0x19, 0x40]),
+                'white': commands['white_fastfade'],
+                'blue': commands['rand_blue_fade'],
+                'red': commands['rand_red_fade'],
             }
             
             for color_name, color_cmd in more_commands.items():
@@ -208,35 +199,34 @@ def continuous_wake_mode():
     print("Press Ctrl+C to stop")
     
     try:
-        lora = sx126x.sx126x(
-            serial_num="/dev/ttyS0",
-            freq=868,
-            addr=0,
-            power=22,
-            rssi=False,
-            air_speed=2400,
-            relay=False
-        )
+        lora = RadioSession.get().radio(freq=868, power=22, air_speed=2400)
         
-        wake_cmd = bytes([0xaa, 0xaa, 0x55, 0xa1, 0x21, 0x21, 0x21, 0x18, 0x8d, 0xa1, 0x0a, 0x40])
+        commands = load_catalog(868)
+        wake_cmd = commands['nothing']
+        band = lora.start_freq + lora.offset_freq
+        metrics = TransmitMetrics(commands)
         
         transmissions = 0
-        start_time = time.time()
         
         while True:
-            lora.send(wake_cmd)
+            try:
+                lora.send(wake_cmd)
+            except Exception:
+                metrics.record(wake_cmd, band, ok=False)
+                raise
+            metrics.record(wake_cmd, band)
             transmissions += 1
             
             if transmissions % 50 == 0:
-                elapsed = time.time() - start_time
-                rate = transmissions / elapsed
-                print(f"Continuous wake: {transmissions} transmissions in {elapsed:.0f}s ({rate:.1f}/s)")
+                for line in metrics.summary():
+                    print(f"Continuous wake: {line}")
             
             time.sleep(0.1)  # 10 transmissions per second
             
     except KeyboardInterrupt:
-        elapsed = time.time() - start_time
-        print(f"\nStopped. Sent {transmissions} wake signals in {elapsed:.0f}s")
+        print("\nStopped.")
+        for line in metrics.summary():
+            print(f"  {line}")
     except Exception as e:
         print(f"Error: {e}")
 
@@ -253,7 +243,8 @@ if __name__ == "__main__":
     
     choice = input("Choose mode:\n1. Full debug test\n2. Continuous wake mode\nEnter 1 or 2: ").strip()
     
-    if choice == "2":
-        continuous_wake_mode()
-    else:
-        pixmob_wake_and_test() 
\ No newline at end of file
+    with RadioSession.get():
+        if choice == "2":
+            continuous_wake_mode()
+        else:
+            pixmob_wake_and_test() 
\ No newline at end of file
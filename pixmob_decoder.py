@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+PIXMOB RF Capture Decoder
+Turns Flipper RAW_Data timings from .sub files into packed PIXMOB frame bytes
+"""
+
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pixmob_stream import GAP_US, RawReader
+
+UNIT_US = 510           # PIXMOB OOK bit cell, see rf/README.md
+UNIT_RANGE = (300, 1000)  # Plausible bit cell lengths for the estimator
+BIN_US = 5              # Histogram resolution of the unit estimator
+MAX_CELLS = 8           # Widths beyond this many cells are ignored by the estimator
+UNIT_TOLERANCE = 0.1    # Estimates further than this share from UNIT_US are not a PIXMOB cell
+MIN_CONFIDENCE = 0.6    # Estimates fitting the histogram worse than this are not trusted
+
+Frame = namedtuple('Frame', 'data confidence timestamp_us offset')
+DecodedFile = namedtuple('DecodedFile', 'path unit confidence frames')
+
+
+class UnitEstimator:
+    """Estimate the bit cell length of a recording from a pulse width histogram
+
+    Widths are accumulated block by block, so long recordings never have to be
+    held in memory. The tallest histogram peak is taken as one cell and then
+    refined with a least-squares fit of every width to its nearest multiple.
+    """
+
+    def __init__(self):
+        # Bins are centred on multiples of BIN_US so clean captures estimate exactly
+        self.edges = np.arange(BIN_US / 2, UNIT_RANGE[1] * MAX_CELLS + BIN_US, BIN_US)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+
+    def add(self, durations):
+        """Add a block of signed durations to the histogram"""
+        widths = np.abs(np.asarray(durations, dtype=np.int64))
+        self.counts += np.histogram(widths, bins=self.edges)[0]
+
+    def estimate(self, default=UNIT_US):
+        """Return (unit_us, confidence), falling back to default without data
+
+        An estimate outside UNIT_TOLERANCE of UNIT_US, or with a confidence
+        below MIN_CONFIDENCE, comes from noise or a different protocol and
+        also falls back to (default, 0.0).
+        """
+        unit, confidence = self._fit()
+        if unit is None or abs(unit - UNIT_US) > UNIT_TOLERANCE * UNIT_US or confidence < MIN_CONFIDENCE:
+            return float(default), 0.0
+        return unit, confidence
+
+    def _fit(self):
+        """(unit_us, confidence) of the best fitting cell length, or (None, 0.0) without data"""
+        centers = (self.edges[:-1] + self.edges[1:]) / 2
+        counts = self.counts.astype(np.float64)
+        single = (centers >= UNIT_RANGE[0]) & (centers <= UNIT_RANGE[1])
+        if counts[single].sum() == 0:
+            return None, 0.0
+
+        unit = centers[single][np.argmax(counts[single])]
+        # A peak at 1.5 cells means the tallest peak was really two cells
+        half = unit / 2
+        ratio = centers / half
+        on_half = np.abs(ratio - np.rint(ratio)) < 0.2
+        odd = on_half & (np.rint(ratio) % 2 == 1) & (ratio > 2)
+        if counts[odd].sum() > 0.25 * counts[on_half & (ratio > 1.5)].sum():
+            unit = half
+
+        for _ in range(3):
+            cells = np.rint(centers / unit)
+            used = (cells >= 1) & (cells <= MAX_CELLS)
+            weights = counts[used]
+            unit = (weights * centers[used] * cells[used]).sum() / (weights * cells[used] ** 2).sum()
+
+        cells = np.rint(centers / unit)
+        used = (cells >= 1) & (cells <= MAX_CELLS) & (counts > 0)
+        error = np.abs(centers[used] / unit - cells[used])
+        confidence = 1 - 2 * (counts[used] * error).sum() / counts[used].sum()
+        return float(unit), float(max(confidence, 0.0))
+
+
+def estimate_unit(durations, default=UNIT_US):
+    """Estimate (unit_us, confidence) for an array of signed durations"""
+    estimator = UnitEstimator()
+    estimator.add(durations)
+    return estimator.estimate(default)
+
+
+def quantize(durations, unit=UNIT_US):
+    """Round signed durations to whole cells, returning (cells, confidence)
+
+    Every pulse keeps at least one cell so jitter can never drop a level.
+    Confidence is 1 when all widths sit on exact multiples of the unit and
+    falls to 0 when they sit halfway between two multiples on average.
+    """
+    durations = np.asarray(durations, dtype=np.int64)
+    ratio = durations / unit
+    cells = np.rint(ratio).astype(np.int64)
+    cells = np.where(durations > 0, np.maximum(cells, 1), np.minimum(cells, -1))
+    if len(durations) == 0:
+        return cells, 0.0
+    error = np.abs(ratio - np.rint(ratio)).mean()
+    return cells, float(max(1 - 2 * error, 0.0))
+
+
+def durations_to_bits(durations, unit=UNIT_US):
+    """Expand signed durations into a 0/1 array of bit cells, returning (bits, confidence)"""
+    cells, confidence = quantize(durations, unit)
+    levels = (cells > 0).astype(np.uint8)
+    return np.repeat(levels, np.abs(cells)), confidence
+
+
+def decode_durations(durations, unit=UNIT_US):
+    """Decode signed durations into (frame bytes, confidence), zero-padding the last byte"""
+    bits, confidence = durations_to_bits(durations, unit)
+    return np.packbits(bits).tobytes(), confidence
+
+
+def decode_file(path, unit=None, gap_us=GAP_US):
+    """Decode a .sub file into a DecodedFile, estimating the unit when it is None"""
+    confidence = 1.0
+    if unit is None:
+        estimator = UnitEstimator()
+        for block in RawReader(path).blocks():
+            estimator.add(block)
+        unit, confidence = estimator.estimate()
+
+    frames = []
+    for segment in RawReader(path).segments(gap_us):
+        data, frame_confidence = decode_durations(segment.durations, unit)
+        frames.append(Frame(data, frame_confidence, segment.timestamp_us, segment.offset))
+    return DecodedFile(path, unit, confidence, frames)
+
+
+def decode_sub_file(path, unit=UNIT_US, gap_us=GAP_US):
+    """Decode every frame found in a .sub file"""
+    return [frame.data for frame in decode_file(path, unit, gap_us).frames]
+
+
+def decode_archive(paths, unit=None, gap_us=GAP_US, jobs=None):
+    """Decode every .sub file under paths on a process pool, yielding DecodedFiles in order"""
+    files = find_sub_files(paths)
+    if jobs == 1:
+        for path in files:
+            yield decode_file(path, unit, gap_us)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(decode_file, files, [unit] * len(files), [gap_us] * len(files))
+
+
+def find_sub_files(paths):
+    """Expand files and directories into a sorted list of .sub files"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                found.extend(os.path.join(root, name) for name in sorted(files)
+                             if name.endswith('.sub'))
+        else:
+            found.append(path)
+    return found
+
+
+def format_c_array(frame, name):
+    """Format a frame like the ColorArrayArray entries in radiolib_raspberry/main.cpp"""
+    return '// {' + ','.join(hex(byte) for byte in frame) + '}, //' + name
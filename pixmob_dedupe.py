@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+PIXMOB Frame Deduplication
+Splits captures into frames, hashes them and keeps one catalog entry per distinct frame
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+from pixmob_decoder import GAP_US, decode_archive
+from pixmob_label import HammingIndex
+
+# Assuming the script is run from the project root
+CapturesPath = './rf/raw_wild_rf_captures/'
+INDEX_VERSION = 1
+
+
+def frame_hash(data):
+    """Stable short hash of a decoded frame"""
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+class FrameCatalog:
+    """Canonical set of distinct frames with occurrence counts and first/last sightings"""
+
+    def __init__(self):
+        self.entries = {}
+
+    def add(self, data, path, timestamp_us, offset, confidence=1.0):
+        """Record one occurrence of a frame"""
+        sighting = {'path': path, 'timestamp_us': timestamp_us, 'offset': offset}
+        entry = self.entries.get(data)
+        if entry is None:
+            self.entries[data] = {
+                'hash': frame_hash(data),
+                'count': 1,
+                'confidence': confidence,
+                'first': sighting,
+                'last': sighting,
+            }
+            return
+        entry['count'] += 1
+        # Running mean keeps the entry constant-size however often the frame repeats
+        entry['confidence'] += (confidence - entry['confidence']) / entry['count']
+        entry['last'] = sighting
+
+    def add_decoded(self, decoded, min_confidence=0.0):
+        """Record every frame of a pixmob_decoder.DecodedFile"""
+        for frame in decoded.frames:
+            if frame.confidence >= min_confidence:
+                self.add(frame.data, decoded.path, frame.timestamp_us, frame.offset, frame.confidence)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, data):
+        return data in self.entries
+
+    def most_common(self, n=None):
+        """Return (data, entry) pairs ordered by occurrence count"""
+        ranked = sorted(self.entries.items(), key=lambda item: item[1]['count'], reverse=True)
+        return ranked if n is None else ranked[:n]
+
+    def save(self, path):
+        """Write the catalog as a JSON index"""
+        frames = []
+        for data, entry in self.most_common():
+            frames.append(dict(entry, data=data.hex(), length=len(data)))
+        with open(path, 'w') as file:
+            json.dump({'version': INDEX_VERSION, 'frames': frames}, file, indent=1)
+
+    @classmethod
+    def load(cls, path):
+        """Read a JSON index written by save()"""
+        with open(path, 'r') as file:
+            index = json.load(file)
+        if index.get('version') != INDEX_VERSION:
+            raise ValueError(f"Unsupported frame index version in {path}")
+        catalog = cls()
+        for frame in index['frames']:
+            data = bytes.fromhex(frame.pop('data'))
+            frame.pop('length', None)
+            catalog.entries[data] = frame
+        return catalog
+
+
+def build_catalog(paths, unit=None, gap_us=GAP_US, min_confidence=0.0, jobs=None):
+    """Decode every capture under paths in parallel and dedupe the frames"""
+    catalog = FrameCatalog()
+    for decoded in decode_archive(paths, unit, gap_us, jobs):
+        catalog.add_decoded(decoded, min_confidence)
+    return catalog
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('paths', nargs='*', default=[CapturesPath],
+                        help=f".sub files or folders to index (default: {CapturesPath})")
+    parser.add_argument('-o', '--output', help="write the JSON frame index here")
+    parser.add_argument('--min-confidence', type=float, default=0.0,
+                        help="skip frames decoded with lower confidence")
+    parser.add_argument('--unit', type=int, default=None,
+                        help="bit cell length in microseconds (default: estimated per file)")
+    parser.add_argument('--gap', type=int, default=GAP_US, help="low period in microseconds that ends a frame")
+    parser.add_argument('--jobs', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--top', type=int, default=20, help="number of frames to list")
+    args = parser.parse_args()
+
+    catalog = build_catalog(args.paths, args.unit, args.gap, args.min_confidence, args.jobs)
+    total = sum(entry['count'] for entry in catalog.entries.values())
+    print(f"{total} frames, {len(catalog)} distinct")
+    top = catalog.most_common(args.top)
+    matches = HammingIndex.from_catalog().label([data for data, _ in top])
+    for (data, entry), match in zip(top, matches):
+        first = os.path.basename(entry['first']['path'])
+        print(f"  {entry['hash']} x{entry['count']:<5} {data.hex()}  {match.label or '?'} "
+              f"(confidence {entry['confidence']:.2f}, first seen {first} @ {entry['first']['timestamp_us'] / 1e6:.2f}s)")
+
+    if args.output:
+        catalog.save(args.output)
+        print(f"[SUCCESS] Frame index written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
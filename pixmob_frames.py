@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+PIXMOB Frame Builder
+Pre-serialized Waveshare-wrapped and raw frames, cached so send loops only write
+"""
+
+import struct
+from functools import lru_cache
+
+FRAME_CACHE_SIZE = 256
+FRAME_LENGTH = 12         # PIXMOB payload bytes, including the 0xaa 0xaa preamble
+BROADCAST_ADDR = 65535
+
+_HEADER = struct.Struct('>HBHB')
+HEADER_SIZE = _HEADER.size
+TARGET_SIZE = 3           # Header bytes the module consumes in fixed-point mode; the rest go on air
+
+
+def freq_offset(freq):
+    """Channel offset the Waveshare module uses for a frequency in MHz"""
+    return freq - (850 if freq > 850 else 410)
+
+
+def waveshare_header(target_addr, target_freq, source_addr, source_freq):
+    """
+    Fixed-point header in official Waveshare format:
+    [Target High][Target Low][Target Freq][Source High][Source Low][Source Freq]
+    """
+    return _HEADER.pack(target_addr, freq_offset(target_freq), source_addr, freq_offset(source_freq))
+
+
+@lru_cache(maxsize=FRAME_CACHE_SIZE)
+def wrapped_frame(target_addr, target_freq, source_addr, source_freq, payload):
+    """Header plus payload as one immutable buffer, built once per distinct frame"""
+    return waveshare_header(target_addr, target_freq, source_addr, source_freq) + bytes(payload)
+
+
+@lru_cache(maxsize=FRAME_CACHE_SIZE)
+def raw_frame(payload):
+    """Payload as an immutable buffer, built once per distinct frame"""
+    return bytes(payload)
+
+
+def pack_frames(frames, header_size=0, packet_size=240):
+    """Coalesce consecutive frames into as few module writes as possible
+
+    Raw frames are concatenated up to packet_size bytes. With header_size
+    set, consecutive frames whose first header_size bytes match share one
+    copy of them. For wrapped frames this must be TARGET_SIZE: in fixed-point
+    mode the module strips only the target address and channel, and the
+    source bytes are sent on air in front of the payload. Each frame keeps
+    its own source bytes, so the packets carry the same RF bytes as the
+    frames written one by one.
+    """
+    packets = []
+    header = None
+    packet = bytearray()
+    for frame in frames:
+        frame_header, body = frame[:header_size], frame[header_size:]
+        if packet and frame_header == header and len(packet) + len(body) <= packet_size:
+            packet += body
+            continue
+        if packet:
+            packets.append(bytes(packet))
+        header = frame_header
+        packet = bytearray(frame)
+    if packet:
+        packets.append(bytes(packet))
+    return packets
+
+
+def cache_info():
+    """LRU statistics for the wrapped and raw frame caches"""
+    return {'wrapped': wrapped_frame.cache_info(), 'raw': raw_frame.cache_info()}
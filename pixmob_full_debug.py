@@ -7,8 +7,9 @@ Tests multiple approaches and identifies issues
 import sys
 import time
 import os
-import RPi.GPIO as GPIO
-import sx126x
+from pixmob_catalog import load_catalog
+from pixmob_decoder import decode_sub_file
+from pixmob_radio import RadioSession, reconfigure_stats
 
 def test_gpio_connection():
     """Test if GPIO pins are working"""
@@ -16,8 +17,9 @@ def test_gpio_connection():
     
     test_pins = [22, 23, 27]  # M0, DIO2, M1 from sx126x class
     
-    GPIO.setmode(GPIO.BCM)
-    GPIO.setwarnings(False)
+    # Set up once for the run; the session releases the pins when the run ends,
+    # so the later tests still find M0/M1 configured
+    GPIO = RadioSession.get().gpio()
     
     for pin in test_pins:
         try:
@@ -35,8 +37,6 @@ def test_gpio_connection():
             
         except Exception as e:
             print(f"  GPIO {pin}: ERROR - {e}")
-    
-    GPIO.cleanup()
 
 def test_frequency_variants():
     """Test both 868MHz and 915MHz variants"""
@@ -45,29 +45,22 @@ def test_frequency_variants():
     # Your RF captures exist for both frequencies
     frequencies = [868, 915]
     
+    # One radio for the whole run, retuned in place for each band
+    session = RadioSession.get()
+    
     for freq in frequencies:
         print(f"\n--- Testing {freq} MHz ---")
         
         try:
-            lora = sx126x.sx126x(
-                serial_num="/dev/ttyS0",
-                freq=freq,
-                addr=0,
-                power=22,
-                rssi=False,
-                air_speed=2400,
-                relay=False
-            )
+            change = session.configure(freq=freq, power=22, air_speed=2400)
+            lora = session.lora
+            if change.fields:
+                print(f"Retuned in {change.seconds * 1000:.0f} ms")
             
-            # Use frequency-specific commands if available
-            if freq == 868:
-                # 868MHz commands from your RF captures
-                gold_cmd = bytes([0xaa, 0xaa, 0x65, 0x21, 0x24, 0x6d, 0x61, 0x23, 0x11, 0x61, 0x2b, 0x40])
-                wake_cmd = bytes([0xaa, 0xaa, 0x55, 0xa1, 0x21, 0x21, 0x21, 0x18, 0x8d, 0xa1, 0x0a, 0x40])
-            else:
-                # 915MHz - same commands but different frequency
-                gold_cmd = bytes([0xaa, 0xaa, 0x65, 0x21, 0x24, 0x6d, 0x61, 0x23, 0x11, 0x61, 0x2b, 0x40])
-                wake_cmd = bytes([0xaa, 0xaa, 0x55, 0xa1, 0x21, 0x21, 0x21, 0x18, 0x8d, 0xa1, 0x0a, 0x40])
+            # Use the commands captured for this band
+            commands = load_catalog(freq)
+            gold_cmd = commands['gold_fade_in']
+            wake_cmd = commands['nothing']
             
             print(f"Initialized LoRa at {freq} MHz")
             print(f"Actual frequency: {lora.start_freq + lora.offset_freq} MHz")
@@ -109,62 +102,28 @@ def test_rf_capture_replay():
         if os.path.exists(rf_file):
             print(f"\nTesting with: {rf_file}")
             try:
-                with open(rf_file, 'r') as f:
-                    content = f.read()
-                    
                 # Extract frequency from filename
                 freq = 868 if "868Mhz" in rf_file else 915
                 
-                # Initialize LoRa for this frequency
-                lora = sx126x.sx126x(
-                    serial_num="/dev/ttyS0",
-                    freq=freq,
-                    addr=0,
-                    power=22,
-                    rssi=False,
-                    air_speed=2400,
-                    relay=False
-                )
+                # Tune the shared radio to this frequency
+                lora = RadioSession.get().radio(freq=freq, power=22, air_speed=2400)
                 
-                # Extract RAW_Data lines
-                raw_lines = [line for line in content.split('\n') if line.startswith('RAW_Data:')]
-                if raw_lines:
-                    # Convert first RAW_Data line using your PIXMOB.py method
-                    raw_data = raw_lines[0].split('RAW_Data: ')[1]
-                    
-                    # Your conversion method from PIXMOB.py
-                    l = [int(int(x)/510) for x in raw_data.split(' ') if x.strip()]
-                    s = ''
-                    for i in l:
-                        if i > 0:
-                            for d in range(i):
-                                s += '1'
-                        else:
-                            for d in range(-1*i):
-                                s += '0'
-                    s = s + '00000000'
-                    
-                    # Convert to bytes
-                    byte_data = []
-                    for i in range(0, len(s), 8):
-                        if i + 8 <= len(s):
-                            byte_val = int(s[i:i+8], 2)
-                            byte_data.append(byte_val)
-                    
-                    if byte_data:
-                        converted_data = bytes(byte_data)
-                        print(f"Converted data: {converted_data.hex()}")
+                # Decode the capture with the shared decoder (first frame only)
+                frames = decode_sub_file(rf_file)
+                if frames:
+                    converted_data = frames[0]
+                    print(f"Converted data: {converted_data.hex()}")
                         
-                        # Send this exact data
-                        print("Sending converted RF capture data...")
-                        for i in range(15):
-                            lora.send(converted_data)
-                            time.sleep(0.3)
+                    # Send this exact data
+                    print("Sending converted RF capture data...")
+                    for i in range(15):
+                        lora.send(converted_data)
+                        time.sleep(0.3)
                         
-                        response = input(f"Any response from RF capture replay? (y/n): ").lower().strip()
-                        if response.startswith('y'):
-                            print(f"[SUCCESS] RF capture replay works!")
-                            return True
+                    response = input(f"Any response from RF capture replay? (y/n): ").lower().strip()
+                    if response.startswith('y'):
+                        print(f"[SUCCESS] RF capture replay works!")
+                        return True
                 
             except Exception as e:
                 print(f"Error with {rf_file}: {e}")
@@ -179,22 +138,15 @@ def test_radiolib_approach():
     print("This tries to replicate your radiolib C++ code behavior")
     
     try:
-        # Initialize with specific settings from your C++ code
-        lora = sx126x.sx126x(
-            serial_num="/dev/ttyS0",
-            freq=868,  # Your C++ code uses 868.0F
-            addr=0,
-            power=22,  # Your C++ code uses 22 dBm max power
-            rssi=False,
-            air_speed=2400,
-            relay=False
-        )
+        # Settings from your C++ code: 868.0F at 22 dBm max power
+        lora = RadioSession.get().radio(freq=868, power=22, air_speed=2400)
         
         print("LoRa initialized in RadioLib style")
         
-        # Your C++ code has these exact byte arrays
-        nothing_array = bytes([0xaa, 0xaa, 0x55, 0xa1, 0x21, 0x21, 0x21, 0x18, 0x8d, 0xa1, 0x0a, 0x40])
-        gold_array = bytes([0xaa, 0xaa, 0x65, 0x21, 0x24, 0x6d, 0x61, 0x23, 0x11, 0x61, 0x2b, 0x40])
+        # Same frames as the C++ byte arrays
+        commands = load_catalog(868)
+        nothing_array = commands['nothing']
+        gold_array = commands['gold_fade_in']
         
         print("Starting continuous transmission like C++ code...")
         
@@ -236,24 +188,21 @@ def test_power_and_settings():
     power_levels = [10, 13, 17, 22]
     air_speeds = [1200, 2400, 4800]
     
+    session = RadioSession.get()
+    lora = session.radio(freq=868)
+    gold_cmd = load_catalog(868)['gold_fade_in']
+    
     for power in power_levels:
         for air_speed in air_speeds:
             print(f"\nTesting Power: {power} dBm, Air Speed: {air_speed} bps")
             
             try:
-                lora = sx126x.sx126x(
-                    serial_num="/dev/ttyS0",
-                    freq=868,
-                    addr=0,
-                    power=power,
-                    rssi=False,
-                    air_speed=air_speed,
-                    relay=False
-                )
+                # Only the registers that differ from the last combination are written
+                change = session.configure(power=power, air_speed=air_speed)
+                if change.fields:
+                    print(f"  Changed {', '.join(change.fields)} in {change.seconds * 1000:.0f} ms")
                 
                 # Quick test
-                gold_cmd = bytes([0xaa, 0xaa, 0x65, 0x21, 0x24, 0x6d, 0x61, 0x23, 0x11, 0x61, 0x2b, 0x40])
-                
                 for i in range(5):
                     lora.send(gold_cmd)
                     time.sleep(0.2)
@@ -269,6 +218,10 @@ def test_power_and_settings():
                 print(f"[SUCCESS] {power}dBm/{air_speed}bps works!")
                 return (power, air_speed)
     
+    stats = reconfigure_stats()
+    if stats['writes']:
+        print(f"\nReconfiguration: {stats['writes']} writes, {stats['skipped']} skipped, "
+              f"mean {stats['mean_ms']:.0f} ms, max {stats['max_ms']:.0f} ms")
     return None
 
 def diagnose_issues():
@@ -322,46 +275,48 @@ def main():
     print("This will test multiple approaches to identify the issue")
     print()
     
-    # Test 1: Basic GPIO
-    test_gpio_connection()
+    # One serial port and GPIO setup for every test, released when main returns
+    with RadioSession.get():
+        # Test 1: Basic GPIO
+        test_gpio_connection()
     
-    # Test 2: Frequency variants
-    working_freq = test_frequency_variants()
-    if working_freq:
-        print(f"\n[SUCCESS] Found working frequency: {working_freq} MHz")
-        return
+        # Test 2: Frequency variants
+        working_freq = test_frequency_variants()
+        if working_freq:
+            print(f"\n[SUCCESS] Found working frequency: {working_freq} MHz")
+            return
     
-    # Test 3: RF capture replay
-    if test_rf_capture_replay():
-        print("\n[SUCCESS] RF capture replay worked!")
-        return
+        # Test 3: RF capture replay
+        if test_rf_capture_replay():
+            print("\n[SUCCESS] RF capture replay worked!")
+            return
     
-    # Test 4: RadioLib approach
-    if test_radiolib_approach():
-        print("\n[SUCCESS] RadioLib approach worked!")
-        return
+        # Test 4: RadioLib approach
+        if test_radiolib_approach():
+            print("\n[SUCCESS] RadioLib approach worked!")
+            return
     
-    # Test 5: Power/settings
-    working_settings = test_power_and_settings()
-    if working_settings:
-        print(f"\n[SUCCESS] Found working settings: {working_settings}")
-        return
+        # Test 5: Power/settings
+        working_settings = test_power_and_settings()
+        if working_settings:
+            print(f"\n[SUCCESS] Found working settings: {working_settings}")
+            return
     
-    # If nothing worked, diagnose
-    print("\n[NO SUCCESS] No method worked. Diagnosing issues...")
-    issues = diagnose_issues()
+        # If nothing worked, diagnose
+        print("\n[NO SUCCESS] No method worked. Diagnosing issues...")
+        issues = diagnose_issues()
     
-    print("\n=== DIAGNOSIS RESULTS ===")
-    print("Likely issues found:")
-    for i, issue in enumerate(issues, 1):
-        print(f"{i}. {issue}")
+        print("\n=== DIAGNOSIS RESULTS ===")
+        print("Likely issues found:")
+        for i, issue in enumerate(issues, 1):
+            print(f"{i}. {issue}")
     
-    print("\n=== RECOMMENDATIONS ===")
-    print("1. Try a different PIXMOB bracelet to rule out hardware failure")
-    print("2. Test at different frequencies (868MHz vs 915MHz)")
-    print("3. Consider getting an OOK/ASK transmitter instead of LoRa")
-    print("4. Try capturing new RF signals with your specific bracelet")
-    print("5. Check if your LoRa module can be put into OOK/ASK mode")
+        print("\n=== RECOMMENDATIONS ===")
+        print("1. Try a different PIXMOB bracelet to rule out hardware failure")
+        print("2. Test at different frequencies (868MHz vs 915MHz)")
+        print("3. Consider getting an OOK/ASK transmitter instead of LoRa")
+        print("4. Try capturing new RF signals with your specific bracelet")
+        print("5. Check if your LoRa module can be put into OOK/ASK mode")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+PIXMOB Keep-Alive Engine
+Background thread that keeps bracelets awake with the "nothing" frame
+"""
+
+import threading
+import time
+from collections import deque
+
+KEEPALIVE_COMMAND = 'nothing'
+KEEPALIVE_RATE = 10.0     # Frames per second, same as continuous_wake_mode
+HOLDOFF = 0.5             # Seconds of silence after a color command
+JITTER_WINDOW = 1000      # Inter-frame intervals kept for the jitter report
+
+
+class KeepAlive:
+    """Send the keep-alive frame at a fixed rate whenever the radio is idle
+
+    Keep-alives are never queued: the thread holds at most one frame and
+    only sends it if it can take the controller's transmit lock without
+    waiting. Any other frame sent through PIXMOBController.send_frame calls
+    preempt(), which pauses the engine for the holdoff so color cues always
+    go out first.
+    """
+
+    def __init__(self, controller, rate=KEEPALIVE_RATE, command=KEEPALIVE_COMMAND,
+                 holdoff=HOLDOFF, wrapped=False):
+        self.controller = controller
+        self.period = 1.0 / rate
+        self.holdoff = holdoff
+        if wrapped:
+            self.frame = controller.wrapped_frame(command)
+        else:
+            self.frame = controller.commands[command]
+        self.sent = 0
+        self.skipped = 0
+        self.preemptions = 0
+        self._intervals = deque(maxlen=JITTER_WINDOW)
+        self._resume_at = 0.0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the background thread and register with the controller"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self.controller.keepalive = self
+        self._thread = threading.Thread(target=self._run, name='pixmob-keepalive', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        if self.controller.keepalive is self:
+            self.controller.keepalive = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def preempt(self):
+        """Pause keep-alives for the holdoff; called before every color frame"""
+        self._resume_at = time.monotonic() + self.holdoff
+        self.preemptions += 1
+        self._wake.set()
+
+    def _run(self):
+        lock = self.controller.tx_lock
+        due = time.monotonic()
+        last_sent = None
+        while not self._stop.is_set():
+            self._wake.wait(max(due - time.monotonic(), 0))
+            self._wake.clear()
+            now = time.monotonic()
+            if self._stop.is_set():
+                break
+            if now < self._resume_at:
+                due = self._resume_at
+                last_sent = None
+                continue
+            if now < due:
+                continue
+
+            if not lock.acquire(blocking=False):
+                # A color command owns the radio, try again next period
+                self.skipped += 1
+                due = now + self.period
+                last_sent = None
+                continue
+            try:
+                sent_at = time.monotonic()
+                self.controller.lora.send(self.frame)
+            except Exception as e:
+                self._record(False)
+                print(f"[ERROR] Keep-alive send failed: {e}")
+            else:
+                self._record(True)
+                self.sent += 1
+                if last_sent is not None:
+                    self._intervals.append(sent_at - last_sent)
+                last_sent = sent_at
+            finally:
+                lock.release()
+
+            due += self.period
+            if due < time.monotonic():
+                # Fell behind (slow radio), restart the grid instead of bursting
+                due = time.monotonic() + self.period
+
+    def _record(self, ok):
+        metrics = getattr(self.controller, 'metrics', None)
+        if metrics is not None:
+            metrics.record(self.frame, self.controller.band(), ok)
+
+    def jitter(self):
+        """Measured inter-frame jitter in seconds: mean, p50, p99 and max deviation from the period"""
+        if not self._intervals:
+            return {'frames': self.sent, 'mean_interval': 0.0, 'p50': 0.0, 'p99': 0.0, 'max': 0.0}
+        intervals = sorted(self._intervals)
+        deviations = sorted(abs(interval - self.period) for interval in intervals)
+        last = len(deviations) - 1
+        return {
+            'frames': self.sent,
+            'mean_interval': sum(intervals) / len(intervals),
+            'p50': deviations[last // 2],
+            'p99': deviations[int(last * 0.99)],
+            'max': deviations[-1],
+        }
+
+    def report(self):
+        """Print keep-alive statistics"""
+        stats = self.jitter()
+        print(f"Keep-alive: {self.sent} sent, {self.skipped} skipped, {self.preemptions} preemptions")
+        print(f"  Interval {stats['mean_interval'] * 1000:.1f} ms (target {self.period * 1000:.1f} ms), "
+              f"jitter p50 {stats['p50'] * 1000:.2f} ms, p99 {stats['p99'] * 1000:.2f} ms, "
+              f"max {stats['max'] * 1000:.2f} ms")
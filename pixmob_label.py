@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+PIXMOB Frame Labeler
+Names decoded frames after the nearest catalog command by Hamming distance
+
+Every frame is padded to FRAME_LENGTH bytes and packed into a row of uint64
+words, so comparing one frame against one reference is a couple of XORs and
+popcounts. A batch of frames is compared with every reference in one
+broadcast operation. Decodes that gained or lost a bit at the start are
+caught by also storing each reference shifted by up to max_shift bits either
+way.
+
+Usage:
+    python3 pixmob_label.py                          # label the wild captures
+    python3 pixmob_label.py --index wild.json        # label a saved pixmob_dedupe.py index
+    python3 pixmob_label.py aaaa55a1212121188da10a40 # label hex frames
+"""
+
+import argparse
+import string
+import time
+from collections import Counter, namedtuple
+
+import numpy as np
+
+from pixmob_catalog import BANDS, load_catalog
+from pixmob_frames import FRAME_LENGTH
+
+# Assuming the script is run from the project root
+CapturesPath = './rf/raw_wild_rf_captures/'
+MAX_SHIFT = 2             # Bits a decode may be misaligned by
+MAX_DISTANCE = 12         # Larger distances are reported as unknown
+BATCH = 8192              # Frames compared at once (bounds the temporary arrays)
+UNKNOWN = None
+
+Match = namedtuple('Match', 'label distance shift margin')
+
+_POPCOUNT8 = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+def popcount(words):
+    """Set bits per element of a uint64 array"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words)
+    # NumPy < 2.0: byte lookup table
+    counts = _POPCOUNT8[words.view(np.uint8)]
+    return counts.reshape(words.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+
+def frames_to_bits(frames, length=FRAME_LENGTH):
+    """(N, words) uint64 array of frames zero-padded or cut to length bytes"""
+    words = -(-length // 8)
+    row = words * 8
+    data = b''.join(bytes(frame[:length]).ljust(row, b'\0') for frame in frames)
+    return np.frombuffer(data, dtype='>u8').reshape(len(frames), words).astype(np.uint64)
+
+
+def shift_bits(frame, shift, length=FRAME_LENGTH):
+    """frame moved right (shift > 0) or left by whole bits, zero filled, length bytes"""
+    bits = np.unpackbits(np.frombuffer(bytes(frame).ljust(length, b'\0')[:length], dtype=np.uint8))
+    shifted = np.zeros_like(bits)
+    if shift >= 0:
+        shifted[shift:] = bits[:len(bits) - shift]
+    else:
+        shifted[:shift] = bits[-shift:]
+    return np.packbits(shifted).tobytes()
+
+
+class HammingIndex:
+    """Nearest known command for any number of frames"""
+
+    def __init__(self, commands, length=FRAME_LENGTH, max_shift=MAX_SHIFT, max_distance=MAX_DISTANCE):
+        self.length = length
+        self.max_distance = max_distance
+        self.names = []
+        frames = []
+        labels = []
+        shifts = []
+        seen = set()
+        for name, frame in commands.items():
+            frame = bytes(frame).ljust(length, b'\0')[:length]
+            if frame in seen:
+                continue
+            seen.add(frame)
+            self.names.append(name)
+            for shift in range(-max_shift, max_shift + 1):
+                frames.append(shift_bits(frame, shift, length))
+                labels.append(len(self.names) - 1)
+                shifts.append(shift)
+        # Rows are grouped per command: 2 * max_shift + 1 variants each
+        self.variants = 2 * max_shift + 1
+        self.references = frames_to_bits(frames, length)
+        self.labels = np.array(labels, dtype=np.intp)
+        self.shifts = np.array(shifts, dtype=np.int8)
+
+    @classmethod
+    def from_catalog(cls, bands=BANDS, **kwargs):
+        """Index of every command of the given catalog bands (the first name wins for shared frames)"""
+        commands = {}
+        for band in bands:
+            for name, frame in load_catalog(band).items():
+                commands.setdefault(name, frame)
+        return cls(commands, **kwargs)
+
+    def distances(self, frames):
+        """(N, references) Hamming distances of a batch of frames"""
+        packed = frames_to_bits(frames, self.length)
+        return popcount(packed[:, None, :] ^ self.references[None, :, :]).sum(axis=2, dtype=np.int32)
+
+    def query(self, frames):
+        """Arrays (name index or -1, distance, shift, margin to the next other command) per frame"""
+        count = len(frames)
+        best = np.empty(count, dtype=np.intp)
+        distance = np.empty(count, dtype=np.int32)
+        shift = np.empty(count, dtype=np.int8)
+        margin = np.empty(count, dtype=np.int32)
+        names = len(self.names)
+        for start in range(0, count, BATCH):
+            table = self.distances(frames[start:start + BATCH])
+            # Best shift per command, then the best and runner-up command
+            per_name = table.reshape(len(table), names, self.variants).min(axis=2)
+            nearest = table.argmin(axis=1)
+            order = np.partition(per_name, 1, axis=1) if names > 1 else per_name
+            rows = slice(start, start + len(table))
+            best[rows] = self.labels[nearest]
+            distance[rows] = table[np.arange(len(table)), nearest]
+            shift[rows] = self.shifts[nearest]
+            margin[rows] = (order[:, 1] - order[:, 0]) if names > 1 else self.length * 8
+        best[distance > self.max_distance] = -1
+        return best, distance, shift, margin
+
+    def label(self, frames):
+        """Match(label or None, distance, shift, margin) for every frame"""
+        best, distance, shift, margin = self.query(frames)
+        return [Match(self.names[index] if index >= 0 else UNKNOWN, int(dist), int(sh), int(gap))
+                for index, dist, sh, gap in zip(best.tolist(), distance.tolist(), shift.tolist(),
+                                                margin.tolist())]
+
+    def nearest(self, frame):
+        """Match for a single frame"""
+        return self.label([frame])[0]
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Label PIXMOB frames with the nearest catalog command")
+    parser.add_argument('frames', nargs='*', help="hex frames, or .sub files / folders to decode")
+    parser.add_argument('--index', help="JSON frame index from pixmob_dedupe.py")
+    parser.add_argument('--max-shift', type=int, default=MAX_SHIFT, help="bit misalignment to tolerate")
+    parser.add_argument('--max-distance', type=int, default=MAX_DISTANCE, help="largest distance still labeled")
+    parser.add_argument('--jobs', type=int, default=None, help="decoder processes (default: all cores)")
+    parser.add_argument('--top', type=int, default=20, help="unknown frames to list")
+    args = parser.parse_args()
+
+    index = HammingIndex.from_catalog(max_shift=args.max_shift, max_distance=args.max_distance)
+    hex_frames = [arg for arg in args.frames if all(c in string.hexdigits for c in arg)]
+    if hex_frames and len(hex_frames) == len(args.frames):
+        for text, match in zip(hex_frames, index.label([bytes.fromhex(text) for text in hex_frames])):
+            print(f"{text}: {match.label or 'unknown'} (distance {match.distance}, shift {match.shift:+d}, "
+                  f"margin {match.margin})")
+        return
+
+    from pixmob_dedupe import FrameCatalog, build_catalog
+    if args.index:
+        catalog = FrameCatalog.load(args.index)
+    else:
+        catalog = build_catalog(args.frames or [CapturesPath], jobs=args.jobs)
+    frames = list(catalog.entries)
+    counts = [entry['count'] for entry in catalog.entries.values()]
+
+    started = time.perf_counter()
+    matches = index.label(frames)
+    elapsed = time.perf_counter() - started
+
+    occurrences = Counter()
+    distinct = Counter()
+    for match, count in zip(matches, counts):
+        occurrences[match.label] += count
+        distinct[match.label] += 1
+    print(f"Labeled {len(frames)} distinct frames in {elapsed * 1000:.1f} ms "
+          f"({len(frames) / max(elapsed, 1e-9):,.0f} frames/s)")
+    for label, count in occurrences.most_common():
+        print(f"  {label or 'unknown':<20} {count:6d} frames, {distinct[label]} distinct")
+
+    unknown = sorted(((count, frame, match) for frame, match, count in zip(frames, matches, counts)
+                      if match.label is None), reverse=True)
+    for count, frame, match in unknown[:args.top]:
+        print(f"  unknown x{count:<5} {frame.hex()}  (nearest distance {match.distance})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+PIXMOB Transmit Metrics
+Per-command, per-band send counters and inter-send interval histograms
+
+Recording a send only appends a tuple to a deque, which is atomic in CPython,
+so the transmit path never takes a lock or formats anything. The events are
+folded into counters and histograms when a snapshot or export is asked for,
+never on the transmit path. The deque is bounded: if nobody collects for
+MAX_PENDING sends, the oldest events are dropped and counted.
+
+Usage:
+    python3 pixmob_metrics.py metrics.json     # print a saved JSON snapshot
+"""
+
+import json
+import os
+import sys
+import itertools
+import threading
+import time
+from collections import deque
+
+from pixmob_frames import FRAME_LENGTH, HEADER_SIZE
+
+# Upper bounds of the inter-send interval histogram buckets, in seconds
+INTERVAL_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+MAX_PENDING = 65536       # Uncollected events kept before the oldest are dropped
+EXPORT_INTERVAL = 5.0     # Seconds between exporter writes
+UNKNOWN_COMMAND = 'other'
+BATCH_COMMAND = 'batch'   # Writes packing several frames (send_many)
+
+
+class Series:
+    """Counters and interval histogram for one (command, band) pair"""
+
+    def __init__(self):
+        self.sent = 0
+        self.errors = 0
+        self.bytes = 0
+        self.first = None
+        self.last = None
+        self.buckets = [0] * (len(INTERVAL_BUCKETS) + 1)
+        self.interval_sum = 0.0
+        self.interval_count = 0
+        self.interval_max = 0.0
+
+    def add(self, timestamp, nbytes, ok):
+        if not ok:
+            self.errors += 1
+            return
+        if self.last is not None:
+            interval = timestamp - self.last
+            index = 0
+            while index < len(INTERVAL_BUCKETS) and interval > INTERVAL_BUCKETS[index]:
+                index += 1
+            self.buckets[index] += 1
+            self.interval_sum += interval
+            self.interval_count += 1
+            self.interval_max = max(self.interval_max, interval)
+        else:
+            self.first = timestamp
+        self.last = timestamp
+        self.sent += 1
+        self.bytes += nbytes
+
+    def rate(self):
+        """Achieved sends per second between the first and last send"""
+        if self.sent < 2 or self.last <= self.first:
+            return 0.0
+        return (self.sent - 1) / (self.last - self.first)
+
+    def quantile(self, q):
+        """Interval quantile estimated from the histogram (bucket upper bound, capped at the max)"""
+        if not self.interval_count:
+            return 0.0
+        target = q * self.interval_count
+        seen = 0
+        for bound, count in zip(INTERVAL_BUCKETS, self.buckets):
+            seen += count
+            if seen >= target:
+                return min(bound, self.interval_max)
+        return self.interval_max
+
+
+class TransmitMetrics:
+    """Metrics registry shared by everything that writes to one controller's radio"""
+
+    def __init__(self, commands=None):
+        self.started = time.time()
+        self.series = {}
+        self._names = {}
+        self._events = deque(maxlen=MAX_PENDING)
+        self._sequence = itertools.count()
+        self._last_sequence = -1
+        self.dropped = 0
+        self._lock = threading.Lock()
+        if commands:
+            self.name_frames(commands)
+
+    def name_frames(self, commands):
+        """Label frames carrying these {name: payload} commands by name, raw or wrapped"""
+        with self._lock:
+            for name, payload in commands.items():
+                self._names[bytes(payload)] = name
+
+    def record(self, frame, band, ok=True):
+        """Note one send (or failed send) of a frame; safe to call from any thread"""
+        self._events.append((next(self._sequence), time.monotonic(), frame, band, ok))
+
+    def _command(self, frame):
+        name = self._names.get(frame)
+        if name is None:
+            name = self._names.get(frame[HEADER_SIZE:])
+        if name is None:
+            name = BATCH_COMMAND if len(frame) > HEADER_SIZE + FRAME_LENGTH else UNKNOWN_COMMAND
+        return name
+
+    def _collect(self):
+        events = self._events
+        while events:
+            sequence, timestamp, frame, band, ok = events.popleft()
+            # Events pushed out of the full deque show up as a gap in the sequence
+            if sequence > self._last_sequence:
+                self.dropped += sequence - self._last_sequence - 1
+                self._last_sequence = sequence
+            key = (self._command(frame), band)
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = Series()
+            series.add(timestamp, len(frame), ok)
+
+    def collect(self):
+        """Fold pending events into the series"""
+        with self._lock:
+            self._collect()
+
+    def snapshot(self):
+        """JSON-able view of every series"""
+        with self._lock:
+            self._collect()
+            series = []
+            for (command, band), entry in sorted(self.series.items(), key=lambda item: (item[0][1], item[0][0])):
+                series.append({
+                    'command': command,
+                    'band': band,
+                    'sent': entry.sent,
+                    'errors': entry.errors,
+                    'bytes': entry.bytes,
+                    'rate': entry.rate(),
+                    'interval': {
+                        'count': entry.interval_count,
+                        'mean': entry.interval_sum / entry.interval_count if entry.interval_count else 0.0,
+                        'p50': entry.quantile(0.5),
+                        'p99': entry.quantile(0.99),
+                        'max': entry.interval_max,
+                        'buckets': dict(zip([str(bound) for bound in INTERVAL_BUCKETS] + ['+Inf'],
+                                            entry.buckets)),
+                    },
+                })
+            dropped = self.dropped
+        return {'started': self.started, 'generated': time.time(), 'dropped': dropped, 'series': series}
+
+    def prometheus(self):
+        """Prometheus text exposition format, e.g. for node_exporter's textfile collector"""
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def labels(entry, **extra):
+            pairs = [('command', entry['command']), ('band', entry['band'])] + list(extra.items())
+            return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+        entries = snapshot['series']
+        for name, field, kind, help_text in (
+                ('pixmob_frames_sent_total', 'sent', 'counter', 'Writes that reached the radio'),
+                ('pixmob_send_errors_total', 'errors', 'counter', 'Writes that raised an error'),
+                ('pixmob_bytes_sent_total', 'bytes', 'counter', 'Bytes written to the radio'),
+                ('pixmob_send_rate_hz', 'rate', 'gauge', 'Achieved sends per second')):
+            metric(name, kind, help_text)
+            lines += [f"{name}{labels(entry)} {entry[field]}" for entry in entries]
+
+        metric('pixmob_metrics_dropped_total', 'counter', 'Send events lost because nobody collected them')
+        lines.append(f"pixmob_metrics_dropped_total {snapshot['dropped']}")
+
+        metric('pixmob_send_interval_seconds', 'histogram', 'Time between consecutive sends')
+        for entry in entries:
+            cumulative = 0
+            for bound, count in entry['interval']['buckets'].items():
+                cumulative += count
+                lines.append(f"pixmob_send_interval_seconds_bucket{labels(entry, le=bound)} {cumulative}")
+            count = entry['interval']['count']
+            lines.append(f"pixmob_send_interval_seconds_sum{labels(entry)} {entry['interval']['mean'] * count}")
+            lines.append(f"pixmob_send_interval_seconds_count{labels(entry)} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """Atomically write the Prometheus text format to path (use a .prom name)"""
+        _write_atomic(path, self.prometheus())
+
+    def write_json(self, path):
+        """Atomically write a JSON snapshot to path"""
+        _write_atomic(path, json.dumps(self.snapshot(), indent=1))
+
+    def summary(self):
+        """One line per series for the console"""
+        lines = []
+        for entry in self.snapshot()['series']:
+            interval = entry['interval']
+            lines.append(f"{entry['command']:<20} {entry['band']} MHz: {entry['sent']} sent, "
+                         f"{entry['errors']} errors, {entry['rate']:.2f}/s, "
+                         f"interval p50 <= {interval['p50'] * 1000:.0f} ms, max {interval['max'] * 1000:.0f} ms")
+        return lines
+
+
+def _write_atomic(path, text):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as file:
+        file.write(text)
+    os.replace(temp_path, path)
+
+
+class MetricsExporter:
+    """Background thread that rewrites the textfile and/or JSON snapshot every few seconds"""
+
+    def __init__(self, metrics, textfile=None, json_path=None, interval=EXPORT_INTERVAL):
+        self.metrics = metrics
+        self.textfile = textfile
+        self.json_path = json_path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def export(self):
+        if self.textfile:
+            self.metrics.write_textfile(self.textfile)
+        if self.json_path:
+            self.metrics.write_json(self.json_path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.export()
+            except OSError as e:
+                print(f"[WARNING] Could not export metrics: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='pixmob-metrics', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the thread after one last export"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.export()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    """Print a JSON snapshot written by write_json()"""
+    if len(sys.argv) != 2:
+        print(f"Usage: {sys.argv[0]} metrics.json")
+        sys.exit(1)
+    with open(sys.argv[1], 'r') as file:
+        snapshot = json.load(file)
+    for entry in snapshot['series']:
+        interval = entry['interval']
+        print(f"{entry['command']:<20} {entry['band']} MHz: {entry['sent']} sent, {entry['errors']} errors, "
+              f"{entry['rate']:.2f}/s, interval mean {interval['mean'] * 1000:.1f} ms, "
+              f"max {interval['max'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
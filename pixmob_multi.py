@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+PIXMOB Multi-Radio Fan-Out
+Drives several transmitters from one process, one worker thread per radio
+
+Every radio has its own PIXMOBController, worker thread and bounded queue.
+A cue is resolved to each radio's own frame (the wrapped header carries the
+radio's channel) and put on every queue without blocking; a radio whose
+queue is full drops the frame and counts it, so a slow or stuck radio never
+holds up the others.
+
+Usage:
+    python3 pixmob_multi.py --radio /dev/ttyS0:868 --radio /dev/ttyUSB0:915 white_fastfade
+    python3 sx126x_sim.py --fast pixmob_multi.py --radio a:868 --radio b:868 --repeat 20 nothing
+"""
+
+import argparse
+import queue
+import threading
+import time
+
+from pixmob_catalog import catalog_band
+from pixmob_metrics import TransmitMetrics
+
+QUEUE_SIZE = 32           # Frames a radio may fall behind before it starts dropping
+DEFAULT_PORT = '/dev/ttyS0'
+DEFAULT_FREQ = 868
+
+
+def parse_radio(spec):
+    """'PORT:FREQ' (or just PORT) as (port, freq in MHz)"""
+    port, _, freq = spec.rpartition(':')
+    if not port:
+        return spec, DEFAULT_FREQ
+    return port, int(freq)
+
+
+class RadioWorker:
+    """One radio: a controller, its queue and the thread that drains it"""
+
+    def __init__(self, controller, name, queue_size=QUEUE_SIZE):
+        self.controller = controller
+        self.name = name
+        self.band = catalog_band(controller.band())
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.sent = 0
+        self.errors = 0
+        self.dropped = 0
+        self.bytes = 0
+        self.busy = 0.0
+        self.high_water = 0
+        self.started = None
+        self._frames = {}
+        self._thread = None
+
+    def frame(self, command, wrapped=True):
+        """This radio's frame for a command, built once"""
+        key = (command, wrapped)
+        frame = self._frames.get(key)
+        if frame is None:
+            if wrapped:
+                frame = self.controller.wrapped_frame(command)
+            else:
+                frame = self.controller.commands[command]
+            self._frames[key] = frame
+        return frame
+
+    def submit(self, frame):
+        """Queue a frame without waiting; False (and counted) if the radio is behind"""
+        try:
+            self.queue.put_nowait(frame)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.high_water = max(self.high_water, self.queue.qsize())
+        return True
+
+    def _run(self):
+        send_frame = self.controller.send_frame
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                break
+            started = time.monotonic()
+            try:
+                send_frame(frame)
+            except Exception as e:
+                self.errors += 1
+                print(f"[ERROR] {self.name}: send failed: {e}")
+            else:
+                self.sent += 1
+                self.bytes += len(frame)
+            self.busy += time.monotonic() - started
+
+    def start(self):
+        if self._thread is None:
+            self.started = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name=f'pixmob-radio-{self.name}', daemon=True)
+            self._thread.start()
+
+    def stop(self, drain=True):
+        """Stop the thread, after sending what is queued unless drain=False"""
+        if self._thread is None:
+            return
+        if not drain:
+            try:
+                while True:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+            except queue.Empty:
+                pass
+        self.queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def stats(self):
+        """Throughput of this radio since start()"""
+        elapsed = time.monotonic() - self.started if self.started is not None else 0.0
+        return {
+            'radio': self.name,
+            'band': self.band,
+            'sent': self.sent,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'queued': self.queue.qsize(),
+            'high_water': self.high_water,
+            'bytes': self.bytes,
+            'rate': self.sent / elapsed if elapsed > 0 else 0.0,
+            'utilization': self.busy / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+class BandFanout:
+    """Looks like a single PIXMOBController to run_show, but feeds every radio of one band"""
+
+    def __init__(self, group, band):
+        self.group = group
+        self.band = band
+        self.lead = group.workers(band)[0]
+        self.commands = self.lead.controller.commands
+        self._origins = {}
+
+    def wrapped_frame(self, command_name):
+        frame = self.lead.frame(command_name, True)
+        self._origins[frame] = (command_name, True)
+        return frame
+
+    def send_frame(self, frame):
+        """Fan a frame out; frames from wrapped_frame/commands are rebuilt for each radio"""
+        origin = self._origins.get(frame)
+        if origin is None:
+            for name, data in self.commands.items():
+                if data == frame:
+                    origin = self._origins[frame] = (name, False)
+                    break
+        if origin is None:
+            return self.group.send_frame(frame, self.band)
+        return self.group.send_command(origin[0], origin[1], self.band)
+
+
+class RadioGroup:
+    """N radios fed in parallel; adding a radio adds capacity"""
+
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.metrics = TransmitMetrics()
+        self._workers = []
+
+    @classmethod
+    def open(cls, radios, verbose=False, queue_size=QUEUE_SIZE):
+        """Open a controller for every (port, freq) and start their workers"""
+        from pixmob_controller import PIXMOBController
+        group = cls(queue_size)
+        try:
+            for port, freq in radios:
+                group.add(PIXMOBController(verbose=verbose, serial_num=port, freq=freq), f'{port}@{freq}')
+        except Exception:
+            group.stop()
+            raise
+        return group
+
+    def add(self, controller, name=None):
+        """Adopt a controller (anything with send_frame, commands and wrapped_frame) and start its worker"""
+        worker = RadioWorker(controller, name or f'radio{len(self._workers)}', self.queue_size)
+        # One registry for the whole group so a single exporter covers every radio
+        self.metrics.name_frames(controller.commands)
+        controller.metrics = self.metrics
+        self._workers.append(worker)
+        worker.start()
+        return worker
+
+    def workers(self, band=None):
+        """Workers for one catalog band, or all of them"""
+        return [worker for worker in self._workers if band is None or worker.band == band]
+
+    def bands(self):
+        """{band: BandFanout} for run_show"""
+        return {band: BandFanout(self, band) for band in sorted({worker.band for worker in self._workers})}
+
+    def send_command(self, command, wrapped=True, band=None):
+        """Queue a command on every radio (of a band); returns how many accepted it"""
+        accepted = 0
+        for worker in self.workers(band):
+            if command in worker.controller.commands and worker.submit(worker.frame(command, wrapped)):
+                accepted += 1
+        return accepted
+
+    def send_frame(self, frame, band=None):
+        """Queue the same bytes on every radio (of a band); returns how many accepted them"""
+        return sum(worker.submit(frame) for worker in self.workers(band))
+
+    def stats(self):
+        return [worker.stats() for worker in self._workers]
+
+    def print_stats(self):
+        for entry in self.stats():
+            print(f"  {entry['radio']:<24} {entry['band']} MHz: {entry['sent']} sent, {entry['errors']} errors, "
+                  f"{entry['dropped']} dropped, {entry['rate']:.1f}/s, "
+                  f"{entry['utilization'] * 100:.0f}% busy, queue peak {entry['high_water']}")
+
+    def stop(self, drain=True):
+        """Stop every worker; the radios stay open"""
+        for worker in self._workers:
+            worker.stop(drain)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.stop(drain=exc_type is None)
+
+
+def main():
+    """Send one command through every radio"""
+    parser = argparse.ArgumentParser(description="Fan a PIXMOB command out to several radios")
+    parser.add_argument('command', help="catalog command name")
+    parser.add_argument('--radio', action='append', type=parse_radio, metavar='PORT:FREQ',
+                        help=f"serial port and frequency, repeatable (default: {DEFAULT_PORT}:{DEFAULT_FREQ})")
+    parser.add_argument('--repeat', type=int, default=3, help="times to send the command")
+    parser.add_argument('--interval', type=float, default=0.1, help="seconds between repeats")
+    parser.add_argument('--raw', action='store_true', help="send the bare frame without the Waveshare header")
+    parser.add_argument('--queue', type=int, default=QUEUE_SIZE, help="frames each radio may queue")
+    args = parser.parse_args()
+
+    with RadioGroup.open(args.radio or [(DEFAULT_PORT, DEFAULT_FREQ)], queue_size=args.queue) as group:
+        print(f"{len(group.workers())} radios ready")
+        start = time.monotonic()
+        for index in range(args.repeat):
+            delay = start + index * args.interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            accepted = group.send_command(args.command, wrapped=not args.raw)
+            if accepted < len(group.workers()):
+                print(f"[WARNING] Repeat {index + 1}: {len(group.workers()) - accepted} radios skipped the frame")
+    print(f"Sent '{args.command}' {args.repeat} times")
+    group.print_stats()
+
+
+if __name__ == "__main__":
+    main()
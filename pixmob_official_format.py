@@ -6,27 +6,17 @@ Based on the official main.py format discovered in SX126X_LoRa_HAT_Code
 
 import sys
 import time
-import sx126x
+from pixmob_catalog import load_catalog
+from pixmob_frames import wrapped_frame
+from pixmob_radio import RadioSession
 
 def create_waveshare_message(target_addr, target_freq, source_addr, source_freq, payload):
     """
     Create message in official Waveshare format:
     [Target High][Target Low][Target Freq][Source High][Source Low][Source Freq][Payload]
     """
-    offset_freq_target = target_freq - (850 if target_freq > 850 else 410)
-    offset_freq_source = source_freq - (850 if source_freq > 850 else 410)
-    
-    message = (
-        bytes([target_addr >> 8]) +           # Target address high byte
-        bytes([target_addr & 0xff]) +         # Target address low byte  
-        bytes([offset_freq_target]) +         # Target frequency offset
-        bytes([source_addr >> 8]) +           # Source address high byte
-        bytes([source_addr & 0xff]) +         # Source address low byte
-        bytes([offset_freq_source]) +         # Source frequency offset
-        payload                               # Actual payload
-    )
-    
-    return message
+    # Serialized once per distinct message and served from the frame cache afterwards
+    return wrapped_frame(target_addr, target_freq, source_addr, source_freq, payload)
 
 def test_official_format():
     """Test PIXMOB using the official Waveshare message format"""
@@ -34,24 +24,18 @@ def test_official_format():
     print("Using the exact format from official main.py")
     print()
     
-    # Initialize exactly like the official example
+    # Official example settings: 868 MHz, address 0, max power, 2400 bps, no relay
     print("Initializing with official settings...")
-    node = sx126x.sx126x(
-        serial_num="/dev/ttyS0",
-        freq=868,           # Official example uses 868
-        addr=0,             # Our address
-        power=22,           # Max power
-        rssi=False,         # Disable for cleaner output
-        air_speed=2400,     # Official default
-        relay=False         # No relay
-    )
+    session = RadioSession.get()
+    node = session.radio(freq=868, power=22, air_speed=2400)
     
     print(f"Node initialized: Address {node.addr}, Frequency {node.start_freq + node.offset_freq} MHz")
     
-    # PIXMOB command data
+    # PIXMOB command data: captured frames plus hand-made red/blue variants
+    commands = load_catalog(868)
     pixmob_commands = {
-        'wake': bytes([0xaa, 0xaa, 0x55, 0xa1, 0x21, 0x21, 0x21, 0x18, 0x8d, 0xa1, 0x0a, 0x40]),
-        'gold': bytes([0xaa, 0xaa, 0x65, 0x21, 0x24, 0x6d, 0x61, 0x23, 0x11, 0x61, 0x2b, 0x40]),
+        'wake': commands['nothing'],
+        'gold': commands['gold_fade_in'],
         'red': bytes([0xaa, 0xaa, 0x55, 0xa1, 0x25, 0x25, 0x25, 0x18, 0x8d, 0xa1, 0x0a, 0x40]),
         'blue': bytes([0xaa, 0xaa, 0x65, 0x21, 0x26, 0x6d, 0x61, 0x23, 0x11, 0x61, 0x2b, 0x40]),
     }
@@ -143,16 +127,10 @@ def test_official_format():
         print(f"\nTesting frequency {freq} MHz...")
         
         try:
-            # Reconfigure node for this frequency
-            test_node = sx126x.sx126x(
-                serial_num="/dev/ttyS0",
-                freq=freq,
-                addr=0,
-                power=22,
-                rssi=False,
-                air_speed=2400,
-                relay=False
-            )
+            # Retune the live node instead of opening a new one per frequency
+            change = session.configure(freq=freq)
+            if change.fields:
+                print(f"  Retuned in {change.seconds * 1000:.0f} ms")
             
             freq_msg = create_waveshare_message(
                 target_addr=65535,
@@ -163,7 +141,7 @@ def test_official_format():
             )
             
             for i in range(15):
-                test_node.send(freq_msg)
+                node.send(freq_msg)
                 time.sleep(0.2)
             
             response = input(f"Any response at {freq} MHz? (y/n): ").lower().strip()
@@ -180,12 +158,10 @@ def test_raw_vs_formatted():
     """Test both raw PIXMOB data and formatted versions"""
     print("\n=== Test 4: Raw vs Formatted Comparison ===")
     
-    node = sx126x.sx126x(
-        serial_num="/dev/ttyS0",
-        freq=868, addr=0, power=22, rssi=False, air_speed=2400, relay=False
-    )
+    # Same radio as the previous tests, tuned back to 868 MHz if Test 3 moved it
+    node = RadioSession.get().radio(freq=868, power=22, air_speed=2400)
     
-    gold_raw = bytes([0xaa, 0xaa, 0x65, 0x21, 0x24, 0x6d, 0x61, 0x23, 0x11, 0x61, 0x2b, 0x40])
+    gold_raw = load_catalog(868)['gold_fade_in']
     
     print("Testing RAW PIXMOB data (no Waveshare wrapper)...")
     for i in range(10):
@@ -218,11 +194,12 @@ def main():
     print()
     
     try:
-        # Run all tests
-        success = (
-            test_official_format() or
-            test_raw_vs_formatted()
-        )
+        # Run all tests on one radio, closed when they are done
+        with RadioSession.get():
+            success = (
+                test_official_format() or
+                test_raw_vs_formatted()
+            )
         
         if success:
             print("\n[SUCCESS] Found working method!")
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+PIXMOB OOK Transmitter
+Drives the SX1262 DIO2 line with pigpio DMA waveforms instead of a busy-wait loop
+
+The radio must already be in direct transmit mode (see radiolib_raspberry/main.cpp,
+radio.transmitDirect()); this module only keys DIO2 on and off.
+"""
+
+import argparse
+import time
+from collections import namedtuple
+
+import numpy as np
+
+try:
+    import pigpio
+except ImportError:
+    pigpio = None
+
+from pixmob_catalog import load_catalog
+
+DIO2_GPIO = 23            # RADIO_DIO_2_PORT in main.cpp
+BIT_US = 500              # BitDuration in main.cpp; the captures use 510
+TAIL_BITS = 8             # ByteArraySend idles 8 bit cells after every frame
+MAX_DELAY_US = 65535      # Longest delay a single wave_chain delay command can hold
+MAX_LOOP_COUNT = 65535    # Largest repeat count of one wave_chain loop (a 16-bit field)
+
+Pulse = namedtuple('Pulse', 'gpio_on gpio_off delay')
+
+
+def frame_pulses(frame, gpio=DIO2_GPIO, bit_us=BIT_US, tail_bits=TAIL_BITS):
+    """Turn frame bytes into one pulse per run of equal bits, MSB first
+
+    The bits are the same ones ByteArraySend clocks out one by one, but
+    consecutive equal bits become a single DMA pulse.
+    """
+    mask = 1 << gpio
+    bits = np.unpackbits(np.frombuffer(bytes(frame), dtype=np.uint8))
+    bits = np.concatenate((bits, np.zeros(tail_bits, dtype=np.uint8)))
+    if len(bits) == 0:
+        return []
+    changes = np.flatnonzero(np.diff(bits)) + 1
+    starts = np.concatenate(([0], changes))
+    lengths = np.diff(np.concatenate((starts, [len(bits)])))
+    pulses = []
+    for start, length in zip(starts.tolist(), lengths.tolist()):
+        if bits[start]:
+            pulses.append(Pulse(mask, 0, length * bit_us))
+        else:
+            pulses.append(Pulse(0, mask, length * bit_us))
+    return pulses
+
+
+def _loop(body, count):
+    """wave_chain loop of body repeated count times
+
+    Counts above MAX_LOOP_COUNT become a loop of full inner loops plus a
+    remainder, so up to MAX_LOOP_COUNT ** 2 repeats fit with one extra
+    nesting level.
+    """
+    count = int(count)
+    if not 0 <= count <= MAX_LOOP_COUNT ** 2:
+        raise ValueError(f"Repeat count {count} is outside 0..{MAX_LOOP_COUNT ** 2}")
+    if count <= 1:
+        return list(body) * count
+    if count > MAX_LOOP_COUNT:
+        whole, rest = divmod(count, MAX_LOOP_COUNT)
+        return _loop(_loop(body, MAX_LOOP_COUNT), whole) + _loop(body, rest)
+    return [255, 0] + list(body) + [255, 1, count & 0xff, count >> 8]
+
+
+def _delay(microseconds):
+    """wave_chain entries that idle for the given time"""
+    chain = []
+    whole, rest = divmod(int(microseconds), MAX_DELAY_US)
+    if whole:
+        chain += _loop([255, 2, MAX_DELAY_US & 0xff, MAX_DELAY_US >> 8], whole)
+    if rest:
+        chain += [255, 2, rest & 0xff, rest >> 8]
+    return chain
+
+
+class OOKTransmitter:
+    """Compile frames into pigpio waves once and replay them with DMA timing"""
+
+    def __init__(self, pi=None, gpio=DIO2_GPIO, bit_us=BIT_US, tail_bits=TAIL_BITS):
+        self._own_pi = pi is None
+        if pi is None:
+            if pigpio is None:
+                raise RuntimeError("pigpio is not installed (pip install pigpio, then start pigpiod)")
+            pi = pigpio.pi()
+        if not pi.connected:
+            raise RuntimeError("Cannot connect to pigpiod, is the daemon running?")
+        self.pi = pi
+        self.gpio = gpio
+        self.bit_us = bit_us
+        self.tail_bits = tail_bits
+        self._waves = {}
+        pi.set_mode(gpio, 1)      # OUTPUT
+        pi.write(gpio, 0)
+
+    def wave_id(self, frame):
+        """Wave id for a frame, building the waveform on first use"""
+        frame = bytes(frame)
+        wave_id = self._waves.get(frame)
+        if wave_id is None:
+            self.pi.wave_add_new()
+            self.pi.wave_add_generic(frame_pulses(frame, self.gpio, self.bit_us, self.tail_bits))
+            wave_id = self.pi.wave_create()
+            self._waves[frame] = wave_id
+        return wave_id
+
+    def compile(self, commands):
+        """Build waves for every frame of a {name: frame} table up front"""
+        for frame in commands.values():
+            self.wave_id(frame)
+        return len(self._waves)
+
+    def send(self, frame, repeat=1, wait=False):
+        """Transmit a frame repeat times back to back"""
+        self.chain([(frame, repeat)], wait=wait)
+
+    def chain(self, sequence, gap_us=0, wait=False):
+        """Transmit [(frame, repeat), ...] as one DMA chain with gap_us between entries"""
+        chain = []
+        for frame, repeat in sequence:
+            chain += _loop([self.wave_id(frame)], repeat)
+            chain += _delay(gap_us)
+        self.pi.wave_chain(chain)
+        if wait:
+            self.wait()
+
+    def keepalive(self, frame, period_us, count, wait=False):
+        """Send frame every period_us, count times, without any CPU involvement"""
+        frame_us = (len(bytes(frame)) * 8 + self.tail_bits) * self.bit_us
+        idle = max(period_us - frame_us, 0)
+        chain = _loop([self.wave_id(frame)] + _delay(idle), count)
+        self.pi.wave_chain(chain)
+        if wait:
+            self.wait()
+
+    def busy(self):
+        """True while a wave or chain is still being transmitted"""
+        return bool(self.pi.wave_tx_busy())
+
+    def wait(self, poll=0.001):
+        """Block until the current transmission ends"""
+        while self.busy():
+            time.sleep(poll)
+
+    def stop(self):
+        """Abort the current transmission and leave DIO2 low"""
+        self.pi.wave_tx_stop()
+        self.pi.write(self.gpio, 0)
+
+    def close(self):
+        """Free every wave and release the pigpio connection if we opened it"""
+        self.stop()
+        for wave_id in self._waves.values():
+            self.pi.wave_delete(wave_id)
+        self._waves.clear()
+        if self._own_pi:
+            self.pi.stop()
+
+
+def main():
+    """Send a catalog command over OOK"""
+    parser = argparse.ArgumentParser(description="Send a PIXMOB command with pigpio OOK waveforms")
+    parser.add_argument('command', nargs='?', default='nothing', help="catalog command name")
+    parser.add_argument('--repeat', type=int, default=10, help="back-to-back repeats")
+    parser.add_argument('--bit-us', type=int, default=BIT_US, help="bit cell in microseconds (500 or 510)")
+    parser.add_argument('--gpio', type=int, default=DIO2_GPIO, help="BCM pin wired to DIO2")
+    parser.add_argument('--band', type=int, default=868, help="catalog band in MHz")
+    parser.add_argument('--sim', action='store_true', help="use the simulated pigpio and print the pulses")
+    args = parser.parse_args()
+
+    commands = load_catalog(args.band)
+    if args.command not in commands:
+        print(f"[ERROR] Unknown command: {args.command}")
+        print(f"Available commands: {list(commands.keys())}")
+        return
+
+    pi = None
+    if args.sim:
+        import pigpio_sim
+        pi = pigpio_sim.pi()
+
+    transmitter = OOKTransmitter(pi, args.gpio, args.bit_us)
+    print(f"Compiled {transmitter.compile(commands)} waveforms")
+    try:
+        transmitter.send(commands[args.command], repeat=args.repeat, wait=True)
+        print(f"[SUCCESS] Sent '{args.command}' {args.repeat} times")
+        if args.sim:
+            pulses = pi.transmissions[-1]
+            total = sum(p.delay for p in pulses)
+            print(f"{len(pulses)} pulses, {total / 1000:.1f} ms on the wire")
+    finally:
+        transmitter.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+PIXMOB Radio Helpers
+UART and air time of the Waveshare SX126X HAT in transparent/fixed-point mode,
+and in-place reconfiguration of a live sx126x radio
+"""
+
+import math
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+
+SERIAL_PORT = "/dev/ttyS0"
+UART_BAUD = 9600          # sx126x.py always opens the port at 9600 8N1
+UART_BITS_PER_BYTE = 10   # Start + 8 data + stop bit
+MAX_PACKET = 240          # Default buffer_size: longer writes go out as several packets
+MODULE_BUFFER = 1000      # Bytes the module can hold before it starts dropping data
+PACKET_OVERHEAD = 10      # Preamble, header and CRC of one LoRa packet, in byte times
+SEND_SETTLE = 0.1         # sx126x.send() sleeps this long before and after the write
+
+AIR_SPEEDS = (1200, 2400, 4800, 9600, 19200, 38400, 62500)
+
+# Register map of the E22 core behind the HAT, as written by sx126x.set()
+REG_AIR_SPEED = 0x03      # Low 3 bits; the UART settings above them are kept
+REG_POWER = 0x04          # Low 2 bits; buffer size and RSSI noise bits are kept
+REG_CHANNEL = 0x05        # Offset in MHz from the module's base frequency
+REGISTER_COUNT = 9
+CFG_HEADER = 3            # sx126x.cfg_reg starts with the C2 00 09 write command
+AIR_SPEED_CODES = {speed: code for code, speed in enumerate(AIR_SPEEDS, start=1)}
+POWER_CODES = {22: 0x00, 17: 0x01, 13: 0x02, 10: 0x03}
+BAND_CHANNELS = {850: 80, 410: 83}   # Highest channel offset for each base frequency
+
+CONFIG_SETTLE = 0.1       # sx126x.set() waits this long after switching M0/M1
+CONFIG_TIMEOUT = 0.5      # Longest wait for the module to echo a register write
+CONFIG_ATTEMPTS = 2       # sx126x.set() also tries a configuration write twice
+LATENCY_HISTORY = 256     # Reconfiguration latencies kept for reconfigure_stats()
+
+# Settings a RadioSession opens the HAT with unless told otherwise
+DEFAULT_CONFIG = {'freq': 868, 'addr': 0, 'power': 22, 'rssi': False, 'air_speed': 2400, 'relay': False}
+RECONFIGURABLE = ('freq', 'power', 'air_speed')   # What reconfigure() can change on a live radio
+
+Reconfiguration = namedtuple('Reconfiguration', 'fields start data seconds')
+
+_latencies = deque(maxlen=LATENCY_HISTORY)
+_skipped = 0
+
+
+def uart_time(nbytes, baud=UART_BAUD):
+    """Seconds needed to clock nbytes over the UART"""
+    return nbytes * UART_BITS_PER_BYTE / baud
+
+
+def packet_count(nbytes, packet_size=MAX_PACKET):
+    """Number of LoRa packets the module splits a write into"""
+    return max(1, math.ceil(nbytes / packet_size))
+
+
+def airtime(nbytes, air_speed=2400, packet_size=MAX_PACKET):
+    """Approximate seconds on air for nbytes at a given air_speed in bps
+
+    The air data rate setting is treated as the net bit rate, with a fixed
+    per-packet overhead for preamble, header and CRC.
+    """
+    if air_speed not in AIR_SPEEDS:
+        raise ValueError(f"Unsupported air_speed {air_speed}, expected one of {AIR_SPEEDS}")
+    packets = packet_count(nbytes, packet_size)
+    return (nbytes + packets * PACKET_OVERHEAD) * 8 / air_speed
+
+
+def max_frame_rate(nbytes, air_speed=2400, baud=UART_BAUD):
+    """Upper bound on frames per second when frames are sent back to back"""
+    return 1.0 / max(uart_time(nbytes, baud), airtime(nbytes, air_speed))
+
+
+def _read_response(lora, size, sleep, clock):
+    """Collect up to size bytes of the module's reply, giving up after CONFIG_TIMEOUT"""
+    deadline = clock() + CONFIG_TIMEOUT
+    response = b''
+    while len(response) < size and clock() < deadline:
+        waiting = lora.ser.inWaiting()
+        if waiting:
+            response += lora.ser.read(waiting)
+        else:
+            sleep(0.005)
+    return response
+
+
+def driver_gpio(lora):
+    """The GPIO module the sx126x driver behind lora switches M0/M1 with"""
+    # sx126x.py does `import RPi.GPIO as GPIO`; under the simulator that is its SimGPIO.
+    # The class's own module is no help there: sx126x_sim.py run as a launcher is __main__,
+    # which runpy replaces with the script, while install() keeps it as sys.modules['sx126x'].
+    return sys.modules['sx126x'].GPIO
+
+
+def reconfigure(lora, freq=None, power=None, air_speed=None):
+    """Change frequency, power and/or air speed of a live sx126x radio in place
+
+    Instead of building a new sx126x (reopening the port and rewriting all
+    nine registers), only the registers that differ from the driver's
+    cfg_reg image are written, as one C2 <start> <length> command in config
+    mode. Nothing is written when the radio already has these settings.
+    Returns a Reconfiguration with the changed fields and the time taken.
+    """
+    global _skipped
+    current = list(lora.cfg_reg[CFG_HEADER:CFG_HEADER + REGISTER_COUNT])
+    registers = list(current)
+    fields = []
+
+    if freq is not None:
+        offset = freq - lora.start_freq
+        if not 0 <= offset <= BAND_CHANNELS[lora.start_freq]:
+            raise ValueError(f"{freq} MHz is outside the band of this module ({lora.start_freq} MHz base)")
+        registers[REG_CHANNEL] = offset
+    if power is not None:
+        if power not in POWER_CODES:
+            raise ValueError(f"Unsupported power {power}, expected one of {tuple(POWER_CODES)}")
+        registers[REG_POWER] = (registers[REG_POWER] & ~0x03) | POWER_CODES[power]
+    if air_speed is not None:
+        if air_speed not in AIR_SPEED_CODES:
+            raise ValueError(f"Unsupported air_speed {air_speed}, expected one of {AIR_SPEEDS}")
+        registers[REG_AIR_SPEED] = (registers[REG_AIR_SPEED] & ~0x07) | AIR_SPEED_CODES[air_speed]
+
+    changed = [address for address in range(REGISTER_COUNT) if registers[address] != current[address]]
+    if not changed:
+        _skipped += 1
+        return Reconfiguration((), None, b'', 0.0)
+    for name, address in (('freq', REG_CHANNEL), ('power', REG_POWER), ('air_speed', REG_AIR_SPEED)):
+        if address in changed:
+            fields.append(name)
+
+    start, end = min(changed), max(changed) + 1
+    command = bytes([0xC2, start, end - start] + registers[start:end])
+    expected = bytes([0xC1]) + command[1:]
+
+    # Same GPIO module the driver's set() uses, and the simulated clock when there is one
+    gpio = driver_gpio(lora)
+    sleep = getattr(lora, 'sleep', time.sleep)
+    clock = getattr(lora, 'now', time.monotonic)
+
+    began = clock()
+    gpio.output(lora.M0, gpio.LOW)
+    gpio.output(lora.M1, gpio.HIGH)
+    sleep(CONFIG_SETTLE)
+    try:
+        for _ in range(CONFIG_ATTEMPTS):
+            lora.ser.flushInput()
+            lora.ser.write(command)
+            if _read_response(lora, len(expected), sleep, clock) == expected:
+                break
+        else:
+            raise RuntimeError(f"Module did not acknowledge register write {command.hex()}")
+    finally:
+        gpio.output(lora.M0, gpio.LOW)
+        gpio.output(lora.M1, gpio.LOW)
+        sleep(CONFIG_SETTLE)
+    seconds = clock() - began
+
+    lora.cfg_reg[CFG_HEADER + start:CFG_HEADER + end] = registers[start:end]
+    if freq is not None:
+        lora.freq = freq
+        lora.offset_freq = freq - lora.start_freq
+    if power is not None:
+        lora.power = power
+    if air_speed is not None:
+        lora.air_speed = air_speed
+    _latencies.append(seconds)
+    return Reconfiguration(tuple(fields), start, command[3:], seconds)
+
+
+def reconfigure_stats():
+    """Latency of recent reconfigure() writes in milliseconds, and how many were skipped"""
+    latencies = sorted(_latencies)
+    if not latencies:
+        return {'writes': 0, 'skipped': _skipped}
+    return {
+        'writes': len(latencies),
+        'skipped': _skipped,
+        'mean_ms': 1000 * sum(latencies) / len(latencies),
+        'p50_ms': 1000 * latencies[(len(latencies) - 1) // 2],
+        'max_ms': 1000 * latencies[-1],
+    }
+
+
+class RadioSession:
+    """Process-wide owner of the HAT, shared by every test and script in a run
+
+    The serial port and GPIO are opened lazily, the first time a caller asks
+    for the radio, and every later caller gets the same sx126x object. Later
+    requests for other settings go through reconfigure() on that object.
+    Used as a context manager (nesting is fine) the session closes the port
+    and releases the GPIO pins when the outermost block exits:
+
+        with RadioSession.get() as session:
+            lora = session.radio(freq=915)
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, serial_num=SERIAL_PORT, **config):
+        self.serial_num = serial_num
+        self.config = dict(DEFAULT_CONFIG, **config)
+        self.lora = None
+        self.init_seconds = None
+        self.opens = 0
+        self._gpio = None
+        self._lock = threading.RLock()
+        self._depth = 0
+
+    @classmethod
+    def get(cls, serial_num=None, **config):
+        """The shared session, created on first call
+
+        Later calls may change freq, power and air_speed, which are applied
+        to the live radio. Asking for another serial port or any other
+        setting than the session has raises ValueError.
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls(serial_num or SERIAL_PORT, **config)
+                return cls._instance
+            session = cls._instance
+        if serial_num is not None and serial_num != session.serial_num:
+            raise ValueError(f"Radio session is open on {session.serial_num}, not {serial_num}")
+        fixed = {name: value for name, value in config.items() if name not in RECONFIGURABLE}
+        differing = sorted(name for name, value in fixed.items() if session.config.get(name) != value)
+        if differing:
+            raise ValueError(f"Radio session was opened with other {', '.join(differing)} settings")
+        settings = {name: value for name, value in config.items() if name in RECONFIGURABLE}
+        with session._lock:
+            if session.lora is None:
+                # Still lazy: the radio opens with these settings on first use
+                session.config.update(settings)
+            elif settings:
+                session.configure(**settings)
+        return session
+
+    def gpio(self):
+        """RPi.GPIO in BCM mode, set up once for the whole run"""
+        with self._lock:
+            if self._gpio is None:
+                # The same module the driver imports; install() points it at SimGPIO
+                import RPi.GPIO as gpio
+                gpio.setmode(gpio.BCM)
+                gpio.setwarnings(False)
+                self._gpio = gpio
+            return self._gpio
+
+    def _open(self, settings):
+        # Imported here so this module stays usable without the HAT driver
+        import sx126x
+
+        self.config.update(settings)
+        config = self.config
+        started = time.monotonic()
+        self.lora = sx126x.sx126x(
+            serial_num=self.serial_num,
+            freq=config['freq'],
+            addr=config['addr'],
+            power=config['power'],
+            rssi=config['rssi'],
+            air_speed=config['air_speed'],
+            relay=config['relay']
+        )
+        self.init_seconds = time.monotonic() - started
+        self.opens += 1
+        self._gpio = sx126x.GPIO
+
+    def configure(self, freq=None, power=None, air_speed=None):
+        """Apply settings to the shared radio, opening it on first use
+
+        Returns the Reconfiguration; it is empty when the radio was just
+        opened with these settings or already had them.
+        """
+        settings = {name: value for name, value in
+                    (('freq', freq), ('power', power), ('air_speed', air_speed)) if value is not None}
+        with self._lock:
+            if self.lora is None:
+                self._open(settings)
+                return Reconfiguration((), None, b'', 0.0)
+            change = reconfigure(self.lora, **settings)
+            self.config.update(settings)
+            return change
+
+    def radio(self, freq=None, power=None, air_speed=None):
+        """The shared sx126x object with these settings applied"""
+        with self._lock:
+            self.configure(freq, power, air_speed)
+            return self.lora
+
+    def send(self, data):
+        """Send on the shared radio with whatever settings it has"""
+        self.radio().send(data)
+
+    def close(self):
+        """Close the serial port and release the GPIO pins"""
+        with self._lock:
+            if self.lora is not None:
+                self.lora.ser.close()
+                self.lora = None
+            if self._gpio is not None:
+                self._gpio.cleanup()
+                self._gpio = None
+        with RadioSession._instance_lock:
+            if RadioSession._instance is self:
+                RadioSession._instance = None
+
+    def __enter__(self):
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._depth -= 1
+        if self._depth == 0:
+            self.close()
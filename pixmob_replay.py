@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+PIXMOB Capture Replay
+Streams Flipper RAW captures straight to the OOK output with pigpio DMA waves
+
+A capture is never loaded whole: RawReader hands out blocks of durations,
+which are cut into chunks of about CHUNK_US and turned into pigpio waves.
+Only two waves exist at a time. While one is on air the next is queued with
+WAVE_MODE_ONE_SHOT_SYNC, so it starts exactly when the first ends, and the
+finished wave is deleted before the one after is built.
+
+Low periods longer than the silence threshold are shortened to keep_us, so
+full game recordings play without waiting through the dead air between
+cues (what the hand-trimmed amod_ files were for). A speed factor scales
+every duration. Rounding is done on the running total rather than per
+pulse, so a long replay does not drift.
+
+The radio must already be in direct transmit mode, as for pixmob_ook.py.
+
+Usage:
+    python3 pixmob_replay.py rf/raw_wild_rf_captures/cavs_2023_playoffs_game_1_915Mhz/RAW_20230415-175400.sub
+    python3 pixmob_replay.py --sim --speed 4 rf/raw_wild_rf_captures/cavs_2023_playoffs_game_1_915Mhz/*.sub
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+try:
+    import pigpio
+except ImportError:
+    pigpio = None
+
+from pixmob_ook import DIO2_GPIO, Pulse
+from pixmob_stream import RawReader
+
+CHUNK_US = 200000         # Air time per wave; building the next one must take less than this
+MAX_CHUNK_PULSES = 4000   # Well under pigpio's per-wave pulse limit
+SILENCE_US = 500000       # Low periods at least this long are compressed...
+KEEP_US = 50000           # ...down to this
+WAVE_MODE_ONE_SHOT = 0
+WAVE_MODE_ONE_SHOT_SYNC = 2
+POLL = 0.0005             # Seconds between wave_tx_at() checks near a chunk boundary
+
+
+class ReplayStats:
+    """What a replay did, in microseconds unless noted"""
+
+    def __init__(self):
+        self.files = 0
+        self.pulses = 0
+        self.chunks = 0
+        self.recorded_us = 0
+        self.played_us = 0
+        self.silences = 0
+        self.silence_saved_us = 0
+        self.underruns = 0
+        self.build_max = 0.0      # Seconds spent building the slowest wave
+
+    def summary(self):
+        return (f"{self.files} files, {self.pulses} pulses in {self.chunks} waves; "
+                f"{self.recorded_us / 1e6:.1f}s recorded, {self.played_us / 1e6:.1f}s played, "
+                f"{self.silences} silences compressed ({self.silence_saved_us / 1e6:.1f}s saved), "
+                f"{self.underruns} underruns, slowest wave built in {self.build_max * 1000:.1f} ms")
+
+
+def scaled_durations(paths, speed=1.0, silence_us=SILENCE_US, keep_us=KEEP_US, stats=None):
+    """Yield signed duration arrays for every capture in turn, compressed and scaled
+
+    Files are joined with a keep_us low period. The output totals track the
+    exact scaled total to the microsecond, however long the replay runs.
+    """
+    stats = stats if stats is not None else ReplayStats()
+    exact = 0.0               # Scaled time so far, unrounded
+    emitted = 0               # Microseconds handed out so far
+    for index, path in enumerate(paths):
+        stats.files += 1
+        blocks = RawReader(path).blocks()
+        if index:
+            blocks = _prepend(np.array([-keep_us], dtype=np.int64), blocks)
+        for values in blocks:
+            stats.recorded_us += int(np.abs(values).sum())
+            if silence_us:
+                long_low = values <= -silence_us
+                if long_low.any():
+                    stats.silences += int(long_low.sum())
+                    stats.silence_saved_us += int((-values[long_low] - keep_us).sum())
+                    values = np.where(long_low, -keep_us, values)
+            ends = exact + np.cumsum(np.abs(values)) / speed
+            exact = float(ends[-1])
+            rounded = np.round(ends).astype(np.int64)
+            durations = np.diff(np.concatenate(([emitted], rounded)))
+            emitted = int(rounded[-1])
+            # A pulse rounded away entirely cannot be sent; its time stays in the total
+            keep = durations > 0
+            yield np.where(values > 0, durations, -durations)[keep]
+
+
+def _prepend(first, blocks):
+    yield first
+    yield from blocks
+
+
+def chunks(durations, chunk_us=CHUNK_US, max_pulses=MAX_CHUNK_PULSES):
+    """Regroup duration arrays into arrays of about chunk_us or max_pulses each"""
+    pending = []
+    size = 0
+    total = 0
+    for values in durations:
+        while len(values):
+            times = total + np.cumsum(np.abs(values))
+            # First pulse that reaches the chunk length, or the pulse limit
+            stop = min(int(np.searchsorted(times, chunk_us)) + 1, max_pulses - size, len(values))
+            pending.append(values[:stop])
+            size += stop
+            total = int(times[stop - 1])
+            values = values[stop:]
+            if total >= chunk_us or size >= max_pulses:
+                yield np.concatenate(pending)
+                pending, size, total = [], 0, 0
+    if pending:
+        yield np.concatenate(pending)
+
+
+class Replayer:
+    """Plays duration chunks on a GPIO with two pigpio waves in flight"""
+
+    def __init__(self, pi=None, gpio=DIO2_GPIO):
+        self._own_pi = pi is None
+        if pi is None:
+            if pigpio is None:
+                raise RuntimeError("pigpio is not installed (pip install pigpio, then start pigpiod)")
+            pi = pigpio.pi()
+        if not pi.connected:
+            raise RuntimeError("Cannot connect to pigpiod, is the daemon running?")
+        self.pi = pi
+        self.gpio = gpio
+        pi.set_mode(gpio, 1)      # OUTPUT
+        pi.write(gpio, 0)
+
+    def _build(self, durations):
+        mask = 1 << self.gpio
+        pulses = [Pulse(mask, 0, value) if value > 0 else Pulse(0, mask, -value)
+                  for value in durations.tolist()]
+        self.pi.wave_add_new()
+        self.pi.wave_add_generic(pulses)
+        return self.pi.wave_create()
+
+    def _wait_started(self, wave_id, previous, previous_end):
+        """Block until the previous wave has handed over to wave_id"""
+        remaining = previous_end - time.monotonic() - 0.005
+        if remaining > 0:
+            time.sleep(remaining)
+        while self.pi.wave_tx_at() == previous:
+            time.sleep(POLL)
+
+    def play(self, chunk_iter, stats=None):
+        """Transmit every chunk back to back; returns the stats"""
+        stats = stats if stats is not None else ReplayStats()
+        current = None
+        current_end = 0.0
+        try:
+            for durations in chunk_iter:
+                started = time.monotonic()
+                wave_id = self._build(durations)
+                stats.build_max = max(stats.build_max, time.monotonic() - started)
+                length = int(np.abs(durations).sum())
+                if current is None:
+                    self.pi.wave_send_using_mode(wave_id, WAVE_MODE_ONE_SHOT)
+                    current_end = time.monotonic() + length / 1e6
+                else:
+                    if not self.pi.wave_tx_busy():
+                        # The previous wave ran out before this one was ready: a gap on air
+                        stats.underruns += 1
+                    self.pi.wave_send_using_mode(wave_id, WAVE_MODE_ONE_SHOT_SYNC)
+                    self._wait_started(wave_id, current, current_end)
+                    self.pi.wave_delete(current)
+                    current_end = max(current_end, time.monotonic()) + length / 1e6
+                current = wave_id
+                stats.chunks += 1
+                stats.pulses += len(durations)
+                stats.played_us += length
+            while self.pi.wave_tx_busy():
+                time.sleep(POLL)
+        finally:
+            self.pi.wave_tx_stop()
+            self.pi.write(self.gpio, 0)
+            if current is not None:
+                self.pi.wave_delete(current)
+        return stats
+
+    def close(self):
+        if self._own_pi:
+            self.pi.stop()
+
+
+def replay(paths, pi=None, gpio=DIO2_GPIO, speed=1.0, silence_us=SILENCE_US, keep_us=KEEP_US,
+           chunk_us=CHUNK_US):
+    """Stream captures to the OOK output; returns ReplayStats"""
+    stats = ReplayStats()
+    replayer = Replayer(pi, gpio)
+    try:
+        durations = scaled_durations(paths, speed, silence_us, keep_us, stats)
+        return replayer.play(chunks(durations, chunk_us), stats)
+    finally:
+        replayer.close()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Replay Flipper RAW captures on the OOK output")
+    parser.add_argument('paths', nargs='+', help=".sub files or folders of them, played in order")
+    parser.add_argument('--speed', type=float, default=1.0, help="playback speed factor")
+    parser.add_argument('--silence-ms', type=float, default=SILENCE_US / 1000,
+                        help="compress low periods at least this long (0 = never)")
+    parser.add_argument('--keep-ms', type=float, default=KEEP_US / 1000, help="length a compressed silence keeps")
+    parser.add_argument('--chunk-ms', type=float, default=CHUNK_US / 1000, help="air time per pigpio wave")
+    parser.add_argument('--gpio', type=int, default=DIO2_GPIO, help="BCM pin wired to DIO2")
+    parser.add_argument('--sim', action='store_true', help="use the simulated pigpio")
+    args = parser.parse_args()
+
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+    paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            paths += sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.sub'))
+        else:
+            paths.append(path)
+
+    pi = None
+    if args.sim:
+        import pigpio_sim
+        pi = pigpio_sim.pi()
+
+    started = time.monotonic()
+    try:
+        stats = replay(paths, pi, args.gpio, args.speed, int(args.silence_ms * 1000), int(args.keep_ms * 1000),
+                       int(args.chunk_ms * 1000))
+    except KeyboardInterrupt:
+        print("\nReplay interrupted by user.")
+        return
+    elapsed = time.monotonic() - started
+    print(stats.summary())
+    print(f"Wall time {elapsed:.1f}s for {stats.played_us / 1e6:.1f}s of pulses")
+    if args.sim:
+        sent = sum(p.delay for wave in pi.transmissions for p in wave)
+        print(f"Simulated output: {len(pi.transmissions)} waves, {sent / 1e6:.3f}s on the GPIO")
+
+
+if __name__ == "__main__":
+    main()
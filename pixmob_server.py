@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+PIXMOB Cue Server
+Takes cues over UDP (and WebSocket, with the websockets package) instead of the input() menu
+
+Every message is one cue, either plain text or JSON:
+
+    white_fastfade                  command with the default repeat and interval
+    white_fastfade 4 0.25           repeat 4 times, 0.25 s apart
+    {"command": "white_fastfade", "repeat": 4, "interval": 0.25, "wrapped": true, "id": 7}
+    show demo                       play shows/demo.json (or {"show": "demo"})
+    stop                            cancel the running show and everything queued
+    status
+
+Cues are queued on AsyncPIXMOBController without waiting. When the radio is
+saturated the cue is refused with "busy" instead of piling up. The reply to
+a cue is sent once sx126x.send() has returned for its first frame, with
+three times measured from the moment the message arrived:
+
+    dispatch_ms     until the frame was handed to sx126x.send()
+    written_ms      until the UART write ended (send() then sleeps SEND_SETTLE more)
+    latency_ms      until send() returned
+
+A sub-10 ms cue-to-first-frame path is not reachable with the Waveshare
+driver: send() sleeps SEND_SETTLE (100 ms) before writing, and the 18-byte
+wrapped frame alone takes about 19 ms on the 9600 baud UART. Our own part
+of the path is dispatch_ms, a fraction of a millisecond.
+
+Usage:
+    python3 pixmob_server.py                         # UDP on port 5406
+    python3 pixmob_server.py --ws-port 8765          # plus WebSocket
+    python3 pixmob_server.py send white_fastfade     # send one cue and print the reply
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import time
+from collections import deque
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+from pixmob_radio import SEND_SETTLE
+from pixmob_show import compile_show, load_show
+
+UDP_PORT = 5406
+DEFAULT_REPEAT = 1        # Cues from a desk are usually re-sent by the desk itself
+DEFAULT_INTERVAL = 0.1
+LATENCY_HISTORY = 1000    # Recent cue latencies the status percentiles are taken from
+ShowsPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shows')
+
+
+def parse_cue(data):
+    """A message as a dict; plain text is 'command [repeat [interval]]' or a keyword"""
+    text = data.decode() if isinstance(data, bytes) else data
+    text = text.strip()
+    if text.startswith('{'):
+        cue = json.loads(text)
+        if not isinstance(cue, dict):
+            raise ValueError("Expected a JSON object")
+        for field in ('command', 'show', 'action'):
+            if field in cue and not isinstance(cue[field], str):
+                raise ValueError(f"'{field}' must be a string")
+        return cue
+    words = text.split()
+    if not words:
+        raise ValueError("Empty message")
+    if words[0] in ('stop', 'status'):
+        return {'action': words[0]}
+    if words[0] == 'show':
+        if len(words) != 2:
+            raise ValueError("Usage: show NAME")
+        return {'show': words[1]}
+    cue = {'command': words[0]}
+    if len(words) > 1:
+        cue['repeat'] = int(words[1])
+    if len(words) > 2:
+        cue['interval'] = float(words[2])
+    return cue
+
+
+def show_path(name):
+    """Path of a show in the shows folder; network clients cannot name any other file"""
+    base = os.path.basename(name)
+    for candidate in (base, base + '.json', base + '.yaml', base + '.yml'):
+        path = os.path.join(ShowsPath, candidate)
+        if os.path.isfile(path):
+            return path
+    raise ValueError(f"Unknown show: {name}")
+
+
+class CueServer:
+    """Turns network messages into transmissions on one AsyncPIXMOBController"""
+
+    def __init__(self, transmitter):
+        self.transmitter = transmitter
+        self.show_task = None
+        self.refused = 0
+        self.cues = 0
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+
+    async def handle(self, data, received):
+        """Reply (a dict) to one message that arrived at time.monotonic() received"""
+        try:
+            cue = parse_cue(data)
+        except (ValueError, UnicodeDecodeError) as e:
+            return {'ok': False, 'error': str(e)}
+        reply = {'id': cue['id']} if 'id' in cue else {}
+
+        if cue.get('action') == 'status':
+            reply.update(self.status())
+            return reply
+        if cue.get('action') == 'stop':
+            reply.update(ok=True, cancelled=self.stop_all())
+            return reply
+        if 'show' in cue:
+            reply.update(self.start_show(cue['show']))
+            return reply
+
+        if 'command' not in cue:
+            reply.update(ok=False, error="Missing 'command'")
+            return reply
+        try:
+            transmission = self.transmitter.submit(cue['command'], int(cue.get('repeat', DEFAULT_REPEAT)),
+                                                   float(cue.get('interval', DEFAULT_INTERVAL)),
+                                                   bool(cue.get('wrapped', True)))
+        except asyncio.QueueFull:
+            self.refused += 1
+            reply.update(ok=False, error='busy', pending=self.transmitter.pending)
+            return reply
+        except (KeyError, TypeError, ValueError) as e:
+            reply.update(ok=False, error=str(e))
+            return reply
+
+        try:
+            started = await transmission.started
+        except asyncio.CancelledError:
+            reply.update(ok=False, error='cancelled')
+            return reply
+        except Exception as e:
+            reply.update(ok=False, error=str(e))
+            return reply
+        latency = started - received
+        self.cues += 1
+        self.latencies.append(latency)
+        # started is stamped when send() returned, SEND_SETTLE after the bytes left the UART
+        reply.update(ok=True, command=transmission.name,
+                     dispatch_ms=round((transmission.dispatched_at - received) * 1000, 3),
+                     written_ms=round((latency - SEND_SETTLE) * 1000, 3),
+                     latency_ms=round(latency * 1000, 3))
+        return reply
+
+    def start_show(self, name):
+        try:
+            schedule = compile_show(load_show(show_path(name)))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            return {'ok': False, 'error': str(e)}
+        self.stop_all()
+        self.show_task = asyncio.create_task(self._play(schedule))
+        duration = schedule[-1].offset if schedule else 0.0
+        return {'ok': True, 'show': name, 'frames': len(schedule), 'duration': duration}
+
+    async def _play(self, schedule):
+        """Queue each show frame when due; a full queue skips that frame, not the rest"""
+        start = time.monotonic()
+        for frame in schedule:
+            delay = start + frame.offset - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                self.transmitter.submit(frame.command, 1, 0.0, frame.wrapped)
+            except asyncio.QueueFull:
+                self.refused += 1
+            except KeyError as e:
+                print(f"[ERROR] Show frame skipped: {e}")
+
+    def stop_all(self):
+        """Cancel the running show and every queued transmission; returns how many were dropped"""
+        if self.show_task is not None:
+            self.show_task.cancel()
+            self.show_task = None
+        return self.transmitter.cancel_all()
+
+    def status(self):
+        ordered = sorted(self.latencies)
+        return {
+            'ok': True,
+            'pending': self.transmitter.pending,
+            'show': self.show_task is not None and not self.show_task.done(),
+            'refused': self.refused,
+            'cues': self.cues,
+            'latency_p50_ms': round(ordered[len(ordered) // 2] * 1000, 3) if ordered else None,
+            'latency_max_ms': round(ordered[-1] * 1000, 3) if ordered else None,
+        }
+
+
+class UDPCueProtocol(asyncio.DatagramProtocol):
+    """One datagram per cue; the reply goes back to the sender"""
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        # The loop only keeps weak references to tasks; these must not vanish mid-reply
+        self._tasks = set()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        received = time.monotonic()
+        task = asyncio.ensure_future(self._reply(data, address, received))
+        self._tasks.add(task)
+        task.add_done_callback(self._reply_done)
+
+    def _reply_done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[ERROR] Reply failed: {task.exception()}")
+
+    async def _reply(self, data, address, received):
+        reply = await self.server.handle(data, received)
+        self.transport.sendto(json.dumps(reply).encode(), address)
+
+
+async def serve(host, udp_port, ws_port=None, max_pending=None, controller=None):
+    """Run the cue server until cancelled"""
+    # Imported here so the 'send' client runs without the radio driver
+    from pixmob_async import AsyncPIXMOBController
+    kwargs = {'max_pending': max_pending} if max_pending else {}
+    async with AsyncPIXMOBController(controller, **kwargs) as transmitter:
+        server = CueServer(transmitter)
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(lambda: UDPCueProtocol(server),
+                                                           local_addr=(host, udp_port))
+        print(f"[INFO] Listening for cues on UDP {host}:{udp_port}")
+
+        ws_server = None
+        if ws_port:
+            if websockets is None:
+                raise RuntimeError("The websockets package is required for --ws-port (pip install websockets)")
+
+            async def ws_handler(websocket, path=None):
+                async for message in websocket:
+                    received = time.monotonic()
+                    await websocket.send(json.dumps(await server.handle(message, received)))
+
+            ws_server = await websockets.serve(ws_handler, host, ws_port)
+            print(f"[INFO] Listening for cues on WebSocket {host}:{ws_port}")
+
+        try:
+            await asyncio.Event().wait()
+        finally:
+            server.stop_all()
+            transport.close()
+            if ws_server is not None:
+                ws_server.close()
+                await ws_server.wait_closed()
+
+
+def send_cue(host, port, message, timeout=5.0):
+    """Send one cue over UDP; returns (reply dict, round trip seconds)"""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.settimeout(timeout)
+        started = time.monotonic()
+        sock.sendto(message.encode(), (host, port))
+        data, _ = sock.recvfrom(65536)
+        return json.loads(data), time.monotonic() - started
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Network cue server for the PIXMOB controller")
+    parser.add_argument('--host', default='0.0.0.0', help="address to listen on (send: server address)")
+    parser.add_argument('--port', type=int, default=UDP_PORT, help="UDP port")
+    parser.add_argument('--ws-port', type=int, help="also accept cues over WebSocket on this port")
+    parser.add_argument('--max-pending', type=int, help="queued cues before new ones are refused")
+    parser.add_argument('send', nargs='*', metavar='send MESSAGE',
+                        help="instead of serving, send one cue to a running server and print the reply")
+    args = parser.parse_args()
+
+    if args.send:
+        if args.send[0] != 'send' or len(args.send) < 2:
+            parser.error("usage: pixmob_server.py send MESSAGE")
+        host = '127.0.0.1' if args.host == '0.0.0.0' else args.host
+        reply, round_trip = send_cue(host, args.port, ' '.join(args.send[1:]))
+        print(json.dumps(reply))
+        print(f"Round trip {round_trip * 1000:.2f} ms")
+        return
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.ws_port, args.max_pending))
+    except KeyboardInterrupt:
+        print("\nCue server stopped.")
+
+
+if __name__ == "__main__":
+    main()
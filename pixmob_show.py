@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+PIXMOB Show Timeline
+Compiles a JSON/YAML cue list into a deadline schedule and plays it on time
+"""
+
+import argparse
+import json
+import time
+from collections import namedtuple
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+from pixmob_catalog import load_catalog
+
+DEFAULT_BAND = 868
+DEFAULT_REPEAT = 2
+DEFAULT_INTERVAL = 0.5
+SPIN = 0.002              # Busy-wait this close to a deadline instead of sleeping
+
+ScheduledFrame = namedtuple('ScheduledFrame', 'offset cue repeat band command wrapped label')
+
+
+def load_show(path):
+    """Read a show file (.json, or .yaml/.yml when PyYAML is installed)"""
+    with open(path, 'r') as file:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise RuntimeError("PyYAML is required for YAML show files (pip install pyyaml)")
+            return yaml.safe_load(file)
+        return json.load(file)
+
+
+def show_from_sequence(sequence, spacing=4.0, repeat=DEFAULT_REPEAT, interval=DEFAULT_INTERVAL, band=DEFAULT_BAND):
+    """Build a show for one band from (command, label) pairs placed spacing seconds apart"""
+    cues = [{'at': index * spacing, 'command': command, 'label': label, 'repeat': repeat, 'interval': interval}
+            for index, (command, label) in enumerate(sequence)]
+    return {'name': 'Demo Light Show', 'band': band, 'cues': cues}
+
+
+def compile_show(show):
+    """Expand every cue into its frames and sort them by absolute offset
+
+    Each cue is {"at": seconds, "command": name} with optional "repeat",
+    "interval", "band", "wrapped" and "label"; show-level "band", "repeat"
+    and "interval" set the defaults. Unknown commands raise ValueError here
+    rather than in the middle of a show.
+    """
+    band_default = show.get('band', DEFAULT_BAND)
+    repeat_default = show.get('repeat', DEFAULT_REPEAT)
+    interval_default = show.get('interval', DEFAULT_INTERVAL)
+
+    schedule = []
+    for index, cue in enumerate(show['cues']):
+        band = cue.get('band', band_default)
+        command = cue['command']
+        if command not in load_catalog(band):
+            raise ValueError(f"Cue {index}: unknown command '{command}' for {band} MHz")
+        at = float(cue['at'])
+        if at < 0:
+            raise ValueError(f"Cue {index}: negative offset {at}")
+        interval = float(cue.get('interval', interval_default))
+        label = cue.get('label', command)
+        wrapped = cue.get('wrapped', True)
+        for repeat in range(int(cue.get('repeat', repeat_default))):
+            schedule.append(ScheduledFrame(at + repeat * interval, index, repeat, band, command, wrapped, label))
+
+    # Stable sort keeps cue order for frames due at the same instant
+    schedule.sort(key=lambda frame: frame.offset)
+    return schedule
+
+
+def _wait_until(deadline):
+    remaining = deadline - time.monotonic()
+    if remaining > SPIN:
+        time.sleep(remaining - SPIN)
+    while time.monotonic() < deadline:
+        pass
+
+
+def run_show(schedule, controllers, lead=0.1, verbose=True):
+    """Play a compiled schedule; controllers maps band (MHz) to PIXMOBController
+
+    Every frame is due at show start + its offset on time.monotonic(), so a
+    slow transmit only delays that frame and never shifts the rest of the
+    show. Returns the per-frame lateness report.
+    """
+    frames = {}
+    for frame in schedule:
+        controller = controllers.get(frame.band)
+        if controller is not None and (frame.band, frame.command, frame.wrapped) not in frames:
+            if frame.wrapped:
+                frames[frame.band, frame.command, frame.wrapped] = controller.wrapped_frame(frame.command)
+            else:
+                frames[frame.band, frame.command, frame.wrapped] = controller.commands[frame.command]
+
+    lateness = []
+    cue_lateness = {}
+    skipped = 0
+    start = time.monotonic() + lead
+    for frame in schedule:
+        controller = controllers.get(frame.band)
+        if controller is None:
+            skipped += 1
+            continue
+        deadline = start + frame.offset
+        _wait_until(deadline)
+        late = time.monotonic() - deadline
+        try:
+            controller.send_frame(frames[frame.band, frame.command, frame.wrapped])
+        except Exception as e:
+            print(f"[ERROR] Cue {frame.cue} ({frame.label}) failed: {e}")
+            continue
+        lateness.append(late)
+        if frame.repeat == 0:
+            cue_lateness[frame.cue] = late
+            if verbose:
+                print(f"  [{frame.offset:8.3f}s] {frame.label} ({frame.band} MHz), late {late * 1000:.2f} ms")
+
+    return lateness_report(lateness, cue_lateness, skipped)
+
+
+def lateness_report(lateness, cue_lateness, skipped=0):
+    """Summarize lateness values in seconds"""
+    ordered = sorted(lateness)
+    last = len(ordered) - 1
+    return {
+        'frames': len(ordered),
+        'cues': len(cue_lateness),
+        'skipped': skipped,
+        'mean': sum(ordered) / len(ordered) if ordered else 0.0,
+        'p50': ordered[last // 2] if ordered else 0.0,
+        'p99': ordered[int(last * 0.99)] if ordered else 0.0,
+        'max': ordered[-1] if ordered else 0.0,
+        'worst_cue': max(cue_lateness, key=cue_lateness.get) if cue_lateness else None,
+    }
+
+
+def print_report(report):
+    """Print a lateness report"""
+    print(f"{report['frames']} frames for {report['cues']} cues, {report['skipped']} skipped (no radio for band)")
+    print(f"Lateness: mean {report['mean'] * 1000:.2f} ms, p50 {report['p50'] * 1000:.2f} ms, "
+          f"p99 {report['p99'] * 1000:.2f} ms, max {report['max'] * 1000:.2f} ms")
+    if report['worst_cue'] is not None:
+        print(f"Latest cue: #{report['worst_cue']}")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('show', help="show file (.json, .yaml, .yml)")
+    parser.add_argument('--dry-run', action='store_true', help="only compile and list the schedule")
+    parser.add_argument('--metrics-textfile', help="keep transmit metrics in this Prometheus .prom file")
+    parser.add_argument('--radio', action='append', metavar='PORT:FREQ',
+                        help="play on several radios at once, repeatable (see pixmob_multi.py)")
+    parser.add_argument('--metrics-json', help="keep a JSON snapshot of the transmit metrics in this file")
+    args = parser.parse_args()
+
+    show = load_show(args.show)
+    schedule = compile_show(show)
+    duration = schedule[-1].offset if schedule else 0.0
+    print(f"Show '{show.get('name', args.show)}': {len(show['cues'])} cues, "
+          f"{len(schedule)} frames, {duration:.1f}s")
+    if args.dry_run:
+        for frame in schedule:
+            print(f"  {frame.offset:8.3f}s  {frame.band} MHz  {frame.command} #{frame.repeat + 1}")
+        return
+
+    from pixmob_metrics import MetricsExporter
+    group = None
+    if args.radio:
+        from pixmob_multi import RadioGroup, parse_radio
+        group = RadioGroup.open([parse_radio(spec) for spec in args.radio])
+        controllers = group.bands()
+        metrics = group.metrics
+    else:
+        from pixmob_controller import PIXMOBController
+        controller = PIXMOBController()
+        controllers = {DEFAULT_BAND: controller}
+        metrics = controller.metrics
+    exporter = None
+    if args.metrics_textfile or args.metrics_json:
+        exporter = MetricsExporter(metrics, args.metrics_textfile, args.metrics_json).start()
+    try:
+        print_report(run_show(schedule, controllers))
+    except KeyboardInterrupt:
+        print("\nShow interrupted by user.")
+    finally:
+        if group is not None:
+            group.stop()
+            group.print_stats()
+        if exporter is not None:
+            exporter.stop()
+
+
+if __name__ == "__main__":
+    main()
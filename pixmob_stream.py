@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+PIXMOB Streaming Capture Reader
+Reads Flipper RAW .sub recordings incrementally with bounded memory
+"""
+
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+CHUNK_SIZE = 1 << 16    # Bytes read from disk per block
+GAP_US = 3000           # Low periods this long separate repeated frames
+MAX_SEGMENT = 1 << 16   # Pulses kept before a gapless segment is flushed
+
+RAW_KEY = b'RAW_Data:'
+
+Pulse = namedtuple('Pulse', 'timestamp_us level duration')
+Segment = namedtuple('Segment', 'timestamp_us offset end_offset durations')
+
+
+class RawReader:
+    """Incremental RAW_Data reader that can be resumed from a byte offset
+
+    offset and timestamp_us always describe the position right after the
+    last value handed out, so they can be stored and passed back in later.
+    """
+
+    def __init__(self, path, offset=0, timestamp_us=0, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.offset = offset
+        self.timestamp_us = timestamp_us
+        self.chunk_size = chunk_size
+        self.header = {}
+
+    def _tokens(self):
+        """Yield (values, end_offsets) arrays for each chunk of RAW_Data values"""
+        in_data = self.offset > 0   # Resume points always sit inside RAW_Data
+        key = None
+        with open(self.path, 'rb') as file:
+            file.seek(self.offset)
+            position = self.offset
+            tail = b''
+            while True:
+                chunk = file.read(self.chunk_size)
+                data = tail + chunk
+                base = position - len(tail)
+                if chunk:
+                    # Keep a token cut by the chunk boundary for the next round
+                    cut = max(data.rfind(b' '), data.rfind(b'\n'), data.rfind(b'\r'))
+                    if cut < 0:
+                        tail = data
+                        position += len(chunk)
+                        continue
+                    tail = data[cut + 1:]
+                    data = data[:cut + 1]
+                    position += len(chunk)
+                elif not data:
+                    return
+                else:
+                    tail = b''
+
+                buffer = np.frombuffer(data, dtype=np.uint8)
+                space = buffer <= 32
+                ends = np.flatnonzero(~space & np.append(space[1:], True)) + base + 1
+                tokens = data.split()
+
+                start = 0
+                for index, token in enumerate(tokens):
+                    if not token.endswith(b':'):
+                        if not in_data and key is not None:
+                            value = token.decode(errors='replace')
+                            self.header[key] = (self.header[key] + ' ' + value).strip()
+                        continue
+                    if in_data and index > start:
+                        yield self._values(tokens[start:index]), ends[start:index]
+                    in_data = token == RAW_KEY
+                    key = None if in_data else token[:-1].decode(errors='replace')
+                    if key is not None:
+                        self.header[key] = ''
+                    start = index + 1
+                if in_data and len(tokens) > start:
+                    yield self._values(tokens[start:]), ends[start:]
+                if not chunk:
+                    return
+
+    @staticmethod
+    def _values(tokens):
+        return np.fromiter(map(int, tokens), dtype=np.int64, count=len(tokens))
+
+    def blocks(self):
+        """Yield signed duration arrays, one per chunk read"""
+        for values, ends in self._tokens():
+            self.offset = int(ends[-1])
+            self.timestamp_us += int(np.abs(values).sum())
+            yield values
+
+    def pulses(self):
+        """Yield Pulse(timestamp_us, level, duration) for every RAW_Data value"""
+        for values, ends in self._tokens():
+            for value, end in zip(values.tolist(), ends.tolist()):
+                level = 1 if value > 0 else 0
+                duration = abs(value)
+                timestamp_us = self.timestamp_us
+                self.timestamp_us += duration
+                self.offset = end
+                yield Pulse(timestamp_us, level, duration)
+
+    def segments(self, gap_us=GAP_US, max_pulses=MAX_SEGMENT):
+        """Yield Segments of durations separated by low periods of at least gap_us
+
+        The separating gap is dropped; segments without any high pulse are
+        skipped, and a segment longer than max_pulses is flushed as is.
+        """
+        parts = []
+        size = 0
+        start_us = self.timestamp_us
+        start_offset = self.offset
+        for values, ends in self._tokens():
+            times = self.timestamp_us + np.concatenate(([0], np.cumsum(np.abs(values))))
+            begin = 0
+            cuts = np.flatnonzero(values <= -gap_us).tolist()
+            cuts.append(None)
+            for cut in cuts:
+                stop = len(values) if cut is None else cut
+                while stop - begin > max_pulses - size:
+                    split = begin + max_pulses - size
+                    parts.append(values[begin:split])
+                    self.offset = int(ends[split - 1])
+                    self.timestamp_us = int(times[split])
+                    segment = self._segment(parts, start_us, start_offset)
+                    if segment is not None:
+                        yield segment
+                    parts, size = [], 0
+                    begin = split
+                    start_us, start_offset = self.timestamp_us, self.offset
+                if stop > begin:
+                    parts.append(values[begin:stop])
+                    size += stop - begin
+                if cut is None:
+                    break
+                self.offset = int(ends[cut - 1]) if cut > 0 else self.offset
+                self.timestamp_us = int(times[cut])
+                segment = self._segment(parts, start_us, start_offset)
+                if segment is not None:
+                    yield segment
+                parts, size = [], 0
+                begin = cut + 1
+                self.offset = int(ends[cut])
+                self.timestamp_us = int(times[cut + 1])
+                start_us, start_offset = self.timestamp_us, self.offset
+            self.offset = int(ends[-1])
+            self.timestamp_us = int(times[-1])
+        segment = self._segment(parts, start_us, start_offset)
+        if segment is not None:
+            yield segment
+
+    def _segment(self, parts, start_us, start_offset):
+        if not parts:
+            return None
+        durations = np.concatenate(parts)
+        if not np.any(durations > 0):
+            return None
+        return Segment(start_us, start_offset, self.offset, durations)
+
+
+def iter_pulses(path, offset=0, timestamp_us=0):
+    """Yield Pulse(timestamp_us, level, duration) tuples from a .sub file"""
+    return RawReader(path, offset, timestamp_us).pulses()
+
+
+def iter_segments(path, gap_us=GAP_US, offset=0, timestamp_us=0):
+    """Yield gap-separated Segments from a .sub file"""
+    return RawReader(path, offset, timestamp_us).segments(gap_us)
+
+
+def main():
+    """Print a segment summary for each file given on the command line"""
+    for path in sys.argv[1:]:
+        reader = RawReader(path)
+        count = 0
+        pulses = 0
+        for segment in reader.segments():
+            count += 1
+            pulses += len(segment.durations)
+        print(f"{path}: {count} segments, {pulses} pulses, "
+              f"{reader.timestamp_us / 1e6:.1f}s recorded, {reader.offset} bytes")
+
+
+if __name__ == "__main__":
+    main()
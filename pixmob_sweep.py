@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+PIXMOB Sweep Runner
+Transmits a prioritized space of candidate frames unattended, resuming from a checkpoint
+
+The candidate space is a list of tiers, each the product of a few dimensions
+(frequency, power, wrapping, address, command, byte edits). Candidate i is
+computed from i alone, so millions of candidates are never held in memory and
+a sweep can restart at any index.
+
+Usage:
+    python3 pixmob_sweep.py --list                   # tier sizes, no radio needed
+    python3 pixmob_sweep.py                          # run or resume the default sweep
+    python3 pixmob_sweep.py --tiers known,addresses --restart
+"""
+
+import argparse
+import bisect
+import hashlib
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from collections import namedtuple
+
+from pixmob_catalog import load_catalog
+from pixmob_frames import BROADCAST_ADDR, FRAME_LENGTH, wrapped_frame
+from pixmob_radio import reconfigure
+
+CHECKPOINT_PATH = os.path.join('sweeps', 'sweep.json')
+CHECKPOINT_VERSION = 1
+CHECKPOINT_INTERVAL = 10.0    # Seconds between checkpoint writes
+PAYLOAD_START = 2             # Bytes before this are the 0xaa 0xaa preamble and never edited
+
+BANDS = (868, 915)
+POWERS = (22, 17, 13, 10)
+FREQUENCIES = tuple(range(851, 931))   # Channels sx126x.set() can encode on the 868/915 MHz HAT
+ADDRESSES = (0, 1, 255, 1000, 8888, 12345)
+PROBE_COMMANDS = ('nothing', 'gold_fade_in')
+
+Candidate = namedtuple('Candidate', 'index tier freq power wrapped target_addr command payload')
+
+
+class Tier:
+    """One block of the candidate space: every combination of its dimensions
+
+    dimensions is a list of (field, values) where values supports len() and
+    indexing (a tuple or a range). The last dimension varies fastest, so the
+    radio settings go first to keep retuning rare.
+    """
+
+    def __init__(self, name, dimensions):
+        self.name = name
+        self.dimensions = dimensions
+        self.size = math.prod(len(values) for _, values in dimensions)
+
+    def __len__(self):
+        return self.size
+
+    def choice(self, index):
+        """The field values of the index-th combination"""
+        choice = {}
+        for field, values in reversed(self.dimensions):
+            index, digit = divmod(index, len(values))
+            choice[field] = values[digit]
+        return choice
+
+    def describe(self):
+        """JSON-able description, used to detect a changed space on resume"""
+        dimensions = []
+        for field, values in self.dimensions:
+            if isinstance(values, range):
+                values = ['range', values.start, values.stop, values.step]
+            dimensions.append([field, list(values)])
+        return [self.name, dimensions]
+
+
+def edit_payload(frame, positions, deltas):
+    """Frame with each byte at positions changed by 1 + delta (mod 256), never left as is"""
+    data = bytearray(frame)
+    for position, delta in zip(positions, deltas):
+        data[position] = (data[position] + 1 + delta) % 256
+    return bytes(data)
+
+
+class CandidateSpace:
+    """Concatenation of tiers with O(1) lookup of any candidate by index"""
+
+    def __init__(self, tiers, commands):
+        self.tiers = tiers
+        self.commands = commands
+        self._starts = list(itertools.accumulate((len(tier) for tier in tiers), initial=0))
+
+    def __len__(self):
+        return self._starts[-1]
+
+    def tier_start(self, name):
+        """Index of the first candidate of a tier"""
+        for tier, start in zip(self.tiers, self._starts):
+            if tier.name == name:
+                return start
+        raise KeyError(name)
+
+    def __getitem__(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        position = bisect.bisect_right(self._starts, index) - 1
+        tier = self.tiers[position]
+        choice = tier.choice(index - self._starts[position])
+        command = choice['command']
+        payload = self.commands[command]
+        if 'positions' in choice:
+            payload = edit_payload(payload, choice['positions'],
+                                   [choice[field] for field in ('delta', 'delta_b') if field in choice])
+        target_addr = choice.get('target_addr', BROADCAST_ADDR)
+        wrapped = choice.get('wrapped', 'target_addr' in choice)
+        return Candidate(index, tier.name, choice['freq'], choice['power'], wrapped,
+                         target_addr, command, payload)
+
+    def iter_from(self, start=0, stop=None):
+        """Yield candidates lazily from start up to stop"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        for index in range(start, stop):
+            yield self[index]
+
+    def signature(self):
+        """Hash of the tier layout and command bytes; a checkpoint only resumes the same space"""
+        layout = [tier.describe() for tier in self.tiers]
+        commands = {name: frame.hex() for name, frame in self.commands.items()}
+        return hashlib.sha1(json.dumps([layout, commands], sort_keys=True).encode()).hexdigest()
+
+
+def default_tiers(commands):
+    """The standard sweep, most promising candidates first"""
+    names = tuple(commands)
+    probes = tuple(name for name in PROBE_COMMANDS if name in commands)
+    positions = tuple((position,) for position in range(PAYLOAD_START, FRAME_LENGTH))
+    pairs = tuple(itertools.combinations(range(PAYLOAD_START, FRAME_LENGTH), 2))
+    return [
+        # Every known command, raw and wrapped, on both bands
+        Tier('known', [('freq', BANDS), ('power', (22,)), ('wrapped', (False, True)), ('command', names)]),
+        # The addresses Test 2 of pixmob_official_format.py tried by hand
+        Tier('addresses', [('freq', BANDS), ('power', (22,)), ('command', probes), ('target_addr', ADDRESSES)]),
+        # Test 3 and test_power_and_settings, over every channel the module can tune
+        Tier('frequencies', [('freq', FREQUENCIES), ('power', POWERS), ('wrapped', (False, True)),
+                             ('command', probes)]),
+        # Every other value of every payload byte of every command
+        Tier('single_byte', [('freq', BANDS), ('power', (22,)), ('wrapped', (False,)), ('command', names),
+                             ('positions', positions), ('delta', range(255))]),
+        # Every fixed-point address
+        Tier('address_space', [('freq', BANDS), ('power', (22,)), ('command', probes[:1]),
+                               ('target_addr', range(65536))]),
+        # Every pair of payload bytes changed together, on the EU band
+        Tier('double_byte', [('freq', (868,)), ('power', (22,)), ('wrapped', (False,)), ('command', names),
+                             ('positions', pairs), ('delta', range(255)), ('delta_b', range(255))]),
+    ]
+
+
+def default_space(band=868, tiers=None):
+    """CandidateSpace over the catalog, optionally restricted to some tier names"""
+    commands = load_catalog(band)
+    selected = default_tiers(commands)
+    if tiers:
+        known = {tier.name for tier in selected}
+        unknown = set(tiers) - known
+        if unknown:
+            raise ValueError(f"Unknown tiers {sorted(unknown)}, expected some of {sorted(known)}")
+        selected = [tier for tier in selected if tier.name in tiers]
+    return CandidateSpace(selected, commands)
+
+
+def load_checkpoint(path):
+    """Read a checkpoint, or None if there is none"""
+    try:
+        with open(path, 'r') as file:
+            state = json.load(file)
+    except FileNotFoundError:
+        return None
+    if state.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version in {path}")
+    return state
+
+
+def save_checkpoint(path, state):
+    """Write a checkpoint so that a power cut leaves either the old or the new file"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as file:
+        json.dump(dict(state, version=CHECKPOINT_VERSION), file, indent=1)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+class Sweep:
+    """Send every candidate of a space back to back, checkpointing as it goes
+
+    The radio is only retuned when frequency or power change between
+    candidates. Each send is appended to the log with its wall-clock time so
+    a bracelet reacting at a given moment can be traced to the candidates
+    sent just before.
+    """
+
+    def __init__(self, controller, space, checkpoint_path=CHECKPOINT_PATH, log_path=None,
+                 rate=None, checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.controller = controller
+        self.space = space
+        self.checkpoint_path = checkpoint_path
+        self.log_path = log_path
+        self.period = 1.0 / rate if rate else 0.0
+        self.checkpoint_interval = checkpoint_interval
+        self.next_index = 0
+        self.sent = 0
+        self.retunes = 0
+
+    def resume(self, restart=False, start=None):
+        """Pick up the next index from the checkpoint unless told otherwise"""
+        state = None if restart else load_checkpoint(self.checkpoint_path)
+        if state is not None:
+            if state['signature'] != self.space.signature():
+                raise ValueError(f"{self.checkpoint_path} belongs to a different candidate space, "
+                                 f"use --restart to discard it")
+            self.next_index = state['next_index']
+            self.sent = state['sent']
+        if start is not None:
+            self.next_index = start
+        return self.next_index
+
+    def checkpoint(self):
+        save_checkpoint(self.checkpoint_path, {
+            'signature': self.space.signature(),
+            'total': len(self.space),
+            'next_index': self.next_index,
+            'sent': self.sent,
+            'updated': time.time(),
+        })
+
+    def _retune(self, freq, power):
+        if reconfigure(self.controller.lora, freq=freq, power=power).fields:
+            self.retunes += 1
+
+    def frame(self, candidate):
+        """Bytes to write for a candidate"""
+        if not candidate.wrapped:
+            return candidate.payload
+        source_addr = self.controller.lora.addr
+        return wrapped_frame(candidate.target_addr, candidate.freq, source_addr, candidate.freq, candidate.payload)
+
+    def run(self, limit=None, progress=1000):
+        """Send candidates from next_index on; returns the number sent in this run"""
+        stop = None if limit is None else self.next_index + limit
+        log = open(self.log_path, 'a') if self.log_path else None
+        sent_before = self.sent
+        last_checkpoint = time.monotonic()
+        next_send = time.monotonic()
+        try:
+            for candidate in self.space.iter_from(self.next_index, stop):
+                self._retune(candidate.freq, candidate.power)
+                if self.period:
+                    delay = next_send - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    next_send = max(next_send + self.period, time.monotonic())
+                self.controller.send_frame(self.frame(candidate))
+                self.next_index = candidate.index + 1
+                self.sent += 1
+                if log:
+                    log.write(f"{time.time():.3f} {candidate.index} {candidate.tier} {candidate.freq} "
+                              f"{candidate.power} {'wrapped' if candidate.wrapped else 'raw'} "
+                              f"{candidate.target_addr} {candidate.command} {candidate.payload.hex()}\n")
+                if progress and self.sent % progress == 0:
+                    print(f"  {self.next_index}/{len(self.space)} ({candidate.tier}, {candidate.freq} MHz)")
+                if time.monotonic() - last_checkpoint >= self.checkpoint_interval:
+                    if log:
+                        log.flush()
+                    self.checkpoint()
+                    last_checkpoint = time.monotonic()
+        finally:
+            # Also reached on Ctrl+C, so an interrupted sweep resumes where it stopped
+            self.checkpoint()
+            if log:
+                log.close()
+        return self.sent - sent_before
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Sweep PIXMOB candidate frames without supervision")
+    parser.add_argument('--tiers', help="comma-separated tiers to sweep (default: all, in priority order)")
+    parser.add_argument('--band', type=int, default=868, help="catalog band the commands come from")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_PATH, help="checkpoint file to resume from")
+    parser.add_argument('--log', help="append one line per sent candidate to this file")
+    parser.add_argument('--restart', action='store_true', help="ignore the checkpoint and start at 0")
+    parser.add_argument('--start', type=int, help="start at this candidate index")
+    parser.add_argument('--limit', type=int, help="stop after this many candidates")
+    parser.add_argument('--rate', type=float, help="cap on candidates per second (default: as fast as the radio takes them)")
+    parser.add_argument('--list', action='store_true', help="print the tiers and exit")
+    args = parser.parse_args()
+
+    space = default_space(args.band, args.tiers.split(',') if args.tiers else None)
+
+    if args.list:
+        print(f"{len(space)} candidates")
+        for tier in space.tiers:
+            start = space.tier_start(tier.name)
+            fields = ' x '.join(f"{field}({len(values)})" for field, values in tier.dimensions)
+            print(f"  {start:>10}  {tier.name:<14} {len(tier):>10}  {fields}")
+            print(f"              first: {space[start]}")
+        return
+
+    # Imported here so --list works on a machine without the HAT driver
+    from pixmob_controller import PIXMOBController
+
+    controller = PIXMOBController()
+    sweep = Sweep(controller, space, args.checkpoint, args.log, args.rate)
+    try:
+        start = sweep.resume(args.restart, args.start)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    print(f"Sweeping {len(space) - start} of {len(space)} candidates from index {start}")
+
+    started = time.monotonic()
+    sent_before = sweep.sent
+    try:
+        sweep.run(args.limit)
+    except KeyboardInterrupt:
+        print("\n[INFO] Interrupted")
+    sent = sweep.sent - sent_before
+    elapsed = time.monotonic() - started
+    print(f"[SUCCESS] Sent {sent} candidates in {elapsed:.0f}s, {sweep.retunes} retunes, "
+          f"next index {sweep.next_index} saved to {args.checkpoint}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+"""
+PIXMOB Clock-Synchronized Nodes
+Several Pis fire the same show cues at the same master time over UDP
+
+Nodes sync to the master with NTP-style four-timestamp exchanges. Only the
+lowest-delay samples of a sliding window are kept (queueing only ever adds
+delay), and a line fitted through their offsets gives both the clock offset
+and its drift, so cues far in the future still land on time. The master
+sends every frame of a show with its due time on the master clock; each node
+converts it to its own clock, fires, and reports back, and the master prints
+each node's offset, drift and error bound, and the skew of every cue.
+
+Cues carry sequence numbers, and every sync reply carries the newest one, so
+a node notices lost cue datagrams (including the last ones of a show) within
+a sync period and asks the master to send them again. A node only fires the
+cues of the band its radio is tuned to.
+
+Usage:
+    python3 pixmob_sync.py master shows/demo.json --nodes 2          # on the master Pi
+    python3 pixmob_sync.py node --master 192.168.1.10 --name left    # on every node Pi
+    python3 pixmob_sync.py local shows/demo.json --nodes 3           # master + 3 nodes on this box
+"""
+
+import argparse
+import heapq
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import random
+import time
+from collections import deque
+
+from pixmob_catalog import catalog_band
+from pixmob_show import _wait_until, compile_show, load_show
+
+SYNC_PORT = 5405
+SYNC_PERIOD = 0.5         # Seconds between sync exchanges once settled
+SYNC_BURST = 16           # Quick exchanges right after a node starts
+SYNC_WINDOW = 64          # Samples the estimator looks at
+BEST_FRACTION = 0.25      # Share of the window (lowest delay) used for the fit
+MIN_SAMPLES = 8           # Samples before a node calls itself synced
+MIN_FIT_SPAN = 2.0        # Seconds of samples before the drift is fitted
+SHOW_LEAD = 2.0           # Seconds between sending the cues and the first one
+MAX_RESEND = 64           # Cue sequence numbers asked for in one resend request
+MAX_DATAGRAM = 2048
+BAD_MESSAGE = (ValueError, KeyError, TypeError, IndexError)   # What a stray or malformed datagram raises
+
+
+def _pack(message):
+    return json.dumps(message, separators=(',', ':')).encode()
+
+
+class LocalClock:
+    """time.monotonic(), optionally offset and skewed to test sync on one box"""
+
+    def __init__(self, offset=0.0, drift_ppm=0.0):
+        self.offset = offset
+        self.rate = 1.0 + drift_ppm * 1e-6
+
+    def now(self):
+        return time.monotonic() * self.rate + self.offset
+
+    def to_monotonic(self, local):
+        return (local - self.offset) / self.rate
+
+    def from_monotonic(self, monotonic):
+        return monotonic * self.rate + self.offset
+
+
+class ClockEstimator:
+    """Maps local clock readings to master time from four-timestamp samples"""
+
+    def __init__(self, window=SYNC_WINDOW, best=BEST_FRACTION):
+        self.samples = deque(maxlen=window)
+        self.best = best
+        # (reference, offset, drift): master - local is offset at local time
+        # reference and changes by drift per local second. Replaced as one
+        # tuple so the firing thread never sees half an update.
+        self.fit = (0.0, 0.0, 0.0)
+        self.bound = float('inf')
+
+    def add(self, t1, t2, t3, t4):
+        """t1/t4: node send/receive (local clock), t2/t3: master receive/send"""
+        delay = (t4 - t1) - (t3 - t2)
+        offset = ((t2 - t1) + (t3 - t4)) / 2
+        self.samples.append(((t1 + t4) / 2, offset, delay))
+        self._update()
+
+    def _update(self):
+        ordered = sorted(self.samples, key=lambda sample: sample[2])
+        best = ordered[:max(3, int(len(ordered) * self.best))]
+        count = len(best)
+        mean_t = sum(sample[0] for sample in best) / count
+        mean_o = sum(sample[1] for sample in best) / count
+        spread = sum((sample[0] - mean_t) ** 2 for sample in best)
+        span = max(sample[0] for sample in best) - min(sample[0] for sample in best)
+        if count >= 3 and span >= MIN_FIT_SPAN and spread > 0:
+            drift = sum((sample[0] - mean_t) * (sample[1] - mean_o) for sample in best) / spread
+        else:
+            drift = 0.0
+        fit = (mean_t, mean_o, drift)
+        residual = max(abs(sample[1] - self.predicted(sample[0], fit)) for sample in best)
+        self.fit = fit
+        # The true offset lies within half the round trip of each measured one
+        self.bound = min(sample[2] for sample in best) / 2 + residual
+
+    def predicted(self, local, fit=None):
+        """Estimated master - local at a local time"""
+        reference, offset, drift = fit or self.fit
+        return offset + drift * (local - reference)
+
+    @property
+    def offset(self):
+        return self.fit[1]
+
+    @property
+    def drift(self):
+        return self.fit[2]
+
+    def to_master(self, local):
+        return local + self.predicted(local)
+
+    def to_local(self, master):
+        """Inverse of to_master"""
+        reference, offset, drift = self.fit
+        return (master - offset + drift * reference) / (1.0 + drift)
+
+    @property
+    def synced(self):
+        return len(self.samples) >= MIN_SAMPLES
+
+
+class SyncNode:
+    """Keeps in sync with the master and fires the cues it sends on time"""
+
+    def __init__(self, master, name, controller=None, clock=None, period=SYNC_PERIOD, band=None, loss=0.0):
+        """band: catalog band whose cues are fired (default: the controller's, or every band)
+        loss: share of cue datagrams to throw away, to exercise the resend path
+        """
+        self.master = master
+        self.name = name
+        self.controller = controller
+        self.clock = clock or LocalClock()
+        self.period = period
+        if band is None and controller is not None:
+            band = catalog_band(controller.band())
+        self.band = band
+        self.loss = loss
+        self.estimator = ClockEstimator()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.settimeout(0.2)
+        self._cues = []
+        self._seen = set()        # Cue sequence numbers received, whatever their band
+        self._last_seq = -1       # Newest sequence number the master has announced
+        self.resend_requests = 0
+        self.skipped = 0          # Cues for another band
+        self._frames = {}
+        self._cue_ready = threading.Condition()
+        self._stop = threading.Event()
+
+    def _send(self, message):
+        self.sock.sendto(_pack(message), self.master)
+
+    def _missing(self):
+        """Sequence numbers up to the newest announced one that never arrived"""
+        with self._cue_ready:
+            return [seq for seq in range(self._last_seq + 1) if seq not in self._seen][:MAX_RESEND]
+
+    def _sync_loop(self):
+        rounds = 0
+        while not self._stop.is_set():
+            self._send({'type': 'sync', 'node': self.name, 't1': self.clock.now()})
+            rounds += 1
+            missing = self._missing()
+            if missing:
+                self.resend_requests += 1
+                self._send({'type': 'resend', 'node': self.name, 'seqs': missing})
+            if self.estimator.synced and rounds % 4 == 0:
+                self._send({'type': 'status', 'node': self.name, 'band': self.band,
+                            'offset': self.estimator.offset, 'drift_ppm': self.estimator.drift * 1e6,
+                            'bound': self.estimator.bound, 'samples': len(self.estimator.samples),
+                            'cues': len(self._seen), 'resend_requests': self.resend_requests,
+                            'skipped': self.skipped})
+            self._stop.wait(0.02 if rounds < SYNC_BURST else self.period)
+
+    def _add_cue(self, cue):
+        # Checked here so a malformed cue is rejected before it reaches the firing heap
+        cue['at'] = float(cue['at'])
+        for field in ('command', 'label'):
+            if not isinstance(cue[field], str):
+                raise TypeError(f"cue {field} must be a string")
+        with self._cue_ready:
+            seq = int(cue['seq'])
+            self._last_seq = max(self._last_seq, seq)
+            if seq in self._seen:
+                return
+            self._seen.add(seq)
+            if self.band is not None and cue['band'] != self.band:
+                self.skipped += 1
+                return
+            heapq.heappush(self._cues, (cue['at'], seq, cue))
+            self._cue_ready.notify()
+
+    def _receive_loop(self):
+        while not self._stop.is_set():
+            try:
+                data, _ = self.sock.recvfrom(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            t4 = self.clock.now()
+            try:
+                self._handle(json.loads(data), t4)
+            except BAD_MESSAGE as e:
+                print(f"[WARNING] Ignored a bad message: {e!r}")
+
+    def _handle(self, message, t4):
+        kind = message['type']
+        if kind == 'sync':
+            t1, t2, t3 = (float(message[key]) for key in ('t1', 't2', 't3'))
+            last_seq = int(message['last_seq'])
+            self.estimator.add(t1, t2, t3, t4)
+            with self._cue_ready:
+                self._last_seq = max(self._last_seq, last_seq)
+        elif kind == 'cue':
+            if self.loss and random.random() < self.loss:
+                return
+            self._add_cue(message)
+        elif kind == 'stop':
+            self._stop.set()
+            with self._cue_ready:
+                self._cue_ready.notify()
+
+    def _frame(self, cue):
+        key = (cue['command'], cue['wrapped'])
+        frame = self._frames.get(key)
+        if frame is None:
+            if cue['wrapped']:
+                frame = self.controller.wrapped_frame(cue['command'])
+            else:
+                frame = self.controller.commands[cue['command']]
+            self._frames[key] = frame
+        return frame
+
+    def _fire_loop(self):
+        while not self._stop.is_set():
+            with self._cue_ready:
+                if not self._cues:
+                    self._cue_ready.wait(0.5)
+                    continue
+                at, _, cue = self._cues[0]
+                # Re-read the estimate every time: it keeps improving until the cue is due
+                deadline = self.clock.to_monotonic(self.estimator.to_local(at))
+                if deadline - time.monotonic() > 0.05:
+                    self._cue_ready.wait(deadline - time.monotonic() - 0.05)
+                    continue
+                heapq.heappop(self._cues)
+            _wait_until(deadline)
+            fired = time.monotonic()
+            error = None
+            if self.controller is not None:
+                try:
+                    self.controller.send_frame(self._frame(cue))
+                except Exception as e:
+                    error = str(e)
+            self._send({'type': 'fired', 'node': self.name, 'id': cue['id'],
+                        'master_time': self.estimator.to_master(self.clock.from_monotonic(fired)),
+                        'host_time': fired, 'host': socket.gethostname(), 'late': fired - deadline,
+                        'send': time.monotonic() - fired, 'error': error})
+
+    def run(self):
+        """Sync and fire cues until the master says stop"""
+        threads = [threading.Thread(target=target, daemon=True)
+                   for target in (self._receive_loop, self._sync_loop, self._fire_loop)]
+        for thread in threads:
+            thread.start()
+        try:
+            while not self._stop.wait(0.5):
+                pass
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+            self.sock.close()
+
+
+class SyncMaster:
+    """Answers sync requests, hands out cues and collects what every node reports"""
+
+    def __init__(self, port=SYNC_PORT, host='0.0.0.0'):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self.nodes = {}           # name -> address
+        self.status = {}          # name -> latest status report
+        self.fired = {}           # cue id -> {name: report}
+        self.cues = []            # Every cue sent, indexed by its sequence number
+        self.resent = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def now(self):
+        return time.monotonic()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                data, address = self.sock.recvfrom(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            t2 = self.now()
+            try:
+                self._handle(json.loads(data), address, t2)
+            except BAD_MESSAGE as e:
+                # The port is open to the whole network; one bad datagram must not end the show
+                print(f"[WARNING] Ignored a bad message from {address[0]}:{address[1]}: {e!r}")
+
+    def _handle(self, message, address, t2):
+        kind = message['type']
+        node = message['node']
+        if not isinstance(node, str):
+            raise TypeError("node name must be a string")
+        if kind == 'sync':
+            float(message['t1'])
+            message['t2'] = t2
+            message['last_seq'] = len(self.cues) - 1
+            message['t3'] = self.now()
+            self.sock.sendto(_pack(message), address)
+            self.nodes[node] = address
+        elif kind == 'resend':
+            for seq in message['seqs']:
+                if isinstance(seq, int) and 0 <= seq < len(self.cues):
+                    self.sock.sendto(self.cues[seq], address)
+                    self.resent += 1
+        elif kind == 'status':
+            band = message['band']
+            self.status[node] = {
+                'node': node, 'band': int(band) if band is not None else None,
+                'offset': float(message['offset']), 'drift_ppm': float(message['drift_ppm']),
+                'bound': float(message['bound']), 'samples': int(message['samples']),
+                'cues': int(message['cues']), 'resend_requests': int(message['resend_requests']),
+                'skipped': int(message['skipped']),
+            }
+        elif kind == 'fired':
+            report = {key: float(message[key]) for key in ('master_time', 'host_time', 'late', 'send')}
+            report.update(node=node, host=str(message['host']), error=message['error'])
+            self.fired.setdefault(int(message['id']), {})[node] = report
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='pixmob-sync-master', daemon=True)
+        self._thread.start()
+        return self
+
+    def wait_for_nodes(self, count, timeout=30.0):
+        """Block until count nodes report a usable estimate; returns their names"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if len(self.status) >= count:
+                break
+            time.sleep(0.1)
+        return sorted(self.status)
+
+    def send_cues(self, schedule, lead=SHOW_LEAD):
+        """Send every frame of a compiled show to every node; returns the master start time
+
+        Each cue is sent once. Nodes ask for the ones they missed, and the
+        sync replies announce the newest sequence number so a lost tail is
+        noticed too.
+        """
+        start = self.now() + lead
+        for index, frame in enumerate(schedule):
+            cue = _pack({'type': 'cue', 'seq': len(self.cues), 'id': index, 'at': start + frame.offset,
+                         'command': frame.command, 'band': frame.band, 'wrapped': frame.wrapped,
+                         'label': frame.label})
+            # Stored before sending, so a resend request can never ask for it too early
+            self.cues.append(cue)
+            for address in list(self.nodes.values()):
+                self.sock.sendto(cue, address)
+        return start
+
+    def stop(self):
+        for address in list(self.nodes.values()):
+            self.sock.sendto(_pack({'type': 'stop'}), address)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.sock.close()
+
+    def skew_report(self, schedule):
+        """Spread of fire times per cue, from the host clock when every node shares one
+
+        Rows are (cue, label, nodes that fired, nodes on its band, skew, worst late).
+        """
+        rows = []
+        for index, frame in enumerate(schedule):
+            reports = self.fired.get(index, {})
+            expected = sum(1 for status in self.status.values() if status['band'] in (None, frame.band))
+            if not reports:
+                rows.append((index, frame.label, 0, expected, None, None))
+                continue
+            same_host = len({report['host'] for report in reports.values()}) == 1
+            key = 'host_time' if same_host else 'master_time'
+            times = [report[key] for report in reports.values()]
+            late = max(report['late'] for report in reports.values())
+            rows.append((index, frame.label, len(reports), expected, max(times) - min(times), late))
+        return rows
+
+
+def print_nodes(master):
+    for name in sorted(master.status):
+        status = master.status[name]
+        band = f"{status['band']} MHz" if status['band'] else "all bands"
+        print(f"  {name:<12} {band:<9} offset {status['offset'] * 1000:+10.3f} ms, "
+              f"drift {status['drift_ppm']:+8.2f} ppm, error bound {status['bound'] * 1000:.3f} ms "
+              f"({status['samples']} samples, {status['cues']} cues, {status['resend_requests']} resend requests)")
+
+
+def run_master(args):
+    schedule = compile_show(load_show(args.show))
+    master = SyncMaster(args.port).start()
+    print(f"Master on UDP port {master.port}, waiting for {args.nodes} nodes...")
+    names = master.wait_for_nodes(args.nodes, args.timeout)
+    if len(names) < args.nodes:
+        print(f"[WARNING] Only {len(names)} of {args.nodes} nodes synced")
+    # Let the estimators see a few more seconds before the first cue
+    time.sleep(args.settle)
+    print_nodes(master)
+
+    start = master.send_cues(schedule, args.lead)
+    duration = schedule[-1].offset if schedule else 0.0
+    print(f"Show: {len(schedule)} frames over {duration:.1f}s, starting in {args.lead:.1f}s")
+    try:
+        time.sleep(max(start + duration - master.now(), 0) + 1.0)
+    except KeyboardInterrupt:
+        print("\nShow interrupted by user.")
+
+    rows = master.skew_report(schedule)
+    skews = sorted(row[4] for row in rows if row[4] is not None)
+    for index, label, count, expected, skew, late in rows:
+        if skew is None:
+            print(f"  cue {index:3d} {label:<20} no node fired (0/{expected})")
+        else:
+            print(f"  cue {index:3d} {label:<20} {count}/{expected} nodes, skew {skew * 1000:7.3f} ms, "
+                  f"worst late {late * 1000:6.3f} ms")
+    print("Final node estimates:")
+    print_nodes(master)
+    print(f"{master.resent} cues sent again on request")
+    if skews:
+        print(f"Cue skew: p50 {skews[len(skews) // 2] * 1000:.3f} ms, max {skews[-1] * 1000:.3f} ms")
+    master.stop()
+
+
+def run_node(args):
+    host, _, port = args.master.partition(':')
+    controller = None
+    if not args.no_radio:
+        from pixmob_controller import PIXMOBController
+        controller = PIXMOBController(verbose=False, serial_num=args.port, freq=args.freq)
+    clock = LocalClock(args.fake_offset, args.fake_drift_ppm)
+    node = SyncNode((host, int(port or SYNC_PORT)), args.name or socket.gethostname(), controller, clock,
+                    band=catalog_band(args.freq), loss=args.fake_loss)
+    print(f"Node {node.name} syncing with {args.master}")
+    try:
+        node.run()
+    except KeyboardInterrupt:
+        pass
+
+
+def run_local(args):
+    """Master plus several node processes with made-up clock errors, all on this machine"""
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    probe.bind(('127.0.0.1', 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    script = os.path.abspath(__file__)
+    nodes = []
+    for index in range(args.nodes):
+        # Offsets of up to a few seconds and drifts of tens of ppm, like cheap oscillators
+        command = [script, 'node', '--master', f'127.0.0.1:{port}', '--name', f'node{index}',
+                   '--freq', str(args.freqs[index % len(args.freqs)]),
+                   '--fake-offset', str((index - args.nodes / 2) * 1.7),
+                   '--fake-drift-ppm', str((index % 3 - 1) * 40.0), '--fake-loss', str(args.fake_loss)]
+        if args.sim:
+            command = [os.path.join(os.path.dirname(script), 'sx126x_sim.py')] + command \
+                + ['--port', f'/dev/sim{index}']
+        else:
+            command.append('--no-radio')
+        nodes.append(subprocess.Popen([sys.executable] + command, stdout=subprocess.DEVNULL))
+    args.port = port
+    try:
+        run_master(args)
+    finally:
+        for process in nodes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Play a show on several clock-synchronized nodes")
+    modes = parser.add_subparsers(dest='mode', required=True)
+
+    for name in ('master', 'local'):
+        mode = modes.add_parser(name)
+        mode.add_argument('show', help="show file (.json, .yaml, .yml)")
+        mode.add_argument('--nodes', type=int, default=2, help="nodes to wait for")
+        mode.add_argument('--lead', type=float, default=SHOW_LEAD, help="seconds from sending the cues to the start")
+        mode.add_argument('--settle', type=float, default=3.0, help="seconds of extra syncing before the show")
+        mode.add_argument('--timeout', type=float, default=30.0, help="seconds to wait for the nodes")
+    modes.choices['master'].add_argument('--port', type=int, default=SYNC_PORT, help="UDP port")
+    modes.choices['local'].add_argument('--sim', action='store_true', help="give every node a simulated radio")
+    modes.choices['local'].add_argument('--freqs', type=int, nargs='+', default=[868],
+                                        help="radio frequencies handed to the nodes in turn")
+    modes.choices['local'].add_argument('--fake-loss', type=float, default=0.0,
+                                        help="share of cue datagrams every node drops")
+
+    node = modes.add_parser('node')
+    node.add_argument('--master', required=True, help=f"master HOST[:PORT] (default port {SYNC_PORT})")
+    node.add_argument('--name', help="node name (default: hostname)")
+    node.add_argument('--port', default='/dev/ttyS0', help="serial port of the radio")
+    node.add_argument('--freq', type=int, default=868, help="radio frequency in MHz")
+    node.add_argument('--no-radio', action='store_true', help="only keep time, do not transmit")
+    node.add_argument('--fake-offset', type=float, default=0.0, help="add this many seconds to the local clock")
+    node.add_argument('--fake-drift-ppm', type=float, default=0.0, help="make the local clock run fast or slow")
+    node.add_argument('--fake-loss', type=float, default=0.0, help="drop this share of cue datagrams")
+    args = parser.parse_args()
+
+    {'master': run_master, 'node': run_node, 'local': run_local}[args.mode](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,9 @@
 
 #include "BuildOpt.h"
 
+// command bytes, generated from pixmob_commands.json by pixmob_build.py
+#include "pixmob_commands.h"
+
 // Define the GPIO pin for DIO2 output (choose an available GPIO pin)
 #define RADIO_DIO_2_PORT 23
 
@@ -18,7 +21,7 @@ SX1262 radio = new Module(hal, 8, 17, 22, 7);
 // SX126X radio = new Module(RADIO_NSS_PORT, RADIO_DIO_1_PORT, RADIO_BUSY_PORT, RADIO_RESET_PORT, RADIO_DIO_1_PORT);
 int ColorIndex = 0, BitDuration = 500;
 #define ValidValuesCount 4
-#define BytesCount 12
+#define BytesCount PIXMOB_BYTES_COUNT
 
 void MicrosDelay(unsigned long m)
 {
@@ -31,23 +34,12 @@ void MicrosDelay(unsigned long m)
 }
 
 std::array<uint8_t, BytesCount> ByteArray;
-std::array<std::array<int, BytesCount>, ValidValuesCount> ColorArrayArray{{
-    {0xaa, 0xaa, 0x65, 0x21, 0x24, 0x6d, 0x61, 0x23, 0x11, 0x61, 0x2b, 0x40}, // gold_fade_in
-    {0xaa, 0xaa, 0x5b, 0x61, 0x24, 0x6d, 0x61, 0x12, 0x51, 0x61, 0x22, 0x80}, // gold_fast_fade
-    // {0xaa,0xaa,0x55,0xa1,0x21,0x21,0x21,0x18,0x8d,0xa1,0xa,0x40}, //nothing
-    // {0xaa, 0xaa, 0x61, 0x21, 0xc, 0xa1, 0x2d, 0x62, 0x62, 0x61, 0xd, 0x80}, // rand_blue_fade
-    // {0xaa,0xaa,0x50,0xa1,0x24,0x6d,0x61,0x19,0x1a,0xa1,0x12,0x40}, //rand_gold_blink
-    // {0xaa,0xaa,0x52,0xa1,0x24,0x6d,0x61,0x22,0x6a,0x61,0xd}, //rand_gold_fade
-    // {0xaa,0xaa,0x55,0xa1,0x24,0x6d,0x61,0xa,0x59,0x61,0x18,0x40}, //rand_gold_fastfade
-    // {0xaa,0xaa,0x69,0x21,0x21,0x2d,0x61,0x22,0x62,0x61,0x19,0x40}, //rand_red_fade
-    // {0xaa,0xaa,0x5b,0x61,0x21,0x2d,0x61,0x19,0x1a,0xa1,0xa,0x40}, //rand_red_fastblink
-    // {0xaa,0xaa,0x53,0x21,0x21,0x2d,0x61,0xa,0x59,0x61,0x11,0x40}, //rand_red_fastfade
-    // {0xaa,0xaa,0x4d,0xa1,0x2d,0x61,0x2c,0x6d,0x93,0x61,0x24,0x40}, //rand_turq_blink
-    // {0xaa,0xaa,0x52,0xa1,0x2d,0x6d,0x6d,0x59,0x1a,0xa1,0x22,0x40}, //rand_white_blink
-    // {0xaa,0xaa,0x59,0x61,0x2d,0x6d,0x6d,0x62,0x62,0x61,0x2b,0x40}, //rand_white_fade
-    // {0xaa,0xaa,0x66,0xa1,0x2d,0x6d,0x6d,0x4a,0x59,0x61,0x2a,0x40}, //rand_white_fastfade
-    {0xaa, 0xaa, 0x56, 0xa1, 0x2d, 0x6d, 0x6d, 0x52, 0x51, 0x61, 0xb},        // white_fastfade
-    {0xaa, 0xaa, 0x69, 0xa1, 0x21, 0x2d, 0x61, 0x23, 0x11, 0x61, 0x28, 0x40}, // wine_fade_in
+// any command from pixmob_commands.h can be added here
+std::array<pixmob::Frame, ValidValuesCount> ColorArrayArray{{
+    pixmob::gold_fade_in,
+    pixmob::gold_fast_fade,
+    pixmob::white_fastfade,
+    pixmob::wine_fade_in,
 }};
 
 void ByteArraySend(void)
@@ -95,14 +87,13 @@ int main(int argc, char **argv)
     // Main loop
     for (;;)
     {
-        ByteArray = {0xaa, 0xaa, 0x55, 0xa1, 0x21, 0x21, 0x21, 0x18, 0x8d, 0xa1, 0x0a, 0x40};
+        ByteArray = pixmob::nothing;
         ByteArraySend();
         
         if (hal->millis() - Timestamp > 2000)
         {
             Timestamp = hal->millis();
-            for (int i = 0; i < BytesCount; i++)
-                ByteArray[i] = ColorArrayArray[ColorIndex][i];
+            ByteArray = ColorArrayArray[ColorIndex];
             ByteArraySend();
             ColorIndex = (ColorIndex + 1) % ValidValuesCount;
         }
@@ -0,0 +1,68 @@
+// Generated by pixmob_build.py from pixmob_commands.json, do not edit by hand
+#pragma once
+
+#include <array>
+#include <cstdint>
+
+#define PIXMOB_BYTES_COUNT 12
+#define PIXMOB_COMMAND_COUNT 16
+
+namespace pixmob
+{
+    using Frame = std::array<uint8_t, PIXMOB_BYTES_COUNT>;
+
+    constexpr Frame gold_fade_in{{0xaa, 0xaa, 0x65, 0x21, 0x24, 0x6d, 0x61, 0x23, 0x11, 0x61, 0x2b, 0x40}};
+    constexpr Frame gold_fast_fade{{0xaa, 0xaa, 0x5b, 0x61, 0x24, 0x6d, 0x61, 0x12, 0x51, 0x61, 0x22, 0x80}};
+    constexpr Frame nothing{{0xaa, 0xaa, 0x55, 0xa1, 0x21, 0x21, 0x21, 0x18, 0x8d, 0xa1, 0x0a, 0x40}};
+    constexpr Frame rand_blue_fade{{0xaa, 0xaa, 0x61, 0x21, 0x0c, 0xa1, 0x2d, 0x62, 0x62, 0x61, 0x0d, 0x80}};
+    constexpr Frame rand_gold_blink{{0xaa, 0xaa, 0x50, 0xa1, 0x24, 0x6d, 0x61, 0x19, 0x1a, 0xa1, 0x12, 0x40}};
+    constexpr Frame rand_gold_fade{{0xaa, 0xaa, 0x52, 0xa1, 0x24, 0x6d, 0x61, 0x22, 0x6a, 0x61, 0x0d, 0x00}};
+    constexpr Frame rand_gold_fastfade{{0xaa, 0xaa, 0x55, 0xa1, 0x24, 0x6d, 0x61, 0x0a, 0x59, 0x61, 0x18, 0x40}};
+    constexpr Frame rand_red_fade{{0xaa, 0xaa, 0x69, 0x21, 0x21, 0x2d, 0x61, 0x22, 0x62, 0x61, 0x19, 0x40}};
+    constexpr Frame rand_red_fastblink{{0xaa, 0xaa, 0x5b, 0x61, 0x21, 0x2d, 0x61, 0x19, 0x1a, 0xa1, 0x0a, 0x40}};
+    constexpr Frame rand_red_fastfade{{0xaa, 0xaa, 0x53, 0x21, 0x21, 0x2d, 0x61, 0x0a, 0x59, 0x61, 0x11, 0x40}};
+    constexpr Frame rand_turq_blink{{0xaa, 0xaa, 0x4d, 0xa1, 0x2d, 0x61, 0x2c, 0x6d, 0x93, 0x61, 0x24, 0x40}};
+    constexpr Frame rand_white_blink{{0xaa, 0xaa, 0x52, 0xa1, 0x2d, 0x6d, 0x6d, 0x59, 0x1a, 0xa1, 0x22, 0x40}};
+    constexpr Frame rand_white_fade{{0xaa, 0xaa, 0x59, 0x61, 0x2d, 0x6d, 0x6d, 0x62, 0x62, 0x61, 0x2b, 0x40}};
+    constexpr Frame rand_white_fastfade{{0xaa, 0xaa, 0x66, 0xa1, 0x2d, 0x6d, 0x6d, 0x4a, 0x59, 0x61, 0x2a, 0x40}};
+    constexpr Frame white_fastfade{{0xaa, 0xaa, 0x56, 0xa1, 0x2d, 0x6d, 0x6d, 0x52, 0x51, 0x61, 0x0b, 0x00}};
+    constexpr Frame wine_fade_in{{0xaa, 0xaa, 0x69, 0xa1, 0x21, 0x2d, 0x61, 0x23, 0x11, 0x61, 0x28, 0x40}};
+
+    constexpr std::array<Frame, PIXMOB_COMMAND_COUNT> all{{
+        gold_fade_in,
+        gold_fast_fade,
+        nothing,
+        rand_blue_fade,
+        rand_gold_blink,
+        rand_gold_fade,
+        rand_gold_fastfade,
+        rand_red_fade,
+        rand_red_fastblink,
+        rand_red_fastfade,
+        rand_turq_blink,
+        rand_white_blink,
+        rand_white_fade,
+        rand_white_fastfade,
+        white_fastfade,
+        wine_fade_in,
+    }};
+
+    constexpr std::array<const char *, PIXMOB_COMMAND_COUNT> names{{
+        "gold_fade_in",
+        "gold_fast_fade",
+        "nothing",
+        "rand_blue_fade",
+        "rand_gold_blink",
+        "rand_gold_fade",
+        "rand_gold_fastfade",
+        "rand_red_fade",
+        "rand_red_fastblink",
+        "rand_red_fastfade",
+        "rand_turq_blink",
+        "rand_white_blink",
+        "rand_white_fade",
+        "rand_white_fastfade",
+        "white_fastfade",
+        "wine_fade_in",
+    }};
+}
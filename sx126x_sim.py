@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Simulated SX126X HAT
+Drop-in stand-in for Waveshare's sx126x module that records every send() with timestamps
+
+Usage:
+    python3 sx126x_sim.py [--fast] [--strict] pixmob_controller.py [args...]
+
+or from Python, before the scripts import sx126x:
+    import sx126x_sim; sx126x_sim.install()
+"""
+
+import argparse
+import runpy
+import sys
+import time
+import types
+from collections import namedtuple
+
+from pixmob_radio import (MODULE_BUFFER, SEND_SETTLE, UART_BAUD,
+                          airtime, uart_time)
+
+SentFrame = namedtuple('SentFrame', 'timestamp data uart_s air_start air_end')
+
+# Behaviour of radios created after install(); see install() for the meaning
+realtime = True
+strict = False
+
+instances = []
+
+
+class SimGPIO:
+    """The few RPi.GPIO calls the driver makes; M1 high with M0 low puts every radio in config mode"""
+
+    BCM = 11
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+
+    def __init__(self):
+        self.levels = {}
+
+    def setmode(self, mode):
+        pass
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, mode):
+        self.levels.setdefault(pin, self.LOW)
+
+    def output(self, pin, level):
+        self.levels[pin] = level
+
+    def input(self, pin):
+        return self.levels.get(pin, self.LOW)
+
+    def cleanup(self):
+        self.levels.clear()
+
+    def config_mode(self):
+        return self.levels.get(sx126x.M0) == self.LOW and self.levels.get(sx126x.M1) == self.HIGH
+
+
+GPIO = SimGPIO()
+
+
+class SimSerial:
+    """Serial port of the simulated module; answers configuration writes like the E22 core"""
+
+    def __init__(self, port, baudrate=UART_BAUD):
+        self.port = port
+        self.baudrate = baudrate
+        self.is_open = True
+        self.registers = bytearray(9)
+        self.writes = []
+        self._rx = bytearray()
+
+    @property
+    def config_mode(self):
+        return GPIO.config_mode()
+
+    def write(self, data):
+        data = bytes(data)
+        self.writes.append(data)
+        if self.config_mode and len(data) >= 3 and data[0] in (0xC0, 0xC2):
+            start, length = data[1], data[2]
+            payload = data[3:3 + length]
+            self.registers[start:start + len(payload)] = payload
+            self._rx += bytes([0xC1, start, len(payload)]) + payload
+        return len(data)
+
+    def read(self, size=1):
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    def inWaiting(self):
+        return len(self._rx)
+
+    @property
+    def in_waiting(self):
+        return len(self._rx)
+
+    def flushInput(self):
+        self._rx.clear()
+
+    reset_input_buffer = flushInput
+
+    def close(self):
+        self.is_open = False
+
+
+class sx126x:
+    """Simulated sx126x.sx126x with UART, air time and module buffer modelling
+
+    In realtime mode send() really sleeps for the settle delays, the UART
+    transfer and any wait for buffer space. Otherwise the same delays only
+    advance the radio's own clock, so long sweeps can be checked in CI in a
+    fraction of a second while the recorded timestamps stay realistic.
+    """
+
+    M0 = 22
+    M1 = 27
+
+    lora_air_speed_dic = {1200: 0x01, 2400: 0x02, 4800: 0x03, 9600: 0x04, 19200: 0x05, 38400: 0x06, 62500: 0x07}
+    lora_power_dic = {22: 0x00, 17: 0x01, 13: 0x02, 10: 0x03}
+    lora_buffer_size_dic = {240: 0x00, 128: 0x40, 64: 0x80, 32: 0xC0}
+
+    def __init__(self, serial_num, freq, addr, power, rssi, air_speed=2400, net_id=0,
+                 buffer_size=240, crypt=0, relay=False, lbt=False, wor=False):
+        self.serial_n = serial_num
+        self.realtime = realtime
+        self.strict = strict
+        self.sent = []
+        self.dropped = 0
+        self._skew = 0.0
+        self._air = []          # (air_start, air_end, nbytes) still queued in the module
+        self.ser = SimSerial(serial_num)
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(self.M0, GPIO.OUT)
+        GPIO.setup(self.M1, GPIO.OUT)
+        self.set(freq, addr, power, rssi, air_speed, net_id, buffer_size, crypt, relay, lbt, wor)
+        instances.append(self)
+
+    def now(self):
+        """Current time on the radio's clock (monotonic plus simulated waits)"""
+        return time.monotonic() + self._skew
+
+    def sleep(self, seconds):
+        """time.sleep on the radio's clock: really sleeps only in realtime mode"""
+        if seconds <= 0:
+            return
+        if self.realtime:
+            time.sleep(seconds)
+        else:
+            self._skew += seconds
+
+    def set(self, freq, addr, power, rssi, air_speed=2400, net_id=0,
+            buffer_size=240, crypt=0, relay=False, lbt=False, wor=False):
+        """Apply a full configuration the same way the real driver does"""
+        if air_speed not in self.lora_air_speed_dic:
+            raise ValueError(f"Unsupported air_speed {air_speed}")
+        if power not in self.lora_power_dic:
+            raise ValueError(f"Unsupported power {power}")
+        if buffer_size not in self.lora_buffer_size_dic:
+            raise ValueError(f"Unsupported buffer_size {buffer_size}")
+        self.freq = freq
+        self.addr = addr
+        self.power = power
+        self.rssi = rssi
+        self.air_speed = air_speed
+        self.buffer_size = buffer_size
+        self.start_freq = 850 if freq > 850 else 410
+        self.offset_freq = freq - self.start_freq
+
+        registers = bytes([
+            addr >> 8, addr & 0xff, net_id & 0xff,
+            0x60 + self.lora_air_speed_dic[air_speed],
+            self.lora_buffer_size_dic[buffer_size] + self.lora_power_dic[power] + 0x20,
+            self.offset_freq,
+            0x43 + (0x80 if rssi else 0x00),
+            crypt >> 8 & 0xff, crypt & 0xff,
+        ])
+        # Same register image the driver keeps in cfg_reg: C2 00 09 then registers 00-08
+        self.cfg_reg = [0xC2, 0x00, 0x09] + list(registers)
+        GPIO.output(self.M0, GPIO.LOW)
+        GPIO.output(self.M1, GPIO.HIGH)
+        self.sleep(0.1)
+        self.ser.flushInput()
+        self.ser.write(bytes(self.cfg_reg))
+        self.sleep(0.2)
+        response = self.ser.read(self.ser.inWaiting())
+        if not response or response[0] != 0xC1:
+            print("parameters setting fail :", response)
+        GPIO.output(self.M0, GPIO.LOW)
+        GPIO.output(self.M1, GPIO.LOW)
+        self.sleep(0.1)
+
+    def _buffered(self, at):
+        self._air = [packet for packet in self._air if packet[1] > at]
+        queued = 0
+        for air_start, air_end, nbytes in self._air:
+            if at <= air_start:
+                queued += nbytes
+            else:
+                queued += nbytes * (air_end - at) / (air_end - air_start)
+        return queued
+
+    def send(self, data):
+        """Write data like sx126x.send(), modelling UART, buffer and air time"""
+        data = bytes(data)
+        self.sleep(SEND_SETTLE)
+
+        # Wait for the module to drain enough of its buffer (AUX busy)
+        if self._buffered(self.now()) + len(data) > MODULE_BUFFER:
+            if self.strict:
+                self.dropped += 1
+                raise BufferError(f"Module buffer full, {len(data)} bytes dropped")
+            while self._air and self._buffered(self.now()) + len(data) > MODULE_BUFFER:
+                self.sleep(self._air[0][1] - self.now())
+
+        written_at = self.now()
+        uart_s = uart_time(len(data), self.ser.baudrate)
+        self.ser.write(data)
+        self.sleep(uart_s)
+        air_start = max(self.now(), self._air[-1][1] if self._air else 0.0)
+        air_end = air_start + airtime(len(data), self.air_speed, self.buffer_size)
+        self._air.append((air_start, air_end, len(data)))
+        self.sent.append(SentFrame(written_at, data, uart_s, air_start, air_end))
+        self.sleep(SEND_SETTLE)
+
+    def receive(self):
+        """Nothing is ever received in the simulation"""
+        return None
+
+    def get_settings(self):
+        return bytes(self.ser.registers)
+
+    def summary(self):
+        """One-line description of what this radio sent"""
+        if not self.sent:
+            return f"{self.serial_n} @ {self.freq} MHz: nothing sent"
+        span = self.sent[-1].air_end - self.sent[0].timestamp
+        on_air = sum(frame.air_end - frame.air_start for frame in self.sent)
+        total = sum(len(frame.data) for frame in self.sent)
+        return (f"{self.serial_n} @ {self.freq} MHz: {len(self.sent)} frames, {total} bytes, "
+                f"{span:.2f}s span, {on_air:.2f}s on air ({100 * on_air / span if span else 0:.0f}%), "
+                f"{self.dropped} dropped")
+
+
+def install(realtime_mode=True, strict_mode=False):
+    """Make `import sx126x` (and `import RPi.GPIO`) return this simulation
+
+    realtime_mode=False replaces the driver's sleeps with a simulated clock;
+    strict_mode=True makes sends that overflow the module buffer raise
+    BufferError instead of blocking until there is room.
+    """
+    global realtime, strict
+    realtime = realtime_mode
+    strict = strict_mode
+    sys.modules['sx126x'] = sys.modules[__name__]
+    rpi = types.ModuleType('RPi')
+    rpi.GPIO = GPIO
+    sys.modules['RPi'] = rpi
+    sys.modules['RPi.GPIO'] = GPIO
+
+
+def main():
+    """Run a PIXMOB script against the simulated HAT"""
+    parser = argparse.ArgumentParser(description="Run a script with the simulated SX126X HAT")
+    parser.add_argument('--fast', action='store_true', help="simulate the driver's delays instead of sleeping")
+    parser.add_argument('--strict', action='store_true', help="fail sends that overflow the module buffer")
+    parser.add_argument('script', help="script to run, e.g. pixmob_controller.py")
+    parser.add_argument('args', nargs=argparse.REMAINDER, help="arguments for the script")
+    args = parser.parse_args()
+
+    install(not args.fast, args.strict)
+    sys.argv = [args.script] + args.args
+    try:
+        runpy.run_path(args.script, run_name='__main__')
+    finally:
+        print("\n=== Simulated SX126X summary ===", file=sys.stderr)
+        for radio in instances:
+            print(radio.summary(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()